@@ -1,66 +1,76 @@
 import asyncio
+import itertools
 import json
-import logging
 import os
 import re
 import subprocess
-from logging.handlers import SysLogHandler
-from typing import Any, Dict, List, Set, Tuple
+import time
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterator, List, Set, Tuple
 
-import anyio
-# import time
 from starlette.applications import Starlette
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
+from device_events import (
+    EVENT_BIND,
+    EVENT_ENUMERATE,
+    EVENT_IMPORT,
+    EVENT_PLUG,
+    EVENT_RESET,
+    EVENT_UNBIND,
+    EVENT_UNPLUG,
+    DeviceTimeline,
+)
+from device_state import DeviceIdIndex, DeviceSnapshot
+from export_policy import ExportPolicy, device_class, read_rejected
+from health import HEALTH_INTERVAL, HealthMonitor, kernel_busid
+from kmsg import KmsgRecord, format_record, is_usb_message, open_kmsg, watch_kmsg
+from log_filter import LOG_FLUSH_INTERVAL, LogPipeline, split_line
+from log_store import LOG_STORE_DIR, SEVERITIES, LogStore
+from loop_monitor import LoopLagMonitor, is_loopback
 from pairing_utils import is_in_pairing_mode
-from usb_reset import reset
+from profiler import SamplingProfiler, profile_response
+from scheduler import POLL_IDLE_INTERVAL, POLL_MIN_INTERVAL, AdaptivePoller, ClientGate, ModeStats
+from syslog_logging import logging_stats, setup_syslog_logging
+from uevent import watch_uevents
+from usb_reset import RECOVERY_STEPS, STEP_REBIND, STEP_RESET, recover
+from usbip_index import BoundDeviceIndex
+from usbmon import UsbmonSampler, device_address, usbmon_available
+from worker_lanes import LANE_CONTROL, LANE_ENUMERATE, LANE_FILES, WorkerLanes
 
 
-def _setup_syslog_logging(tag: str) -> logging.Logger:
-    """
-    Configure logging so messages are sent to syslog (/dev/log) when available.
-    Returns a logger tagged for this app.
-    """
-    root_logger = logging.getLogger()
-    syslog_handler: SysLogHandler | None = None
-
-    for handler in root_logger.handlers:
-        if isinstance(handler, SysLogHandler):
-            syslog_handler = handler
-            break
-
-    if syslog_handler is None:
-        try:
-            syslog_handler = SysLogHandler(address="/dev/log")
-        except OSError:
-            logging.getLogger(tag).warning(
-                "Syslog socket /dev/log not available; using default logging only"
-            )
-        else:
-            formatter = logging.Formatter(f"{tag}: %(levelname)s: %(message)s")
-            syslog_handler.setFormatter(formatter)
-            syslog_handler.setLevel(logging.INFO)
-            root_logger.addHandler(syslog_handler)
-            root_logger.setLevel(logging.INFO)
-
-    logger = logging.getLogger(tag)
-    logger.setLevel(logging.INFO)
-    logger.propagate = True
-    return logger
-
-
-logger = _setup_syslog_logging("beamer-api")
+logger = setup_syslog_logging("beamer-api")
 app = Starlette(debug=False)
 
 
 SCRIPT_DIR = os.path.dirname(__file__)
 LIST_PLUGGED_SCRIPT = os.path.join(SCRIPT_DIR, "list-plugged.sh")
 GET_USB_INFO_SCRIPT = os.path.join(SCRIPT_DIR, "get-usb-info.sh")
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
 DEV_MODE_FLAG = "/boot/devmode"
 LOG_PATH = "/var/log/messages"
-LOG_QUEUE_MAX = 20 # todo: make this configurable
+LOG_QUEUE_MAX = int(os.environ.get("LOG_QUEUE_MAX", 64))
+LONG_POLL_MAX_TIMEOUT = 60.0
+# Lines encoded per worker hop when streaming /api/logs.
+LOG_STREAM_BATCH = 256
+# Lines waiting for the log store writer; further lines are dropped.
+LOG_STORE_QUEUE_MAX = int(os.environ.get("LOG_STORE_QUEUE_MAX", 4096))
+# Optional usbmon traffic sampling of exported devices (needs debugfs).
+USBMON_SAMPLER = os.environ.get("USB_USBMON_SAMPLER", "0") == "1"
+USB_STATS_INTERVAL = float(os.environ.get("USB_STATS_INTERVAL", 5))
+# A USB device busid ("1-1", "1-1.3"); also keeps request input out of sysfs paths.
+BUSID_RE = re.compile(r"\d+-[\d.]+")
+# A plug uevent triggers an enumeration after this pause, which also folds
+# the uevents of a hub full of devices into one run of list-plugged.sh.
+UEVENT_ENUMERATE_DELAY = float(os.environ.get("UEVENT_ENUMERATE_DELAY", 0.1))
+# usbip_status changes raise no uevent, so an exported device is polled at
+# this interval until it is imported (or for at most IMPORT_POLL_WINDOW s).
+IMPORT_POLL_INTERVAL = float(os.environ.get("IMPORT_POLL_INTERVAL", 0.25))
+IMPORT_POLL_WINDOW = float(os.environ.get("IMPORT_POLL_WINDOW", 300))
+# While uevents keep the snapshot current, requests re-enumerate only once it
+# is this old (export decisions can change without a uevent).
+UEVENT_SNAPSHOT_MAX_AGE = float(os.environ.get("UEVENT_SNAPSHOT_MAX_AGE", 30))
 
 
 def _ok(payload: Dict[str, Any], status_code: int = 200) -> JSONResponse:
@@ -78,6 +88,10 @@ def _error(reason: str, status_code: int, extra: Dict[str, Any] | None = None) -
 
 # --- USB helpers (no direct usbip calls from API) --------------------------------
 
+# Same policy file the autobinder uses; reloaded when it changes.
+export_policy = ExportPolicy()
+
+
 def _run_script(path: str, args: List[str] | None = None) -> Tuple[str, str, int]:
     """
     Run a helper script and return (stdout, stderr, returncode).
@@ -100,12 +114,15 @@ def list_plugged_devices() -> List[Dict[str, Any]]:
     """
     Use list-plugged.sh to enumerate attached USB devices.
     Each line from the script is busid,VID:PID.
-    For each busid, also fetch vendor/product strings.
+    For each busid, also fetch vendor/product strings and the export policy
+    decision (plus the reason, if the autobinder has given up on it).
     """
     stdout, stderr, code = _run_script(LIST_PLUGGED_SCRIPT)
     if code != 0:
         logger.error("list-plugged failed (%s): %s", code, stderr.strip())
         return []
+    export_policy.reload_if_changed()
+    rejected = read_rejected()
 
     devices: List[Dict[str, Any]] = []
     for line in stdout.splitlines():
@@ -122,13 +139,18 @@ def list_plugged_devices() -> List[Dict[str, Any]]:
         if not busid or len(vid) != 4 or len(pid) != 4:
             continue
         info = get_usb_info(busid)
+        export = export_policy.decide(busid, vid, pid, device_class(busid)).as_dict()
+        gave_up = rejected.get(busid)
+        export["rejected"] = gave_up.get("reason") if gave_up and gave_up.get("device") == f"{vid}:{pid}" else None
         devices.append(
             {
                 "busid": busid,
                 "vid": vid,
                 "pid": pid,
+                "serial": _read_sysfs_attr(busid, "serial"),
                 "vendor": info.get("vendor", "Unknown Vendor"),
                 "product": info.get("product", "Unknown Device"),
+                "export": export,
             }
         )
 
@@ -137,6 +159,17 @@ def list_plugged_devices() -> List[Dict[str, Any]]:
     return devices
 
 
+def _read_sysfs_attr(busid: str, attr: str) -> str:
+    """
+    Read a single sysfs attribute of a USB device, "" if absent.
+    """
+    try:
+        with open(os.path.join(SYSFS_USB_DEVICES, busid, attr)) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
 def get_usb_info(busid: str) -> Dict[str, str]:
     """
     Resolve vendor/product strings for a busid via get-usb-info.sh.
@@ -166,6 +199,51 @@ def get_usb_info(busid: str) -> Dict[str, str]:
 
 ws_clients: Set[WebSocket] = set()
 log_queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=LOG_QUEUE_MAX)
+# (line, level, ts) for log_store_writer, which appends on the files lane.
+log_store_queue: asyncio.Queue[Tuple[str, str, float]] = asyncio.Queue(maxsize=LOG_STORE_QUEUE_MAX)
+log_store_dropped = 0
+
+# Background watchers park on these gates while nobody is subscribed.
+device_gate = ClientGate()
+log_gate = ClientGate()
+log_pipeline = LogPipeline()
+mode_stats = ModeStats()
+device_poller = AdaptivePoller()
+device_snapshot = DeviceSnapshot()
+device_ids = DeviceIdIndex()
+device_timeline = DeviceTimeline()
+bound_index = BoundDeviceIndex()
+health_monitor = HealthMonitor()
+loop_monitor = LoopLagMonitor()
+profiler = SamplingProfiler()
+# All blocking work runs on these pools (see worker_lanes).
+lanes = WorkerLanes()
+usbmon_sampler = UsbmonSampler()
+_enumerate_lock = asyncio.Lock()
+# Opened at startup; None when disabled (LOG_STORE_DIR="") or unusable.
+log_store: LogStore | None = None
+# True once /dev/kmsg is being read; kernel USB lines then come from there
+# (with exact levels) and their syslog copies are skipped.
+kmsg_active = False
+# True while the uevent socket is read, so plugs trigger enumerations.
+uevents_active = False
+
+
+def _update_mode() -> None:
+    active = device_gate.active or log_gate.active
+    mode_stats.set_mode("active" if active else "idle")
+
+
+def _subscribe() -> None:
+    device_gate.acquire()
+    log_gate.acquire()
+    _update_mode()
+
+
+def _unsubscribe() -> None:
+    device_gate.release()
+    log_gate.release()
+    _update_mode()
 
 
 async def broadcast(payload: Dict[str, Any]) -> None:
@@ -183,31 +261,290 @@ async def broadcast(payload: Dict[str, Any]) -> None:
         ws_clients.discard(ws)
 
 
-async def watch_devices(interval: float = 2.0) -> None:
+async def _sleep_until_subscribed(delay: float) -> None:
+    """
+    Sleep for delay seconds, returning early if a client subscribes meanwhile.
+    """
+    try:
+        await asyncio.wait_for(device_gate.wait_active(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def refresh_devices(max_age: float = 0.0) -> bool:
+    """
+    Re-enumerate devices unless the snapshot is younger than max_age seconds.
+    Concurrent callers share a single enumeration. Broadcasts on change and
+    returns whether the device set changed.
+    """
+    if device_snapshot.age() <= max_age:
+        return False
+    async with _enumerate_lock:
+        if device_snapshot.age() <= max_age:
+            return False
+        devices = await lanes.run(LANE_ENUMERATE, list_plugged_devices)
+        device_ids.assign(devices)
+        first = device_snapshot.generation == 0
+        before = set(device_snapshot.by_busid)
+        if not device_snapshot.update(devices):
+            return False
+    if not first:
+        after = set(device_snapshot.by_busid)
+        for busid in sorted(after - before):
+            await _record_event(busid, EVENT_ENUMERATE)
+        for busid in sorted(before - after):
+            # Normally already recorded from the remove uevent.
+            if device_timeline.in_session(busid):
+                await _record_event(busid, EVENT_UNPLUG)
+    await broadcast({"type": "devices", "devices": devices})
+    logger.info("broadcasted device change to %d clients", len(ws_clients))
+    return True
+
+
+def _usbmon_enabled() -> bool:
+    return USBMON_SAMPLER and usbmon_available()
+
+
+def _sync_usbmon_devices() -> None:
+    """
+    Point the usbmon sampler at the devices currently bound to usbip-host.
+    """
+    addresses = {}
+    for busid in bound_index.busids():
+        address = device_address(busid)
+        if address is not None:
+            addresses[busid] = address
+    usbmon_sampler.set_devices(addresses)
+    usbmon_sampler.ensure_readers()
+
+
+async def _broadcast_usbip_changes(changes: Dict[str, str | None]) -> None:
+    if changes and _usbmon_enabled():
+        await lanes.run(LANE_ENUMERATE, _sync_usbmon_devices)
+    for busid, status in changes.items():
+        await broadcast({"type": "usbip-status", "busid": busid, "status": status or "unbound"})
+        if status is None:
+            await _record_event(busid, EVENT_UNBIND)
+        elif status == "in-use":
+            await _record_event(busid, EVENT_IMPORT)
+        elif status != "error":
+            await _record_event(busid, EVENT_BIND)
+            _watch_import(busid)
+
+
+# busid -> task polling an exported device until it is imported.
+_import_watches: Dict[str, asyncio.Task] = {}
+
+
+def _watch_import(busid: str) -> None:
+    if busid not in _import_watches:
+        _import_watches[busid] = _spawn(_poll_import(busid), f"import-{busid}")
+
+
+async def _poll_import(busid: str) -> None:
+    """
+    Poll one exported device's usbip_status every IMPORT_POLL_INTERVAL, so
+    the import step is timed to that resolution instead of the health
+    watcher's rescan period.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IMPORT_POLL_WINDOW
+    try:
+        while loop.time() < deadline:
+            await asyncio.sleep(IMPORT_POLL_INTERVAL)
+            changes = await lanes.run(LANE_ENUMERATE, bound_index.refresh, busid)
+            await _broadcast_usbip_changes(changes)
+            if bound_index.status(busid) in (None, "in-use"):
+                return
+    finally:
+        _import_watches.pop(busid, None)
+
+
+_enumerate_requested = False
+_enumerate_task: asyncio.Task | None = None
+
+
+def _request_enumeration() -> None:
+    """
+    Enumerate soon, e.g. after a plug uevent, whether or not the device
+    watcher is parked. Requests made while one is pending or running are
+    folded into one more run.
+    """
+    global _enumerate_requested, _enumerate_task
+    _enumerate_requested = True
+    if _enumerate_task is None or _enumerate_task.done():
+        _enumerate_task = _spawn(_enumerate_requested_runs(), "uevent-enumerate")
+
+
+async def _enumerate_requested_runs() -> None:
+    global _enumerate_requested
+    while _enumerate_requested:
+        await asyncio.sleep(UEVENT_ENUMERATE_DELAY)
+        _enumerate_requested = False
+        await refresh_devices()
+
+
+async def refresh_for_request() -> None:
+    """
+    Bring the snapshot up to date for a request. While the watcher is parked
+    nobody polls, so enumerate on demand (bursts of requests share one
+    enumeration); with uevents live the cached snapshot is served until it
+    is UEVENT_SNAPSHOT_MAX_AGE old.
+    """
+    if device_gate.active:
+        return
+    await refresh_devices(max_age=UEVENT_SNAPSHOT_MAX_AGE if uevents_active else POLL_MIN_INTERVAL)
+
+
+async def refresh_bound(max_age: float = 0.0) -> None:
+    """
+    Rescan usbip-host bindings and import state unless the index is younger
+    than max_age seconds, broadcasting any change.
+    """
+    if bound_index.age() <= max_age:
+        return
+    changes = await lanes.run(LANE_ENUMERATE, bound_index.rescan)
+    await _broadcast_usbip_changes(changes)
+
+
+async def _record_event(busid: str, kind: str) -> None:
+    """
+    Add a step to the device timeline and push it to WebSocket clients.
+    """
+    event = device_timeline.record(busid, kind)
+    if "latency_ms" in event:
+        logger.info("device %s %s latency %s", busid, kind, event["latency_ms"])
+    await broadcast({"type": "device-event", **event})
+
+
+async def _on_uevent(event: Dict[str, str]) -> None:
+    """
+    Record plug/unplug on the device timeline and enumerate right away, and
+    update the bound-device index incrementally on usbip-host bind/unbind.
+    """
+    action = event.get("ACTION")
+    if event.get("DEVTYPE") != "usb_device":
+        return
+    busid = os.path.basename(event.get("DEVPATH", ""))
+    if not busid:
+        return
+    if action == "add":
+        await _record_event(busid, EVENT_PLUG)
+        _request_enumeration()
+        return
+    if action == "remove":
+        await _record_event(busid, EVENT_UNPLUG)
+        _request_enumeration()
+        return
+    if action not in ("bind", "unbind"):
+        return
+    changes = await lanes.run(LANE_ENUMERATE, bound_index.refresh, busid)
+    await _broadcast_usbip_changes(changes)
+
+
+async def _on_uevent_loss() -> None:
+    """
+    Uevents were dropped; rescan the state they keep current.
+    """
+    await refresh_bound()
+    await refresh_devices()
+
+
+async def _watch_uevents() -> None:
+    global uevents_active
+    # watch_uevents returns at once if the socket cannot be opened.
+    uevents_active = True
+    try:
+        await watch_uevents(_on_uevent, _on_uevent_loss)
+    finally:
+        uevents_active = False
+
+
+async def watch_devices() -> None:
     """
     Poll the device list and broadcast when it changes.
+
+    Polls quickly right after a change and backs off while the device set is
+    stable. Without subscribers it parks (or polls at POLL_IDLE_INTERVAL),
+    after one enumeration at startup that later uevent-triggered ones are
+    compared against.
     """
-    last_snapshot: list[tuple[str, str, str, str, str]] | None = None
+    started = False
     while True:
+        if started and not device_gate.active and POLL_IDLE_INTERVAL <= 0:
+            await device_gate.wait_active()
+            device_poller.boost()
+
+        started = True
+        mode_stats.wakeup()
+        changed = False
         try:
-            devices = await anyio.to_thread.run_sync(list_plugged_devices)
-            snapshot = [
-                (
-                    d.get("busid", ""),
-                    d.get("vid", ""),
-                    d.get("pid", ""),
-                    d.get("vendor", ""),
-                    d.get("product", ""),
-                )
-                for d in devices
-            ]
-            if snapshot != last_snapshot:
-                await broadcast({"type": "devices", "devices": devices})
-                logger.info("broadcasted device change to %d clients", len(ws_clients))
-                last_snapshot = snapshot
+            first = device_snapshot.generation == 0
+            changed = await refresh_devices() and not first
+            # usbip_status flips on remote import without any uevent, so the
+            # import state is re-read on every tick.
+            await refresh_bound()
         except Exception:
             logger.exception("device watcher failed")
-        await asyncio.sleep(interval)
+
+        if device_gate.active:
+            await asyncio.sleep(device_poller.next_interval(changed))
+        elif POLL_IDLE_INTERVAL > 0:
+            await _sleep_until_subscribed(POLL_IDLE_INTERVAL)
+
+
+async def usb_stats_sender() -> None:
+    """
+    Periodically broadcast usbmon traffic statistics while clients are subscribed.
+    """
+    if not _usbmon_enabled():
+        return
+    while True:
+        await device_gate.wait_active()
+        await broadcast({"type": "usb-stats", "devices": usbmon_sampler.snapshot()})
+        await asyncio.sleep(USB_STATS_INTERVAL)
+
+
+async def _heal(busid: str, reasons: List[str]) -> None:
+    """
+    Reset a stalled device, escalating as far as a driver rebind.
+    """
+    logger.warning("device %s stalled (%s); resetting", busid, ", ".join(reasons))
+    result = await lanes.run(
+        LANE_CONTROL,
+        lambda: recover(busid, last_step=STEP_REBIND, stalled=health_monitor.still_stalled),
+    )
+    health_monitor.record_reset(busid, result["ok"])
+    await broadcast({"type": "health", "action": "reset", "reasons": reasons, **result})
+    await _record_event(busid, EVENT_RESET)
+    if not result["ok"]:
+        logger.warning("automatic reset failed for %s: %s", busid, result["steps"])
+    # The reset may have changed usbip_status; report it straight away.
+    await refresh_bound()
+
+
+async def health_watcher() -> None:
+    """
+    Check exported devices for stalls every HEALTH_INTERVAL seconds and
+    reset them within the health policy. Runs with or without subscribers.
+    """
+    while True:
+        await asyncio.sleep(HEALTH_INTERVAL)
+        mode_stats.wakeup()
+        try:
+            await refresh_bound(max_age=HEALTH_INTERVAL / 2)
+            health_monitor.sync_status(bound_index.snapshot())
+            if _usbmon_enabled():
+                health_monitor.note_traffic(usbmon_sampler.snapshot())
+            for action in health_monitor.evaluate():
+                if action["action"] == "reset":
+                    await _heal(action["busid"], action["reasons"])
+                    continue
+                if action["action"] != "cleared":
+                    logger.warning("device %s health: %s", action["busid"], action)
+                await broadcast({"type": "health", **action})
+        except Exception:
+            logger.exception("health watcher failed")
 
 
 def _extract_level(line: str) -> str:
@@ -250,50 +587,169 @@ async def log_sender() -> None:
     """
     while True:
         payload = await log_queue.get()
+        mode_stats.wakeup()
         await broadcast(payload)
 
 
-async def log_watcher() -> None:
+async def log_flusher() -> None:
     """
-    Tail system logs and push over WebSocket. Sends all logs in devmode,
-    otherwise only warnings/errors and above.
+    Release what log_pipeline holds back (repeat summaries, rate-limited
+    errors) every LOG_FLUSH_INTERVAL, whichever source fed it and whether
+    or not the tail is running. Parks while nobody is subscribed.
     """
-    if not os.path.exists(LOG_PATH):
-        logger.warning("log watcher skipped; %s missing", LOG_PATH)
-        return
+    while True:
+        if not log_gate.active:
+            await log_gate.wait_active()
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        for payload in log_pipeline.flush():
+            await _enqueue_log(payload)
 
-    cmd = ["tail", "-n", "0", "-F", LOG_PATH]
-    try:
-        proc = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-    except FileNotFoundError:
-        logger.warning("tail not found; log watcher disabled")
-        return
-    except Exception as exc:
-        logger.exception("failed to start log watcher: %s", exc)
-        return
 
-    logger.info("log watcher started")
+async def _pump_log_lines(proc: asyncio.subprocess.Process) -> None:
+    """
+    Forward lines from the tail process until it exits, folding repeats and
+    rate limiting through log_pipeline (flushed by log_flusher).
+    """
     try:
         while True:
             line = await proc.stdout.readline()
             if not line:
-                if proc.returncode is not None:
-                    logger.warning("log watcher exited with code %s", proc.returncode)
-                    break
-                await asyncio.sleep(0.2)
-                continue
+                await proc.wait()
+                return
+            mode_stats.wakeup()
             text = line.decode(errors="replace").rstrip("\r\n")
+            if kmsg_active and _is_kernel_usb_line(text):
+                continue
             level = _extract_level(text)
-            if not _should_emit_log(level):
+            _store_log(text, level)
+            if not log_gate.active or not _should_emit_log(level):
                 continue
-            await _enqueue_log({"type": "log", "level": level, "line": text})
+            for payload in log_pipeline.feed(text, level):
+                await _enqueue_log(payload)
+    except asyncio.CancelledError:
+        raise
     except Exception:
         logger.exception("log watcher failed")
-    finally:
-        if proc.returncode is None:
-            proc.terminate()
+
+
+def _is_kernel_usb_line(text: str) -> bool:
+    source, key = split_line(text)
+    return source == "kernel" and is_usb_message(key[len("kernel: "):])
+
+
+async def _on_kmsg(record: KmsgRecord) -> None:
+    """
+    Feed a USB kernel record into the log store and the WebSocket stream.
+    """
+    mode_stats.wakeup()
+    if record.level in ("emerg", "alert", "crit", "err"):
+        busid = kernel_busid(record.message)
+        if busid is not None:
+            health_monitor.note_kernel_error(busid)
+    text = format_record(record)
+    # kmsg timestamps are monotonic; convert to wall time for the store.
+    ts = time.time() - (time.monotonic() - record.usec / 1e6)
+    _store_log(text, record.level, ts)
+    if not log_gate.active or not _should_emit_log(record.level):
+        return
+    fields = {
+        "seq": record.seq,
+        "monotonic": record.usec / 1e6,
+        "subsystem": record.subsystem,
+        "device": record.device,
+    }
+    for payload in log_pipeline.feed(text, record.level, source="kernel", fields=fields):
+        await _enqueue_log(payload)
+
+
+def _store_log(text: str, level: str, ts: float | None = None) -> None:
+    """
+    Hand a line to log_store_writer. Never blocks the loop; lines are
+    dropped (and counted) while the writer is behind.
+    """
+    global log_store_dropped
+    if log_store is None:
+        return
+    try:
+        log_store_queue.put_nowait((text, level, time.time() if ts is None else ts))
+    except asyncio.QueueFull:
+        log_store_dropped += 1
+
+
+def _write_log_lines(store: LogStore, lines: List[Tuple[str, str, float]]) -> None:
+    for text, level, ts in lines:
+        store.append(text, level, ts=ts)
+    store.seal_if_stale()
+
+
+async def log_store_writer() -> None:
+    """
+    Append queued lines to the log store on the files lane, up to
+    LOG_STREAM_BATCH per hop, so compression and file writes stay off the
+    event loop. Also seals stale blocks every LOG_FLUSH_INTERVAL while idle.
+    """
+    while True:
+        lines = []
+        try:
+            lines.append(await asyncio.wait_for(log_store_queue.get(), LOG_FLUSH_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+        while len(lines) < LOG_STREAM_BATCH and not log_store_queue.empty():
+            lines.append(log_store_queue.get_nowait())
+        if log_store is None:
+            continue
+        try:
+            await lanes.run(LANE_FILES, _write_log_lines, log_store, lines)
+        except Exception:
+            logger.exception("log store write failed")
+
+
+async def log_watcher() -> None:
+    """
+    Tail system logs into the log store and push them over WebSocket. Sends
+    all logs in devmode, otherwise only warnings/errors and above.
+
+    Without a log store the tail process only runs while at least one
+    client is subscribed.
+    """
+    if not os.path.exists(LOG_PATH):
+        logger.warning("log watcher skipped; %s missing", LOG_PATH)
+        return
+
+    cmd = ["tail", "-n", "0", "-F", LOG_PATH]
+    while True:
+        if log_store is None:
+            await log_gate.wait_active()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            logger.warning("tail not found; log watcher disabled")
+            return
+        except Exception as exc:
+            logger.exception("failed to start log watcher: %s", exc)
+            return
+
+        logger.info("log watcher started")
+        pump = asyncio.create_task(_pump_log_lines(proc))
+        # With a store the tail keeps running for history; this never fires.
+        idle = asyncio.create_task(
+            log_gate.wait_idle() if log_store is None else asyncio.Event().wait()
+        )
+        try:
+            done, _ = await asyncio.wait({pump, idle}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            pump.cancel()
+            idle.cancel()
+            if proc.returncode is None:
+                proc.terminate()
+                await proc.wait()
+
+        if pump in done:
+            logger.warning("log watcher exited with code %s", proc.returncode)
+            return
+        logger.info("log watcher suspended; no subscribers")
 
 
 def reboot() -> None:
@@ -301,89 +757,459 @@ def reboot() -> None:
     Reboot the beamer.
     """
     subprocess.run(["reboot"], check=False)
-    broadcast({"type": "warning", "message": "rebooting beamer"})
     logger.info("rebooted beamer")
 
+
+async def _in_pairing_mode() -> bool:
+    """
+    is_in_pairing_mode() reads several files; keep it off the event loop.
+    """
+    return await lanes.run(LANE_FILES, is_in_pairing_mode)
+
 # --- HTTP & WebSocket API -----------------------------------------------------
 @app.route("/api/uptime", methods=["GET"])
 async def api_uptime(request: Request) -> JSONResponse:
     """
     Get the uptime of the beamer.
     """
-    uptime = os.path.getmtime("/proc/uptime")
+    uptime = await lanes.run(LANE_FILES, os.path.getmtime, "/proc/uptime")
     return _ok({"uptime": uptime})
 
+@app.route("/api/scheduler-stats", methods=["GET"])
+async def api_scheduler_stats(request: Request) -> JSONResponse:
+    """
+    Wakeups per minute and CPU usage of the background watchers, per mode.
+    """
+    stats = mode_stats.snapshot()
+    stats["subscribers"] = device_gate.count
+    stats["poll_interval"] = device_poller.interval if device_gate.active else None
+    stats["logging"] = logging_stats()
+    stats["log_stream"] = log_pipeline.stats()
+    stats["log_store"] = log_store.stats() if log_store is not None else None
+    if log_store is not None:
+        stats["log_store"].update(queued=log_store_queue.qsize(), dropped=log_store_dropped)
+    stats["lanes"] = lanes.stats()
+    return _ok(stats)
+
+@app.route("/api/health", methods=["GET"])
+async def api_health(request: Request) -> JSONResponse:
+    """
+    Stall state of exported devices, the self-healing policy and mean time
+    to recovery.
+    """
+    return _ok(health_monitor.snapshot())
+
+
+@app.route("/api/debug/loop", methods=["GET"])
+async def api_debug_loop(request: Request) -> JSONResponse:
+    """
+    Event-loop lag histogram and, in debug mode, the call sites that blocked
+    the loop. Localhost only; ?debug=1 / ?debug=0 switches stack sampling.
+    """
+    if not is_loopback(request.client.host if request.client else None):
+        return _error("forbidden", status_code=403)
+    debug = request.query_params.get("debug")
+    if debug is not None:
+        loop_monitor.set_debug(debug == "1")
+    return _ok(loop_monitor.snapshot())
+
+
+@app.route("/api/debug/profile", methods=["GET"])
+async def api_debug_profile(request: Request) -> Response:
+    """
+    Sample every thread's stack for ?seconds=N (default 5) and return
+    collapsed stacks for flame-graph tools. Localhost and devmode only; one
+    profile at a time.
+    """
+    return await profile_response(request, profiler, _devmode)
+
+
+async def _devmode() -> bool:
+    return await lanes.run(LANE_FILES, os.path.exists, DEV_MODE_FLAG)
+
+
+@app.route("/api/events", methods=["GET"])
+async def api_events(request: Request) -> JSONResponse:
+    """
+    Device lifecycle timeline (plug, enumerate, bind, import, reset,
+    unbind, unplug per busid, monotonic timestamps) and the latency
+    distributions derived from it.
+
+    Resolution: plug, bind and unplug come from uevents. Enumerate follows
+    a plug uevent after UEVENT_ENUMERATE_DELAY. Import is polled every
+    IMPORT_POLL_INTERVAL after bind. The response reports both delays as
+    "resolution_ms".
+
+    ?since=<seq> returns only newer events, ?busid= filters, ?limit= keeps
+    the most recent N.
+    """
+    params = request.query_params
+    try:
+        since = int(params.get("since") or 0)
+        limit = int(params["limit"]) if params.get("limit") else None
+    except ValueError:
+        return _error("invalid_parameter", status_code=400)
+    return _ok({
+        "seq": device_timeline.seq,
+        "events": device_timeline.events(since, params.get("busid") or None, limit),
+        "latency": device_timeline.latency(),
+        "resolution_ms": {
+            "enumerate": UEVENT_ENUMERATE_DELAY * 1000,
+            "import": IMPORT_POLL_INTERVAL * 1000,
+        },
+    })
+
+
+def _parse_time(raw: str | None, now: float) -> float | None:
+    """
+    Epoch seconds, or seconds relative to now when negative (e.g. -600).
+    """
+    if raw is None or raw == "":
+        return None
+    value = float(raw)
+    return now + value if value < 0 else value
+
+
+async def _ndjson(entries: Iterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Encode query results on the files lane, LOG_STREAM_BATCH lines per hop.
+    """
+    def next_chunk() -> str:
+        return "".join(json.dumps(e) + "\n" for e in itertools.islice(entries, LOG_STREAM_BATCH))
+
+    while True:
+        chunk = await lanes.run(LANE_FILES, next_chunk)
+        if not chunk:
+            return
+        yield chunk
+
+
+@app.route("/api/logs", methods=["GET"])
+async def api_logs(request: Request) -> Response:
+    """
+    Query the log store. Streams newline-delimited JSON objects
+    {"ts", "level", "line"} in time order.
+
+    ?since=&until= are epoch seconds (negative = relative to now), ?level=
+    keeps that severity and worse, ?grep= is a case-insensitive substring
+    and ?limit= caps the number of lines.
+    """
+    if log_store is None:
+        return _error("log_store_disabled", status_code=404)
+    params = request.query_params
+    now = time.time()
+    try:
+        since = _parse_time(params.get("since"), now)
+        until = _parse_time(params.get("until"), now)
+        limit = int(params["limit"]) if params.get("limit") else None
+    except ValueError:
+        return _error("invalid_parameter", status_code=400)
+    level = params.get("level") or None
+    if level is not None and level.lower() not in SEVERITIES:
+        return _error("invalid_level", status_code=400)
+
+    entries = log_store.query(since, until, level, params.get("grep") or None, limit)
+    return StreamingResponse(_ndjson(entries), media_type="application/x-ndjson")
+
+
 @app.route("/api/reboot-beamer", methods=["GET"])
 async def api_reboot_beamer(request: Request) -> JSONResponse:
     """
     Reboot the beamer.
     """
+    # Warn clients first; the connection goes away with the reboot.
+    await broadcast({"type": "warning", "message": "rebooting beamer"})
     try:
-        await anyio.to_thread.run_sync(reboot)
+        await lanes.run(LANE_CONTROL, reboot)
         return _ok({"status": "ok"})
     except Exception as exc:
         logger.exception("reboot failed")
         return _error("reboot_failed", status_code=500, extra={"detail": str(exc)})
 
+def _snapshot_response(request: Request, body: bytes | None = None) -> Response:
+    """
+    Serve the cached snapshot body (or a view of it cached alongside), or
+    304 if the client already has it.
+    """
+    etag = device_snapshot.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    if body is None:
+        body = device_snapshot.body()
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @app.route("/api/list-devices", methods=["GET"])
-async def api_list_devices(request: Request) -> JSONResponse:
+async def api_list_devices(request: Request) -> Response:
+    """
+    List USB devices from the in-memory snapshot. Not available in pairing mode.
+
+    The response carries an ETag derived from the snapshot generation and
+    honours If-None-Match. With ?wait=<generation>[&timeout=<s>] the request
+    is held until the device set moves past that generation (or the timeout
+    expires, in which case the unchanged snapshot is returned).
+    """
+    if await _in_pairing_mode():
+        return _error("pairing_mode_enabled", status_code=403)
+
+    wait_raw = request.query_params.get("wait")
+    try:
+        wait = int(wait_raw) if wait_raw is not None else None
+        timeout = float(request.query_params.get("timeout", 30))
+    except ValueError:
+        return _error("invalid_query", status_code=400)
+    timeout = min(max(timeout, 0.0), LONG_POLL_MAX_TIMEOUT)
+
+    await refresh_for_request()
+
+    if wait is not None and wait == device_snapshot.generation:
+        # Long-pollers count as subscribers so the watcher keeps polling.
+        device_gate.acquire()
+        _update_mode()
+        try:
+            await device_snapshot.wait_changed(wait, timeout)
+        finally:
+            device_gate.release()
+            _update_mode()
+
+    return _snapshot_response(request)
+
+
+# --- Zeroforce USB API (see api.md) -----------------------------------------
+
+def _lsusb_entries(devices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": d["id"],
+            "vid": d["vid"],
+            "pid": d["pid"],
+            "device_name": f"{d['vendor']} {d['product']}",
+            "export": d["export"]["decision"],
+        }
+        for d in devices
+    ]
+
+
+def _bound_entry(busid: str) -> Dict[str, Any]:
+    """
+    Describe a bound device, preferring the snapshot over sysfs reads.
+    """
+    dev_id = device_ids.id_for(busid)
+    status = bound_index.status(busid)
+    device = device_snapshot.by_busid.get(busid)
+    if device is not None:
+        vid, pid = device["vid"], device["pid"]
+    else:
+        vid = _read_sysfs_attr(busid, "idVendor").upper()
+        pid = _read_sysfs_attr(busid, "idProduct").upper()
+    return {"id": dev_id, "vid": vid, "pid": pid, "busid": busid, "status": status}
+
+
+@app.route("/zeroforce/lsusb", methods=["GET"])
+async def zeroforce_lsusb(request: Request) -> Response:
     """
-    List USB devices using helper scripts (no usbip calls). Not available in pairing mode.
+    List plugged devices with their abstracted IDs. Not available in pairing mode.
     """
-    if is_in_pairing_mode():
+    if await _in_pairing_mode():
         return _error("pairing_mode_enabled", status_code=403)
 
-    devices = await anyio.to_thread.run_sync(list_plugged_devices)
-    return _ok({"devices": devices})
+    await refresh_for_request()
+    return _snapshot_response(request, device_snapshot.cached("lsusb", _lsusb_entries))
+
+
+@app.route("/zeroforce/ls-bounded", methods=["GET"])
+async def zeroforce_ls_bounded(request: Request) -> JSONResponse:
+    """
+    List devices currently bound to usbip-host with their abstracted IDs.
+    Not available in pairing mode.
+    """
+    if await _in_pairing_mode():
+        return _error("pairing_mode_enabled", status_code=403)
+
+    await refresh_for_request()
+    if not device_gate.active:
+        await refresh_bound(max_age=POLL_MIN_INTERVAL)
+    return JSONResponse([_bound_entry(busid) for busid in bound_index.busids()])
+
+
+@app.route("/api/usbip-status", methods=["GET"])
+async def api_usbip_status(request: Request) -> JSONResponse:
+    """
+    usbip state per bound busid: "available", "in-use", "error" or "bound".
+    Not available in pairing mode.
+    """
+    if await _in_pairing_mode():
+        return _error("pairing_mode_enabled", status_code=403)
+
+    if not device_gate.active:
+        await refresh_bound(max_age=POLL_MIN_INTERVAL)
+    return _ok({"devices": bound_index.snapshot()})
+
+
+@app.route("/api/export-policy", methods=["GET"])
+async def api_export_policy(request: Request) -> JSONResponse:
+    """
+    The active export policy and the devices the autobinder has given up on.
+    """
+    def _read() -> Dict[str, Any]:
+        export_policy.reload_if_changed()
+        return {"policy": export_policy.describe(), "rejected": read_rejected()}
+
+    return _ok(await lanes.run(LANE_FILES, _read))
+
+
+@app.route("/api/usb-stats", methods=["GET"])
+async def api_usb_stats(request: Request) -> JSONResponse:
+    """
+    Per-busid bandwidth, URB rate and URB latency histogram from usbmon.
+    Not available in pairing mode.
+    """
+    if await _in_pairing_mode():
+        return _error("pairing_mode_enabled", status_code=403)
+    if not _usbmon_enabled():
+        return _error("usbmon_disabled", status_code=404)
+    return _ok({"devices": usbmon_sampler.snapshot()})
+
+
+@app.route("/zeroforce/bind", methods=["POST"])
+async def zeroforce_bind(request: Request) -> JSONResponse:
+    """
+    Deprecated: binding is handled by the usbip-autobinder service.
+    """
+    return _error("bind_deprecated", status_code=410)
 
 
 @app.route("/api/reset-device", methods=["POST"])
 async def api_reset_device(request: Request) -> JSONResponse:
     """
     Reset a USB device and notify WebSocket clients.
+
+    {"busid": "1-1.3"} issues a USBDEVFS_RESET. With "escalate": true the
+    reset escalates to a hub port power cycle and then a driver rebind
+    until the device comes back; "from" starts at a later step
+    ("port_cycle" or "rebind"). The response lists each step with timing.
     """
     try:
         data = await request.json()
     except json.JSONDecodeError:
         data = {}
-    busid = data.get("busid") if isinstance(data, dict) else None
+    if not isinstance(data, dict):
+        data = {}
+    busid = data.get("busid")
     if not busid:
         return _error("missing_busid", status_code=400)
+    if not isinstance(busid, str) or not BUSID_RE.fullmatch(busid):
+        return _error("invalid_busid", status_code=400)
+    first_step = data.get("from") or STEP_RESET
+    if first_step not in RECOVERY_STEPS:
+        return _error("invalid_step", status_code=400)
+    last_step = STEP_REBIND if data.get("escalate") or first_step != STEP_RESET else STEP_RESET
 
-    try:
-        await anyio.to_thread.run_sync(reset, busid)
-        await broadcast({"type": "reset", "busid": busid, "ok": True})
-        return _ok({"status": "ok"})
-    except Exception as exc:
-        logger.exception("reset failed for %s", busid)
-        return _error("reset_failed", status_code=500, extra={"detail": str(exc)})
+    result = await lanes.run(
+        LANE_CONTROL,
+        lambda: recover(
+            busid, first_step=first_step, last_step=last_step, stalled=health_monitor.still_stalled
+        ),
+    )
+    await broadcast({"type": "reset", **result})
+    await _record_event(busid, EVENT_RESET)
+    if not result["ok"]:
+        logger.warning("reset failed for %s: %s", busid, result["steps"])
+        return _error("reset_failed", status_code=500, extra={"detail": result["steps"]})
+    return _ok({"status": "ok", "recovered_by": result["recovered_by"], "steps": result["steps"]})
 
 
 @app.websocket_route("/api/ws")
 async def api_ws(websocket: WebSocket) -> None:
     await websocket.accept()
-    if is_in_pairing_mode():
+    if await _in_pairing_mode():
         await websocket.send_text(json.dumps({"type": "error", "error": "Not available in pairing mode"}))
         await websocket.close()
         return
 
     ws_clients.add(websocket)
+    _subscribe()
     try:
-        devices = await anyio.to_thread.run_sync(list_plugged_devices)
-        await websocket.send_text(json.dumps({"type": "devices", "devices": devices}))
+        await refresh_devices(max_age=POLL_MIN_INTERVAL)
+        await websocket.send_text(
+            json.dumps({"type": "devices", "devices": device_snapshot.devices})
+        )
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
         pass
     finally:
         ws_clients.discard(websocket)
+        _unsubscribe()
+
+
+def _open_log_store() -> LogStore | None:
+    if not LOG_STORE_DIR:
+        return None
+    try:
+        return LogStore(LOG_STORE_DIR)
+    except OSError as exc:
+        logger.warning("log store disabled; cannot use %s: %s", LOG_STORE_DIR, exc)
+        return None
+
+
+# Background tasks: the watchers started at startup and short-lived ones
+# such as uevent-triggered enumerations. Holding them here keeps them from
+# being garbage collected; they are cancelled on shutdown.
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error("background task %s failed", task.get_name(), exc_info=exc)
+
+
+def _spawn(coro: Coroutine[Any, Any, None], name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
 
 
 @app.on_event("startup")
 async def _start_watch() -> None:
-    asyncio.create_task(watch_devices())
-    asyncio.create_task(log_watcher())
-    asyncio.create_task(log_sender())
+    global log_store, kmsg_active
+    log_store = await lanes.run(LANE_FILES, _open_log_store)
+    kmsg_fd = open_kmsg()
+    if kmsg_fd is not None:
+        kmsg_active = True
+        _spawn(watch_kmsg(_on_kmsg, kmsg_fd), "watch_kmsg")
+    _spawn(loop_monitor.run(), "loop_monitor")
+    _spawn(watch_devices(), "watch_devices")
+    _spawn(_watch_uevents(), "watch_uevents")
+    _spawn(usb_stats_sender(), "usb_stats_sender")
+    _spawn(health_watcher(), "health_watcher")
+    _spawn(log_watcher(), "log_watcher")
+    _spawn(log_sender(), "log_sender")
+    _spawn(log_store_writer(), "log_store_writer")
+    _spawn(log_flusher(), "log_flusher")
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    tasks = list(_background_tasks)
+    for task in tasks:
+        task.cancel()
+    # The log store writer is among them; it must stop before the store
+    # is drained and closed below.
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if log_store is not None:
+        lines = []
+        while not log_store_queue.empty():
+            lines.append(log_store_queue.get_nowait())
+        await lanes.run(LANE_FILES, _write_log_lines, log_store, lines)
+        await lanes.run(LANE_FILES, log_store.close)
 
 
 if __name__ == "__main__":
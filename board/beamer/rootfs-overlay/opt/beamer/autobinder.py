@@ -0,0 +1,193 @@
+"""
+Bind plugged USB devices to usbip-host as allowed by the export policy.
+
+Run by usbip-autobinder.sh. Every AUTOBIND_INTERVAL seconds the devices in
+sysfs are checked against the compiled export policy (reloaded when the
+file changes or on SIGHUP). Devices the policy denies, and devices whose
+bind failed AUTOBIND_MAX_ATTEMPTS times, are remembered by busid and
+identity and not tried again until they are unplugged or the policy is
+reloaded. That list is published in EXPORT_REJECTED_PATH for the API.
+
+Bound devices are left alone between reloads. On the first pass and after
+a reload they are checked against the policy too, and the ones it now denies are
+unbound (retried every pass until usbip unbind succeeds).
+"""
+import logging
+import os
+import signal
+import subprocess
+import time
+from typing import Dict, List, Set, Tuple
+
+from export_policy import ExportPolicy, device_class, write_rejected
+from syslog_logging import setup_syslog_logging
+from usbip_index import SYSFS_USB_DEVICES, USBIP_HOST_DRIVER_DIR
+
+AUTOBIND_INTERVAL = float(os.environ.get("AUTOBIND_INTERVAL", 10))
+AUTOBIND_MAX_ATTEMPTS = int(os.environ.get("AUTOBIND_MAX_ATTEMPTS", 3))
+
+HUB_CLASS = "09"
+
+# Same logger setup_syslog_logging() configures in main().
+logger = logging.getLogger("usbip-autobinder")
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def plugged_devices(devices_dir: str = SYSFS_USB_DEVICES) -> List[Tuple[str, str, str, str]]:
+    """
+    (busid, vid, pid, serial) of every plugged non-hub device, like
+    list-plugged.sh.
+    """
+    devices = []
+    try:
+        entries = os.listdir(devices_dir)
+    except OSError:
+        return []
+    for busid in entries:
+        if ":" in busid:
+            continue
+        base = os.path.join(devices_dir, busid)
+        vid = _read(os.path.join(base, "idVendor"))
+        if not vid or _read(os.path.join(base, "bDeviceClass")) == HUB_CLASS:
+            continue
+        devices.append((busid, vid, _read(os.path.join(base, "idProduct")), _read(os.path.join(base, "serial"))))
+    return sorted(devices)
+
+
+class Autobinder:
+    def __init__(self, policy: ExportPolicy) -> None:
+        self.policy = policy
+        # busid -> {"device", "identity", "reason", "rule"}
+        self.rejected: Dict[str, Dict[str, str]] = {}
+        self._failures: Dict[str, int] = {}
+        # Bound devices to re-check against the policy on the next pass.
+        self._recheck: Set[str] = set()
+        self._started = False
+        self._reload = False
+
+    def request_reload(self, *_: object) -> None:
+        self._reload = True
+
+    def _usbip(self, action: str, busid: str) -> Tuple[bool, str]:
+        try:
+            result = subprocess.run(
+                ["usbip", action, "-b", busid], capture_output=True, text=True, check=False
+            )
+        except OSError as exc:
+            return False, str(exc)
+        return result.returncode == 0, (result.stderr or result.stdout).strip()
+
+    def tick(self) -> bool:
+        """
+        One pass over the plugged devices. Returns whether the rejected set
+        changed.
+        """
+        changed = False
+        reloaded = self.policy.load() if self._reload else self.policy.reload_if_changed()
+        self._reload = False
+        devices = plugged_devices()
+        if reloaded:
+            # Decisions may differ now; give every device a fresh chance.
+            changed = bool(self.rejected)
+            self.rejected.clear()
+            self._failures.clear()
+        if reloaded or not self._started:
+            # Devices bound before startup were never checked either.
+            self._recheck = {busid for busid, *_ in devices if self._is_bound(busid)}
+            self._started = True
+
+        present = set()
+        for busid, vid, pid, serial in devices:
+            present.add(busid)
+            identity = f"{vid}:{pid}:{serial}"
+            known = self.rejected.get(busid)
+            if known is not None:
+                if known["identity"] == identity:
+                    continue
+                del self.rejected[busid]  # something else is plugged in there now
+                self._failures.pop(busid, None)
+                changed = True
+            bound = self._is_bound(busid)
+            if bound and busid not in self._recheck:
+                continue
+
+            decision = self.policy.decide(busid, vid, pid, device_class(busid))
+            if bound:
+                if decision.allowed:
+                    self._recheck.discard(busid)
+                    continue
+                ok, output = self._usbip("unbind", busid)
+                if not ok:
+                    logger.warning("unbind %s failed: %s", busid, output)
+                    continue
+                logger.info("unbound %s (%s:%s): now denied by %s", busid, vid, pid, decision.rule)
+                self._recheck.discard(busid)
+            if not decision.allowed:
+                logger.info("not exporting %s (%s:%s): denied by %s", busid, vid, pid, decision.rule)
+                self._reject(busid, vid, pid, identity, "policy", decision.rule)
+                changed = True
+                continue
+
+            ok, output = self._usbip("bind", busid)
+            if ok:
+                logger.info("bound %s (%s:%s)", busid, vid, pid)
+                self._failures.pop(busid, None)
+                continue
+            attempts = self._failures.get(busid, 0) + 1
+            self._failures[busid] = attempts
+            logger.warning("bind %s failed (%d/%d): %s", busid, attempts, AUTOBIND_MAX_ATTEMPTS, output)
+            if attempts >= AUTOBIND_MAX_ATTEMPTS:
+                self._reject(busid, vid, pid, identity, "bind_failed", decision.rule)
+                changed = True
+
+        for busid in [b for b in self.rejected if b not in present]:
+            del self.rejected[busid]
+            changed = True
+        for busid in [b for b in self._failures if b not in present]:
+            del self._failures[busid]
+        self._recheck &= present
+        return changed
+
+    @staticmethod
+    def _is_bound(busid: str) -> bool:
+        return os.path.islink(os.path.join(USBIP_HOST_DRIVER_DIR, busid))
+
+    def _reject(self, busid: str, vid: str, pid: str, identity: str, reason: str, rule: str) -> None:
+        self.rejected[busid] = {
+            "device": f"{vid}:{pid}".upper(),
+            "identity": identity,
+            "reason": reason,
+            "rule": rule,
+        }
+
+    def run(self) -> None:
+        publish = True  # clear whatever a previous run left behind
+        while True:
+            try:
+                publish = self.tick() or publish
+                if publish:
+                    write_rejected(self.rejected)
+                    publish = False
+            except Exception:
+                logger.exception("autobind pass failed")
+            time.sleep(AUTOBIND_INTERVAL)
+
+
+def main() -> None:
+    setup_syslog_logging("usbip-autobinder")
+    policy = ExportPolicy()
+    policy.load()
+    binder = Autobinder(policy)
+    signal.signal(signal.SIGHUP, binder.request_reload)
+    binder.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Precomputed answers for OS connectivity probes on the provisioning AP.
+
+Every phone or laptop that joins the AP fires a burst of captive-portal
+checks. They are all answered with the same redirect to the Wi‑Fi page, so
+the ASGI messages are built once at import and replayed from a dict lookup
+without entering the router or the template engine.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# Address of the provisioning AP (see S49provision / dnsmasq.conf).
+PORTAL_HOST = "192.168.4.1"
+PORTAL_URL = f"http://{PORTAL_HOST}/wifi"
+
+# Paths requested by connectivity checks, regardless of host.
+PROBE_PATHS = frozenset(
+    {
+        "/",
+        "/generate_204",  # Android, ChromeOS
+        "/gen_204",
+        "/hotspot-detect.html",  # Apple
+        "/library/test/success.html",
+        "/connecttest.txt",  # Windows 10+
+        "/ncsi.txt",  # Windows 7/8
+        "/redirect",
+        "/success.txt",  # Firefox
+        "/canonical.html",
+        "/check_network_status.txt",  # NetworkManager (GNOME)
+        "/kindle-wifi/wifistub.html",  # Kindle
+        "/mobile/status.php",  # various Android vendors
+    }
+)
+
+# Hosts only ever contacted for connectivity checks: any path is a probe.
+PROBE_HOSTS = frozenset(
+    {
+        "connectivitycheck.gstatic.com",
+        "connectivitycheck.android.com",
+        "clients1.google.com",
+        "clients3.google.com",
+        "play.googleapis.com",
+        "captive.apple.com",
+        "www.appleiphonecell.com",
+        "www.ibook.info",
+        "www.itools.info",
+        "www.airport.us",
+        "www.thinkdifferent.us",
+        "www.msftconnecttest.com",
+        "www.msftncsi.com",
+        "ipv6.msftconnecttest.com",
+        "detectportal.firefox.com",
+        "nmcheck.gnome.org",
+        "connectivity-check.ubuntu.com",
+        "network-test.debian.org",
+        "spectrum.s3.amazonaws.com",
+        "connect.rom.miui.com",
+        "connectivitycheck.platform.hicloud.com",
+        "conn1.oppomobile.com",
+    }
+)
+
+Message = Dict[str, Any]
+Send = Callable[[Message], Awaitable[None]]
+
+_BODY = f'<html><body><a href="{PORTAL_URL}">Beamer Wi‑Fi setup</a></body></html>'.encode()
+_START: Message = {
+    "type": "http.response.start",
+    "status": 302,
+    "headers": [
+        (b"location", PORTAL_URL.encode()),
+        (b"content-type", b"text/html; charset=utf-8"),
+        (b"content-length", str(len(_BODY)).encode()),
+        (b"cache-control", b"no-store"),
+        (b"connection", b"close"),
+    ],
+}
+_BODY_MESSAGE: Message = {"type": "http.response.body", "body": _BODY}
+_HEAD_BODY_MESSAGE: Message = {"type": "http.response.body", "body": b""}
+
+
+def _host(headers: List[Tuple[bytes, bytes]]) -> str:
+    for name, value in headers:
+        if name == b"host":
+            return value.decode("latin-1").split(":", 1)[0].lower()
+    return ""
+
+
+def is_probe(host: str, path: str) -> bool:
+    if host in PROBE_HOSTS:
+        return True
+    return path in PROBE_PATHS
+
+
+class CaptiveProbeMiddleware:
+    """
+    ASGI middleware that answers connectivity probes with the precomputed
+    redirect and passes everything else to the wrapped app.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]]) -> None:
+        self.app = app
+        self.probes_served = 0
+
+    async def __call__(self, scope: Message, receive: Any, send: Send) -> None:
+        if scope["type"] == "http" and is_probe(_host(scope["headers"]), scope["path"]):
+            self.probes_served += 1
+            await send(_START)
+            await send(_HEAD_BODY_MESSAGE if scope["method"] == "HEAD" else _BODY_MESSAGE)
+            return
+        await self.app(scope, receive, send)
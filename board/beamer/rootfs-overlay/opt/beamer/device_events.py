@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+# Lifecycle steps of an exported device, in the order they normally happen.
+EVENT_PLUG = "plug"  # kernel add uevent
+EVENT_ENUMERATE = "enumerate"  # first seen by list-plugged.sh
+EVENT_BIND = "bind"  # bound to usbip-host (exported)
+EVENT_IMPORT = "import"  # attached by a remote client (usbip_status in-use)
+EVENT_RESET = "reset"
+EVENT_UNBIND = "unbind"
+EVENT_UNPLUG = "unplug"
+
+# (from, to) step pairs whose latency is tracked per device session.
+LATENCY_PAIRS: List[Tuple[str, str]] = [
+    (EVENT_PLUG, EVENT_ENUMERATE),
+    (EVENT_PLUG, EVENT_BIND),
+    (EVENT_PLUG, EVENT_IMPORT),
+    (EVENT_ENUMERATE, EVENT_BIND),
+    (EVENT_BIND, EVENT_IMPORT),
+]
+
+# Bounds: events kept for /api/events, open sessions, samples per pair.
+MAX_EVENTS = 512
+MAX_SESSIONS = 128
+MAX_SAMPLES = 256
+
+
+def _percentile(sorted_samples: List[float], p: float) -> float:
+    return sorted_samples[min(len(sorted_samples) - 1, int(p * len(sorted_samples)))]
+
+
+class DeviceTimeline:
+    """
+    Bounded record of device lifecycle events per busid, with latency
+    distributions between steps.
+
+    A session starts at plug (or at whatever step is seen first, e.g. when
+    uevents are unavailable) and ends at unplug. Every step is recorded, but
+    only its first occurrence in a session counts towards latency, so a
+    re-bind or repeated reset does not skew the distributions.
+    """
+
+    def __init__(
+        self,
+        max_events: int = MAX_EVENTS,
+        max_sessions: int = MAX_SESSIONS,
+        max_samples: int = MAX_SAMPLES,
+    ) -> None:
+        self.seq = 0
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._sessions: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._max_sessions = max_sessions
+        self._samples: Dict[str, Deque[float]] = {
+            f"{a}_to_{b}": deque(maxlen=max_samples) for a, b in LATENCY_PAIRS
+        }
+
+    def record(self, busid: str, kind: str, t: float | None = None) -> Dict[str, Any]:
+        """
+        Record a step for busid and return the event, including the
+        latencies (ms) it completed within the current session.
+        """
+        t = time.monotonic() if t is None else t
+        session = self._sessions.get(busid)
+        if kind == EVENT_PLUG or session is None:
+            session = self._sessions[busid] = {}
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(busid)
+
+        latency: Dict[str, float] = {}
+        if kind not in session:
+            session[kind] = t
+            for a, b in LATENCY_PAIRS:
+                if b == kind and a in session:
+                    ms = round((t - session[a]) * 1000, 1)
+                    latency[f"{a}_to_{b}"] = ms
+                    self._samples[f"{a}_to_{b}"].append(ms)
+        if kind == EVENT_UNPLUG:
+            del self._sessions[busid]
+
+        self.seq += 1
+        event = {
+            "seq": self.seq,
+            "busid": busid,
+            "kind": kind,
+            "t": round(t, 4),
+            "wall": round(time.time(), 3),
+        }
+        if latency:
+            event["latency_ms"] = latency
+        self._events.append(event)
+        return event
+
+    def in_session(self, busid: str) -> bool:
+        return busid in self._sessions
+
+    def events(self, since: int = 0, busid: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+        out = [e for e in self._events if e["seq"] > since and (busid is None or e["busid"] == busid)]
+        return out[-limit:] if limit else out
+
+    def latency(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Distribution (ms) of each tracked step pair over recent sessions.
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            if not ordered:
+                summary[name] = {"count": 0}
+                continue
+            summary[name] = {
+                "count": len(ordered),
+                "p50": _percentile(ordered, 0.50),
+                "p90": _percentile(ordered, 0.90),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1],
+            }
+        return summary
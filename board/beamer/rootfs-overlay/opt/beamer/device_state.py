@@ -0,0 +1,157 @@
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+# Upper bound on remembered devices that are currently unplugged.
+ID_INDEX_MAX_ABSENT = 256
+
+
+def _device_key(device: Dict[str, Any]) -> Tuple[Any, ...]:
+    export = device.get("export") or {}
+    return (
+        device.get("busid", ""),
+        device.get("vid", ""),
+        device.get("pid", ""),
+        device.get("serial", ""),
+        device.get("vendor", ""),
+        device.get("product", ""),
+        # A policy reload or autobinder give-up changes the list too.
+        export.get("decision"),
+        export.get("rule"),
+        export.get("rejected"),
+    )
+
+
+class DeviceSnapshot:
+    """
+    Last known list of plugged devices with a generation counter that is
+    bumped whenever the set changes. Serialized response bodies are cached
+    per generation so repeated polls do not re-encode anything.
+    """
+
+    def __init__(self) -> None:
+        # The epoch keeps ETags from a previous process run from matching.
+        self._epoch = format(int(time.time()), "x")
+        self._keys: List[Tuple[Any, ...]] | None = None
+        self._changed = asyncio.Event()
+        self._cache: Dict[str, bytes] = {}
+        self.devices: List[Dict[str, Any]] = []
+        self.by_busid: Dict[str, Dict[str, Any]] = {}
+        self.generation = 0
+        self.updated_at = 0.0
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.generation}"'
+
+    def age(self) -> float:
+        if not self.updated_at:
+            return float("inf")
+        return time.monotonic() - self.updated_at
+
+    def update(self, devices: List[Dict[str, Any]]) -> bool:
+        """
+        Store a fresh enumeration. Returns True if the device set changed.
+        """
+        self.updated_at = time.monotonic()
+        keys = [_device_key(d) for d in devices]
+        if keys == self._keys:
+            return False
+        self._keys = keys
+        self.devices = devices
+        self.by_busid = {d.get("busid", ""): d for d in devices}
+        self.generation += 1
+        self._cache.clear()
+        # Wake long-pollers and hand out a fresh event for the next change.
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return True
+
+    def cached(self, name: str, build: Callable[[List[Dict[str, Any]]], Any]) -> bytes:
+        """
+        JSON-encode build(devices) once per generation under the given name.
+        """
+        body = self._cache.get(name)
+        if body is None:
+            body = json.dumps(build(self.devices)).encode()
+            self._cache[name] = body
+        return body
+
+    def body(self) -> bytes:
+        return self.cached(
+            "list-devices",
+            lambda devices: {"devices": devices, "generation": self.generation},
+        )
+
+    async def wait_changed(self, generation: int, timeout: float) -> bool:
+        """
+        Wait until the generation differs from the given one.
+        Returns False on timeout.
+        """
+        if self.generation != generation:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class DeviceIdIndex:
+    """
+    Allocates the small integer IDs exposed by /zeroforce/lsusb.
+
+    IDs are keyed by VID/PID/serial so a device keeps its ID when it is
+    re-plugged or moved to another port. Devices without a serial number are
+    told apart by their order among identical VID/PID devices. IDs are never
+    reused, not even after a long-absent device has been forgotten.
+    """
+
+    def __init__(self, max_absent: int = ID_INDEX_MAX_ABSENT) -> None:
+        self._max_absent = max_absent
+        self._next_id = 1
+        self._by_key: Dict[Tuple[str, str, str, int], int] = {}
+        self._by_id: Dict[int, Tuple[str, str, str, int]] = {}
+        self._busid_to_id: Dict[str, int] = {}
+
+    @staticmethod
+    def _keys(devices: List[Dict[str, Any]]) -> List[Tuple[str, str, str, int]]:
+        seen: Dict[Tuple[str, str], int] = {}
+        keys = []
+        for device in devices:
+            vid = device.get("vid", "")
+            pid = device.get("pid", "")
+            serial = device.get("serial", "")
+            ordinal = 0
+            if not serial:
+                ordinal = seen.get((vid, pid), 0)
+                seen[(vid, pid)] = ordinal + 1
+            keys.append((vid, pid, serial, ordinal))
+        return keys
+
+    def assign(self, devices: List[Dict[str, Any]]) -> None:
+        """
+        Set the "id" field of every device and refresh the busid mapping.
+        """
+        ordered = sorted(devices, key=lambda d: d.get("busid", ""))
+        self._busid_to_id = {}
+        for device, key in zip(ordered, self._keys(ordered)):
+            dev_id = self._by_key.get(key)
+            if dev_id is None:
+                dev_id = self._next_id
+                self._next_id += 1
+                self._by_key[key] = dev_id
+                self._by_id[dev_id] = key
+            device["id"] = dev_id
+            self._busid_to_id[device.get("busid", "")] = dev_id
+        self._evict_absent()
+
+    def _evict_absent(self) -> None:
+        present = set(self._busid_to_id.values())
+        absent = [i for i in self._by_id if i not in present]
+        for dev_id in absent[: max(0, len(absent) - self._max_absent)]:
+            del self._by_key[self._by_id.pop(dev_id)]
+
+    def id_for(self, busid: str) -> int | None:
+        return self._busid_to_id.get(busid)
@@ -0,0 +1,246 @@
+"""
+Declarative allow/deny policy for which USB devices get exported.
+
+The policy lives in EXPORT_POLICY_PATH (YAML, next to network-config on the
+boot partition so it can be edited from any computer):
+
+    default: allow          # or deny
+    deny:
+      - "0bda"              # every device of a vendor
+      - "0bda:8153"         # one product
+      - "class:e0"          # device class (hex, as in bDeviceClass)
+      - "port:1-1.4"        # whatever is plugged into this port
+    allow:
+      - "0bda:5411"
+
+The most specific matching selector decides: port, then VID:PID, then VID,
+then class, then the default. A selector listed under both allow and deny
+is denied. Rules are compiled into one dict per selector kind, so a
+decision costs at most four dict lookups however long the policy is.
+Without a policy file everything is exported, as before.
+"""
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import yaml
+
+EXPORT_POLICY_PATH = os.environ.get("EXPORT_POLICY_PATH", "/boot/export-policy.yaml")
+# Devices the autobinder has given up on, shared with the API.
+EXPORT_REJECTED_PATH = os.environ.get("EXPORT_REJECTED_PATH", "/run/beamer/export-rejected.json")
+
+ALLOW = "allow"
+DENY = "deny"
+
+# Selector kinds, most specific first.
+_KINDS = ("port", "vidpid", "vid", "class")
+
+_logger = logging.getLogger(__name__)
+
+
+class Decision(NamedTuple):
+    action: str  # ALLOW or DENY
+    rule: str  # the selector that matched, or "default"
+
+    @property
+    def allowed(self) -> bool:
+        return self.action == ALLOW
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"decision": self.action, "rule": self.rule}
+
+
+class PolicyError(ValueError):
+    pass
+
+
+def _parse_selector(raw: Any) -> Tuple[str, str]:
+    """
+    Map a selector string to (kind, normalised key).
+    """
+    text = str(raw).strip().lower()
+    if text.startswith("port:"):
+        port = text[5:].strip()
+        if not port:
+            raise PolicyError(f"empty port selector: {raw!r}")
+        return "port", port
+    if text.startswith("class:"):
+        value = text[6:].strip()
+        try:
+            return "class", f"{int(value, 16):02x}"
+        except ValueError:
+            raise PolicyError(f"invalid class selector: {raw!r}") from None
+    vid, sep, pid = text.partition(":")
+    if not _is_hex4(vid) or (sep and not _is_hex4(pid)):
+        raise PolicyError(f"invalid selector: {raw!r}")
+    return ("vidpid", text) if sep else ("vid", vid)
+
+
+def _is_hex4(value: str) -> bool:
+    return len(value) == 4 and all(c in "0123456789abcdef" for c in value)
+
+
+class ExportPolicy:
+    def __init__(self, path: str = EXPORT_POLICY_PATH) -> None:
+        self.path = path
+        self.default = ALLOW
+        self._index: Dict[str, Dict[str, str]] = {kind: {} for kind in _KINDS}
+        self._mtime: float | None = None
+        self.error: str | None = None
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "ExportPolicy":
+        policy = cls(path="")
+        policy._compile(config)
+        return policy
+
+    def _compile(self, config: Any) -> None:
+        if config is None:
+            config = {}
+        if not isinstance(config, dict):
+            raise PolicyError("policy must be a mapping")
+        default = str(config.get("default", ALLOW)).lower()
+        if default not in (ALLOW, DENY):
+            raise PolicyError(f"default must be allow or deny, not {default!r}")
+        index: Dict[str, Dict[str, str]] = {kind: {} for kind in _KINDS}
+        # Deny is applied last so it wins over the same selector in allow.
+        for action in (ALLOW, DENY):
+            selectors = config.get(action) or []
+            if not isinstance(selectors, list):
+                raise PolicyError(f"{action} must be a list")
+            for raw in selectors:
+                kind, key = _parse_selector(raw)
+                index[kind][key] = action
+        self.default = default
+        self._index = index
+
+    def load(self) -> bool:
+        """
+        (Re)compile the policy file. A missing file means "export
+        everything"; a broken one keeps the previous policy and sets error.
+        Returns whether a policy was compiled.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self._mtime = None
+            self.error = None
+            self._compile({})
+            return True
+        self._mtime = mtime
+        try:
+            with open(self.path) as f:
+                self._compile(yaml.safe_load(f))
+        except (OSError, yaml.YAMLError, PolicyError) as exc:
+            self.error = str(exc)
+            _logger.error("export policy %s not loaded: %s", self.path, exc)
+            return False
+        self.error = None
+        _logger.info("export policy loaded from %s (%d rules)", self.path, self.rule_count())
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload when the policy file appeared, vanished or was modified; one
+        stat() otherwise.
+        """
+        try:
+            mtime: float | None = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        return self.load()
+
+    def decide(self, busid: str, vid: str, pid: str, device_class: str = "") -> Decision:
+        vid = vid.lower()
+        pid = pid.lower()
+        for kind, key in (
+            ("port", busid),
+            ("vidpid", f"{vid}:{pid}"),
+            ("vid", vid),
+            ("class", device_class.lower()),
+        ):
+            action = self._index[kind].get(key)
+            if action is not None:
+                label = f"{kind}:{key}" if kind in ("port", "class") else key
+                return Decision(action, label)
+        return Decision(self.default, "default")
+
+    def rule_count(self) -> int:
+        return sum(len(rules) for rules in self._index.values())
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "loaded": self._mtime is not None,
+            "default": self.default,
+            "rules": self.rule_count(),
+            "error": self.error,
+        }
+
+
+def device_class(busid: str, devices_dir: str = "/sys/bus/usb/devices") -> str:
+    """
+    bDeviceClass of a device; when that is 00 (class defined per interface)
+    the class of its first interface.
+    """
+    base = os.path.join(devices_dir, busid)
+    try:
+        with open(os.path.join(base, "bDeviceClass")) as f:
+            value = f.read().strip().lower()
+    except OSError:
+        return ""
+    if value != "00":
+        return value
+    try:
+        with open(os.path.join(base, "bConfigurationValue")) as f:
+            config = f.read().strip() or "1"
+        with open(os.path.join(base, f"{busid}:{config}.0", "bInterfaceClass")) as f:
+            return f.read().strip().lower()
+    except OSError:
+        return value
+
+
+def read_rejected(path: str = EXPORT_REJECTED_PATH) -> Dict[str, Dict[str, str]]:
+    """
+    busid -> {"device": "vid:pid", "reason": ...} for devices the autobinder
+    will not try again.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_rejected(rejected: Dict[str, Dict[str, str]], path: str = EXPORT_REJECTED_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(rejected, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    # Check a policy against `list-plugged.sh` style lines (busid,VID:PID[,class]).
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <policy.yaml> < devices.txt", file=sys.stderr)
+        sys.exit(1)
+    checked = ExportPolicy(sys.argv[1])
+    checked.load()
+    if checked.error:
+        print(f"error: {checked.error}", file=sys.stderr)
+        sys.exit(1)
+    lines: List[str] = [line.strip() for line in sys.stdin if line.strip()]
+    for line in lines:
+        fields = line.split(",")
+        if len(fields) < 2 or ":" not in fields[1]:
+            print(f"skipped: {line!r}", file=sys.stderr)
+            continue
+        v, p = fields[1].split(":", 1)
+        decision = checked.decide(fields[0], v, p, fields[2] if len(fields) > 2 else "")
+        print(f"{fields[0]}\t{fields[1]}\t{decision.action}\t{decision.rule}")
@@ -0,0 +1,293 @@
+import os
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+from usbip_index import SYSFS_USB_DEVICES, read_usbip_status
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# How often the monitor evaluates exported devices.
+HEALTH_INTERVAL = _env_float("HEALTH_INTERVAL", 5.0)
+# Kernel errors for one device within the window that mark it stalled.
+HEALTH_KERNEL_ERRORS = int(_env_float("HEALTH_KERNEL_ERRORS", 3))
+HEALTH_KERNEL_WINDOW = _env_float("HEALTH_KERNEL_WINDOW", 60.0)
+# An in-use device that had traffic and then completes no URB for this long
+# while URBs are outstanding is considered stalled (needs usbmon).
+HEALTH_TRAFFIC_STALL_SECONDS = _env_float("HEALTH_TRAFFIC_STALL_SECONDS", 30.0)
+# Self-healing policy.
+HEALTH_AUTO_RESET = os.environ.get("HEALTH_AUTO_RESET", "1") == "1"
+HEALTH_COOLDOWN = _env_float("HEALTH_COOLDOWN", 120.0)
+HEALTH_MAX_RESETS_PER_HOUR = int(_env_float("HEALTH_MAX_RESETS_PER_HOUR", 3))
+
+MTTR_SAMPLES = 64
+# Resets older than this no longer count against the hourly limit.
+RESET_HISTORY_SECONDS = 3600.0
+
+# "usb 1-1.3: ..." / "usbip-host 1-1.3: ..." in kernel messages.
+_KERNEL_BUSID = re.compile(r"^(?:usb|usbip-host|usbip_host|hub)\s+(\d+-[\d.]+)(?::[\d.]+)?:")
+
+# Reasons a device is flagged.
+REASON_USBIP_ERROR = "usbip_error"
+REASON_KERNEL_ERRORS = "kernel_errors"
+REASON_NO_TRAFFIC = "no_traffic"
+
+
+def kernel_busid(message: str) -> str | None:
+    m = _KERNEL_BUSID.match(message)
+    return m.group(1) if m else None
+
+
+class _DeviceHealth:
+    def __init__(self) -> None:
+        self.usbip_status: str | None = None
+        self.kernel_errors: Deque[float] = deque(maxlen=64)
+        self.last_urbs = -1
+        self.last_progress = 0.0
+        self.had_traffic = False
+        self.stalled_since: float | None = None
+        self.reasons: List[str] = []
+
+
+class _ResetHistory:
+    """
+    Resets issued for one busid. Kept apart from _DeviceHealth so that
+    unbinding or port-cycling a device does not reset the limits.
+    """
+
+    def __init__(self) -> None:
+        self.resets: Deque[float] = deque(maxlen=32)
+        self.last_reset: float | None = None
+        self.suppressed = False
+
+    def expired(self, now: float, keep: float) -> bool:
+        return self.last_reset is None or now - self.last_reset >= keep
+
+
+class HealthMonitor:
+    """
+    Stall detection and reset policy for exported devices.
+
+    Signals: usbip_status "error", a burst of kernel errors for the busid,
+    and (with usbmon) an in-use device whose traffic stops while URBs are
+    outstanding. evaluate() returns the devices to reset now, within the
+    cooldown and hourly limits; record_reset() closes the loop and feeds the
+    mean-time-to-recovery statistics.
+    """
+
+    def __init__(
+        self,
+        kernel_errors: int = HEALTH_KERNEL_ERRORS,
+        kernel_window: float = HEALTH_KERNEL_WINDOW,
+        traffic_stall_seconds: float = HEALTH_TRAFFIC_STALL_SECONDS,
+        auto_reset: bool = HEALTH_AUTO_RESET,
+        cooldown: float = HEALTH_COOLDOWN,
+        max_resets_per_hour: int = HEALTH_MAX_RESETS_PER_HOUR,
+    ) -> None:
+        self.kernel_errors = kernel_errors
+        self.kernel_window = kernel_window
+        self.traffic_stall_seconds = traffic_stall_seconds
+        self.auto_reset = auto_reset
+        self.cooldown = cooldown
+        self.max_resets_per_hour = max_resets_per_hour
+        self._devices: Dict[str, _DeviceHealth] = {}
+        # Outlives _devices entries; pruned once older than the limits.
+        self._history: Dict[str, _ResetHistory] = {}
+        self._mttr: Deque[float] = deque(maxlen=MTTR_SAMPLES)
+        self.resets_ok = 0
+        self.resets_failed = 0
+
+    def _device(self, busid: str) -> _DeviceHealth:
+        device = self._devices.get(busid)
+        if device is None:
+            device = self._devices[busid] = _DeviceHealth()
+        return device
+
+    def _reset_history(self, busid: str) -> _ResetHistory:
+        history = self._history.get(busid)
+        if history is None:
+            history = self._history[busid] = _ResetHistory()
+        return history
+
+    # --- Signals ---
+
+    def sync_status(self, statuses: Dict[str, str], now: float | None = None) -> None:
+        """
+        Track exactly the devices bound to usbip-host (busid -> usbip_status).
+        Unbound or unplugged devices are forgotten; there is nothing to heal.
+        Their reset history is kept until it no longer affects the cooldown
+        or hourly limit, so a rebind cannot bypass them.
+        """
+        now = time.monotonic() if now is None else now
+        for busid in list(self._devices):
+            if busid not in statuses:
+                del self._devices[busid]
+        keep = max(self.cooldown, RESET_HISTORY_SECONDS)
+        for busid in [b for b, h in self._history.items() if h.expired(now, keep)]:
+            del self._history[busid]
+        for busid, status in statuses.items():
+            self._device(busid).usbip_status = status
+
+    def note_kernel_error(self, busid: str, now: float | None = None) -> None:
+        if busid in self._devices:
+            self._devices[busid].kernel_errors.append(time.monotonic() if now is None else now)
+
+    def note_traffic(self, traffic: Dict[str, Dict[str, Any]], now: float | None = None) -> None:
+        """
+        Feed a UsbmonSampler snapshot (busid -> stats).
+        """
+        now = time.monotonic() if now is None else now
+        for busid, stats in traffic.items():
+            device = self._devices.get(busid)
+            if device is None:
+                continue
+            urbs = stats.get("total_urbs", 0)
+            if urbs != device.last_urbs:
+                if device.last_urbs >= 0:
+                    device.had_traffic = True
+                device.last_urbs = urbs
+                device.last_progress = now
+            elif not stats.get("pending_urbs"):
+                # Idle with nothing outstanding is not a stall.
+                device.last_progress = now
+
+    def still_stalled(self, busid: str, since: float, devices_dir: str = SYSFS_USB_DEVICES) -> bool:
+        """
+        Stall probe for usb_reset.recover(), called from a worker thread
+        while a recovery step settles: usbip-host reports an error, or the
+        kernel logged errors for the device after since (monotonic).
+        """
+        if read_usbip_status(busid, devices_dir) == "error":
+            return True
+        device = self._devices.get(busid)
+        return device is not None and any(t >= since for t in list(device.kernel_errors))
+
+    # --- Decisions ---
+
+    def _reasons(self, device: _DeviceHealth, now: float) -> List[str]:
+        reasons = []
+        if device.usbip_status == "error":
+            reasons.append(REASON_USBIP_ERROR)
+        recent = [t for t in device.kernel_errors if now - t <= self.kernel_window]
+        if len(recent) >= self.kernel_errors:
+            reasons.append(REASON_KERNEL_ERRORS)
+        if (
+            device.usbip_status == "in-use"
+            and device.had_traffic
+            and now - device.last_progress >= self.traffic_stall_seconds
+        ):
+            reasons.append(REASON_NO_TRAFFIC)
+        return reasons
+
+    def evaluate(self, now: float | None = None) -> List[Dict[str, Any]]:
+        """
+        Update stall flags and return actions as dicts with "busid",
+        "action" ("stalled", "cleared", "reset" or "suppressed") and
+        "reasons". Only "reset" actions need the caller to do something.
+        """
+        now = time.monotonic() if now is None else now
+        actions: List[Dict[str, Any]] = []
+        for busid, device in self._devices.items():
+            reasons = self._reasons(device, now)
+            if not reasons:
+                if device.stalled_since is not None:
+                    self._mttr.append(now - device.stalled_since)
+                    device.stalled_since = None
+                    device.reasons = []
+                    actions.append({"busid": busid, "action": "cleared", "reasons": []})
+                continue
+            if device.stalled_since is None:
+                device.stalled_since = now
+                actions.append({"busid": busid, "action": "stalled", "reasons": reasons})
+            device.reasons = reasons
+            if not self.auto_reset:
+                continue
+            history = self._reset_history(busid)
+            why = self._blocked(history, now)
+            if why is None:
+                history.last_reset = now
+                history.resets.append(now)
+                history.suppressed = False
+                actions.append({"busid": busid, "action": "reset", "reasons": reasons})
+            elif why == "hourly_limit" and not history.suppressed:
+                # Report hitting the limit once, not on every tick.
+                history.suppressed = True
+                actions.append({"busid": busid, "action": "suppressed", "reasons": reasons, "why": why})
+        return actions
+
+    def _blocked(self, history: _ResetHistory, now: float) -> str | None:
+        if history.last_reset is not None and now - history.last_reset < self.cooldown:
+            return "cooldown"
+        in_last_hour = [t for t in history.resets if now - t < RESET_HISTORY_SECONDS]
+        if len(in_last_hour) >= self.max_resets_per_hour:
+            return "hourly_limit"
+        return None
+
+    def record_reset(self, busid: str, ok: bool, now: float | None = None) -> None:
+        """
+        Result of a reset issued for a "reset" action. A successful reset
+        clears the stall and counts towards time to recovery; kernel error
+        history is forgotten so it does not immediately re-trigger.
+        """
+        now = time.monotonic() if now is None else now
+        device = self._devices.get(busid)
+        if ok:
+            self.resets_ok += 1
+        else:
+            self.resets_failed += 1
+        if device is None or not ok:
+            return
+        if device.stalled_since is not None:
+            self._mttr.append(now - device.stalled_since)
+        device.stalled_since = None
+        device.reasons = []
+        device.kernel_errors.clear()
+        device.had_traffic = False
+        device.last_progress = now
+
+    # --- Reporting ---
+
+    def _resets_last_hour(self, busid: str, now: float) -> int:
+        history = self._history.get(busid)
+        if history is None:
+            return 0
+        return len([t for t in history.resets if now - t < RESET_HISTORY_SECONDS])
+
+    def snapshot(self, now: float | None = None) -> Dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        mttr = sorted(self._mttr)
+        return {
+            "policy": {
+                "auto_reset": self.auto_reset,
+                "cooldown": self.cooldown,
+                "max_resets_per_hour": self.max_resets_per_hour,
+                "kernel_errors": self.kernel_errors,
+                "kernel_window": self.kernel_window,
+                "traffic_stall_seconds": self.traffic_stall_seconds,
+            },
+            "devices": {
+                busid: {
+                    "usbip_status": d.usbip_status,
+                    "stalled": d.stalled_since is not None,
+                    "stalled_for": round(now - d.stalled_since, 1) if d.stalled_since is not None else None,
+                    "reasons": d.reasons,
+                    "resets_last_hour": self._resets_last_hour(busid, now),
+                }
+                for busid, d in self._devices.items()
+            },
+            "resets_ok": self.resets_ok,
+            "resets_failed": self.resets_failed,
+            "mttr_seconds": {
+                "count": len(mttr),
+                "mean": round(sum(mttr) / len(mttr), 2) if mttr else None,
+                "p50": round(mttr[len(mttr) // 2], 2) if mttr else None,
+                "max": round(mttr[-1], 2) if mttr else None,
+            },
+        }
@@ -0,0 +1,199 @@
+import asyncio
+import errno
+import json
+import logging
+import os
+import re
+import sys
+from typing import Awaitable, Callable, Dict, Iterator, List, NamedTuple
+
+KMSG_PATH = "/dev/kmsg"
+
+# Syslog severities in priority order (the low three bits of PRI).
+LEVEL_NAMES = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
+
+# Dictionary SUBSYSTEM values and message prefixes that concern USB/IP.
+USB_SUBSYSTEMS = frozenset({"usb", "usbip", "usbmisc", "usb-serial"})
+_USB_MESSAGE = re.compile(r"^(usb \d+-[\d.]+|usbcore|usbip|vhci_hcd|usbip-host|hub \d+-|xhci|dwc_otg|dwc2)")
+# The kernel writes bytes outside printable ASCII (and the backslash) as \xHH.
+_ESCAPE = re.compile(r"(?:\\x[0-9a-fA-F]{2})+")
+_CONTROL = re.compile(r"[\x00-\x08\x0a-\x1f\x7f]")
+
+_logger = logging.getLogger(__name__)
+
+
+class KmsgRecord(NamedTuple):
+    level: str
+    facility: int
+    seq: int
+    usec: int  # monotonic microseconds since boot
+    message: str
+    fields: Dict[str, str]  # dictionary lines (SUBSYSTEM, DEVICE, ...)
+
+    @property
+    def subsystem(self) -> str | None:
+        return self.fields.get("SUBSYSTEM")
+
+    @property
+    def device(self) -> str | None:
+        return self.fields.get("DEVICE")
+
+
+def _unescape(text: str) -> str:
+    """
+    Decode the kernel's \\xHH escapes (so UTF-8 text reads normally) but
+    keep control characters escaped, so a message stays on one line.
+    """
+    if "\\x" not in text:
+        return text
+
+    def decode(match: "re.Match[str]") -> str:
+        raw = bytes.fromhex(match.group(0).replace("\\x", ""))
+        return _CONTROL.sub(lambda c: f"\\x{ord(c.group(0)):02x}", raw.decode(errors="replace"))
+
+    return _ESCAPE.sub(decode, text)
+
+
+def parse_kmsg_record(data: bytes | str) -> KmsgRecord | None:
+    """
+    Parse one /dev/kmsg record:
+
+        PRI,SEQ,TS_USEC,FLAGS[,...];MESSAGE
+         KEY=VALUE
+         ...
+
+    Escaped bytes in the message and values are decoded (see _unescape).
+    Returns None for malformed records.
+    """
+    if isinstance(data, bytes):
+        data = data.decode(errors="replace")
+    lines = data.rstrip("\n").split("\n")
+    header, sep, message = lines[0].partition(";")
+    if not sep:
+        return None
+    parts = header.split(",")
+    if len(parts) < 3:
+        return None
+    try:
+        pri, seq, usec = int(parts[0]), int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+    fields: Dict[str, str] = {}
+    for line in lines[1:]:
+        if line.startswith(" "):
+            key, eq, value = line[1:].partition("=")
+            if eq:
+                fields[key] = _unescape(value)
+    return KmsgRecord(LEVEL_NAMES[pri & 7], pri >> 3, seq, usec, _unescape(message), fields)
+
+
+def split_kmsg_capture(text: str) -> Iterator[str]:
+    """
+    Split a capture made with `cat /dev/kmsg > file` back into records
+    (continuation lines start with a space).
+    """
+    record: List[str] = []
+    for line in text.splitlines():
+        if line.startswith(" ") and record:
+            record.append(line)
+            continue
+        if record:
+            yield "\n".join(record)
+        record = [line]
+    if record:
+        yield "\n".join(record)
+
+
+def is_usb_record(record: KmsgRecord) -> bool:
+    return record.subsystem in USB_SUBSYSTEMS or is_usb_message(record.message)
+
+
+def is_usb_message(message: str) -> bool:
+    return _USB_MESSAGE.match(message) is not None
+
+
+def format_record(record: KmsgRecord) -> str:
+    """
+    Render a record like the kernel lines syslogd writes, so that it reads
+    and dedups the same way as lines from /var/log/messages.
+    """
+    return f"kernel: [{record.usec / 1e6:12.6f}] {record.message}"
+
+
+def open_kmsg() -> int | None:
+    """
+    Open /dev/kmsg non-blocking, positioned after the existing records, or
+    None when it cannot be read (no permission, container, ...).
+    """
+    try:
+        fd = os.open(KMSG_PATH, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError as exc:
+        _logger.warning("%s not available: %s", KMSG_PATH, exc)
+        return None
+    try:
+        os.lseek(fd, 0, os.SEEK_END)
+    except OSError:
+        pass
+    return fd
+
+
+async def watch_kmsg(
+    callback: Callable[[KmsgRecord], Awaitable[None]], fd: int | None = None
+) -> None:
+    """
+    Await callback(record) for every new USB-related kernel record until
+    cancelled. Uses fd from open_kmsg() when given. Returns immediately if
+    /dev/kmsg cannot be read.
+    """
+    if fd is None:
+        fd = open_kmsg()
+    if fd is None:
+        return
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(fd, readable.set)
+    try:
+        while True:
+            await readable.wait()
+            readable.clear()
+            while True:
+                try:
+                    # Each read returns exactly one record.
+                    data = os.read(fd, 8192)
+                except BlockingIOError:
+                    break
+                except OSError as exc:
+                    if exc.errno == errno.EPIPE:
+                        # Records were overwritten before we read them; the
+                        # next read continues with the oldest available one.
+                        _logger.warning("kmsg records lost (ring buffer overrun)")
+                        continue
+                    raise
+                record = parse_kmsg_record(data)
+                if record is None or not is_usb_record(record):
+                    continue
+                try:
+                    await callback(record)
+                except Exception:
+                    _logger.exception("kmsg callback failed")
+    finally:
+        loop.remove_reader(fd)
+        os.close(fd)
+
+
+if __name__ == "__main__":
+    # Parse a capture (`cat /dev/kmsg > capture.txt`) and print the USB records.
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <kmsg-capture.txt>", file=sys.stderr)
+        sys.exit(1)
+    with open(sys.argv[1], errors="replace") as capture:
+        text = capture.read()
+    total = 0
+    for raw in split_kmsg_capture(text):
+        total += 1
+        parsed = parse_kmsg_record(raw)
+        if parsed is None:
+            print(f"unparsed: {raw!r}", file=sys.stderr)
+        elif is_usb_record(parsed):
+            print(json.dumps(parsed._asdict(), sort_keys=True))
+    print(f"{total} records", file=sys.stderr)
@@ -0,0 +1,257 @@
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Identical lines (after normalisation) seen again within this many seconds
+# are folded into the first one and reported as a repeat count.
+LOG_DEDUP_WINDOW = _env_float("LOG_DEDUP_WINDOW", 2.0)
+# Token bucket per (source, level class): sustained lines/s and burst size.
+LOG_RATE = _env_float("LOG_RATE", 5.0)
+LOG_BURST = _env_float("LOG_BURST", 20.0)
+# Errors over their rate are held back, never dropped, for at most this long.
+LOG_ERROR_MAX_DELAY = _env_float("LOG_ERROR_MAX_DELAY", 1.0)
+# How often the caller should call flush() while lines are flowing.
+LOG_FLUSH_INTERVAL = 0.5
+# A line that keeps repeating without a quiet gap is summarised this often.
+LOG_REPEAT_REPORT_INTERVAL = _env_float("LOG_REPEAT_REPORT_INTERVAL", 10.0)
+
+# Repeat groups tracked at once, and errors held back at most.
+MAX_DEDUP_KEYS = 256
+MAX_HELD_ERRORS = 256
+
+ERROR_LEVELS = {"emerg", "alert", "crit", "err", "error"}
+WARNING_LEVELS = {"warn", "warning"}
+
+# BusyBox syslogd: "Oct 19 14:11:04 host facility.level prog[pid]: message"
+# (host and facility.level are optional depending on syslogd flags).
+_SYSLOG_PREFIX = re.compile(
+    r"^(?:[A-Z][a-z]{2} +\d+ \d\d:\d\d:\d\d|\d{4}-\d\d-\d\dT[\d:.+-]+Z?)\s+"
+    r"(?:(?P<host>\S+)\s+)??(?:\S+\.\S+\s+)?(?P<source>[^\s:\[]+)(?:\[\d+\])?:\s*"
+)
+_KERNEL_TIME = re.compile(r"^\[\s*\d+\.\d+\]\s*")
+_PID = re.compile(r"\[\d+\]")
+
+
+def level_class(level: str) -> str:
+    if level in ERROR_LEVELS:
+        return "error"
+    if level in WARNING_LEVELS:
+        return "warning"
+    return "info"
+
+
+def split_line(line: str) -> Tuple[str, str]:
+    """
+    Return (source, key) for a syslog line. The key is the message with
+    timestamps and PIDs removed, so that repeats of the same event compare
+    equal.
+    """
+    m = _SYSLOG_PREFIX.match(line)
+    if m is None:
+        return "unknown", _PID.sub("[]", _KERNEL_TIME.sub("", line))
+    message = _KERNEL_TIME.sub("", line[m.end():])
+    return m.group("source"), m.group("source") + ": " + _PID.sub("[]", message)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now: float) -> bool:
+        # Never refill backwards: a stale stamp would drain tokens.
+        now = max(now, self.stamp)
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class _Repeat:
+    __slots__ = ("payload", "count", "first_seen", "last_seen", "last_mono", "reported_mono")
+
+    def __init__(self, payload: Dict[str, Any], wall: float, mono: float) -> None:
+        self.payload = payload
+        self.count = 0
+        self.first_seen = wall
+        self.last_seen = wall
+        self.last_mono = mono
+        self.reported_mono = mono
+
+
+class LogPipeline:
+    """
+    Dedup plus rate limiting for the WebSocket log stream.
+
+    feed() returns the payloads to send now; flush() must be called
+    periodically (every LOG_FLUSH_INTERVAL) to emit repeat summaries, held
+    back errors and suppression notices.
+
+    The first occurrence of a line goes out immediately. Further copies
+    within LOG_DEDUP_WINDOW only bump a counter; once the line has been quiet
+    for the window (or every LOG_REPEAT_REPORT_INTERVAL while it keeps
+    repeating), one summary with "repeat", "first_seen" and "last_seen" is
+    sent. Whatever survives dedup passes a token bucket per source and
+    level class. Info/warning lines over the limit are dropped and counted;
+    errors are queued and released within LOG_ERROR_MAX_DELAY.
+    """
+
+    def __init__(
+        self,
+        dedup_window: float = LOG_DEDUP_WINDOW,
+        rate: float = LOG_RATE,
+        burst: float = LOG_BURST,
+        error_max_delay: float = LOG_ERROR_MAX_DELAY,
+        repeat_report_interval: float = LOG_REPEAT_REPORT_INTERVAL,
+    ) -> None:
+        self.dedup_window = dedup_window
+        self.repeat_report_interval = repeat_report_interval
+        self.rate = rate
+        self.burst = burst
+        self.error_max_delay = error_max_delay
+        self._repeats: "OrderedDict[str, _Repeat]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._held: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._suppressed: Dict[Tuple[str, str], int] = {}
+        self.folded = 0
+        self.dropped = 0
+
+    def feed(
+        self,
+        line: str,
+        level: str,
+        now: float | None = None,
+        source: str | None = None,
+        fields: Dict[str, Any] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Feed one line. source overrides the one parsed from a syslog prefix
+        (for structured sources); fields are added to the emitted payload.
+        """
+        mono = time.monotonic() if now is None else now
+        wall = time.time()
+        if source is None:
+            source, key = split_line(line)
+        else:
+            key = source + ": " + _PID.sub("[]", _KERNEL_TIME.sub("", line.split(": ", 1)[-1]))
+
+        repeat = self._repeats.get(key)
+        if repeat is not None and mono - repeat.last_mono <= self.dedup_window:
+            repeat.count += 1
+            repeat.last_seen = wall
+            repeat.last_mono = mono
+            repeat.payload["line"] = line
+            self._repeats.move_to_end(key)
+            self.folded += 1
+            return []
+
+        out: List[Dict[str, Any]] = []
+        if repeat is not None:
+            self._emit_repeat(key, repeat, mono, out)
+        payload = {"type": "log", "level": level, "line": line, "source": source}
+        if fields:
+            payload.update(fields)
+        self._repeats[key] = _Repeat(dict(payload), wall, mono)
+        while len(self._repeats) > MAX_DEDUP_KEYS:
+            old_key, old = next(iter(self._repeats.items()))
+            self._emit_repeat(old_key, old, mono, out)
+        self._limit(payload, mono, out)
+        return out
+
+    def flush(self, now: float | None = None) -> List[Dict[str, Any]]:
+        mono = time.monotonic() if now is None else now
+        out: List[Dict[str, Any]] = []
+        for key, repeat in list(self._repeats.items()):
+            if mono - repeat.last_mono > self.dedup_window:
+                self._emit_repeat(key, repeat, mono, out)
+            elif repeat.count and mono - repeat.reported_mono >= self.repeat_report_interval:
+                self._report_repeat(repeat, mono, out)
+                repeat.count = 0
+                repeat.first_seen = repeat.last_seen
+                repeat.reported_mono = mono
+
+        # Held errors: release while tokens allow, and unconditionally once
+        # they have waited error_max_delay.
+        while self._held:
+            held_at, payload = self._held[0]
+            bucket = self._bucket(payload, mono)
+            if not bucket.take(mono) and mono - held_at < self.error_max_delay:
+                break
+            self._held.popleft()
+            out.append(payload)
+
+        for (source, cls), count in self._suppressed.items():
+            out.append({
+                "type": "log",
+                "level": "notice",
+                "source": source,
+                "line": f"{source}: suppressed {count} {cls} lines (rate limit)",
+                "suppressed": count,
+            })
+        self._suppressed.clear()
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "folded": self.folded,
+            "dropped": self.dropped,
+            "held_errors": len(self._held),
+            "tracked": len(self._repeats),
+        }
+
+    def _emit_repeat(self, key: str, repeat: _Repeat, now: float, out: List[Dict[str, Any]]) -> None:
+        del self._repeats[key]
+        if repeat.count:
+            self._report_repeat(repeat, now, out)
+
+    def _report_repeat(self, repeat: _Repeat, now: float, out: List[Dict[str, Any]]) -> None:
+        payload = dict(repeat.payload)
+        payload["repeat"] = repeat.count
+        payload["first_seen"] = repeat.first_seen
+        payload["last_seen"] = repeat.last_seen
+        self._limit(payload, now, out)
+
+    def _bucket(self, payload: Dict[str, Any], now: float) -> TokenBucket:
+        bucket_key = (payload["source"], level_class(payload["level"]))
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = TokenBucket(self.rate, self.burst, now)
+        return bucket
+
+    def _limit(self, payload: Dict[str, Any], now: float, out: List[Dict[str, Any]]) -> None:
+        cls = level_class(payload["level"])
+        if cls == "error" and self._held:
+            # Keep errors in order behind those already waiting.
+            self._hold(payload, now)
+        elif self._bucket(payload, now).take(now):
+            out.append(payload)
+        elif cls == "error":
+            self._hold(payload, now)
+        else:
+            self.dropped += 1
+            bucket_key = (payload["source"], cls)
+            self._suppressed[bucket_key] = self._suppressed.get(bucket_key, 0) + 1
+
+    def _hold(self, payload: Dict[str, Any], now: float) -> None:
+        if len(self._held) >= MAX_HELD_ERRORS:
+            # Fold the oldest held error into a count rather than growing
+            # without bound; it is still reported as suppressed.
+            _, old = self._held.popleft()
+            self.dropped += 1
+            bucket_key = (old["source"], "error")
+            self._suppressed[bucket_key] = self._suppressed.get(bucket_key, 0) + 1
+        self._held.append((now, payload))
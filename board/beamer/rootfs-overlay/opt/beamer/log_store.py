@@ -0,0 +1,283 @@
+"""
+Segmented, compressed on-disk log history with a small in-memory index.
+
+Lines are buffered into blocks. A block is sealed once it holds
+LOG_STORE_BLOCK_BYTES of text or is LOG_STORE_BLOCK_AGE seconds old, then
+zlib-compressed and appended to the current segment file behind a fixed
+header (time range, level mask, line count, length). Segments roll at
+LOG_STORE_MAX_BYTES / LOG_STORE_SEGMENTS and the oldest is deleted, so the
+store never uses more than LOG_STORE_MAX_BYTES on disk. The index keeps
+only the block headers, and queries skip every segment and block whose
+time range or levels cannot match.
+"""
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+LOG_STORE_DIR = os.environ.get("LOG_STORE_DIR", "/run/beamer/logs")
+LOG_STORE_MAX_BYTES = int(os.environ.get("LOG_STORE_MAX_BYTES", 4 * 1024 * 1024))
+LOG_STORE_SEGMENTS = 8
+LOG_STORE_BLOCK_BYTES = 64 * 1024
+LOG_STORE_BLOCK_AGE = 30.0
+
+# Syslog severities; a level filter selects that severity and worse.
+SEVERITIES = {
+    "emerg": 0, "alert": 1, "crit": 2, "err": 3, "error": 3,
+    "warn": 4, "warning": 4, "notice": 5, "info": 6, "debug": 7,
+}
+SEVERITY_NAMES = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
+
+# t_min, t_max, level mask, line count, compressed length
+_HEADER = struct.Struct("<ddHII")
+_SEGMENT_RE = re.compile(r"^seg-(\d{8})\.logz$")
+
+_logger = logging.getLogger(__name__)
+
+
+class BlockRef(NamedTuple):
+    t_min: float
+    t_max: float
+    mask: int
+    lines: int
+    offset: int
+    length: int
+
+
+class _Segment:
+    def __init__(self, seq: int, path: str) -> None:
+        self.seq = seq
+        self.path = path
+        self.blocks: List[BlockRef] = []
+        self.size = 0
+
+    @property
+    def t_min(self) -> float:
+        return self.blocks[0].t_min if self.blocks else float("inf")
+
+    @property
+    def t_max(self) -> float:
+        return self.blocks[-1].t_max if self.blocks else float("-inf")
+
+
+def severity(level: str) -> int:
+    return SEVERITIES.get(level.lower(), 6)
+
+
+def _mask_for(max_severity: int) -> int:
+    return (1 << (max_severity + 1)) - 1
+
+
+class LogStore:
+    def __init__(
+        self,
+        directory: str = LOG_STORE_DIR,
+        max_bytes: int = LOG_STORE_MAX_BYTES,
+        segments: int = LOG_STORE_SEGMENTS,
+        block_bytes: int = LOG_STORE_BLOCK_BYTES,
+        block_age: float = LOG_STORE_BLOCK_AGE,
+    ) -> None:
+        self.directory = directory
+        self.segment_bytes = max(block_bytes, max_bytes // segments)
+        self.max_segments = segments
+        self.block_bytes = block_bytes
+        self.block_age = block_age
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._pending: List[Tuple[float, int, str]] = []
+        self._pending_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # --- Writing ---
+
+    def append(self, line: str, level: str, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._pending.append((ts, severity(level), line))
+            self._pending_bytes += len(line) + 24
+            if self._pending_bytes >= self.block_bytes:
+                self._seal()
+
+    def seal_if_stale(self, now: float | None = None) -> None:
+        """
+        Seal the pending block once its oldest line is block_age old, so
+        lines reach disk even when logging is quiet.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._pending and now - self._pending[0][0] >= self.block_age:
+                self._seal()
+
+    def close(self) -> None:
+        with self._lock:
+            self._seal()
+
+    def _seal(self) -> None:
+        if not self._pending:
+            return
+        lines = self._pending
+        self._pending = []
+        self._pending_bytes = 0
+        text = "".join(f"{ts:.3f}\t{sev}\t{line}\n" for ts, sev, line in lines)
+        payload = zlib.compress(text.encode(errors="replace"), 6)
+        mask = 0
+        for _, sev, _ in lines:
+            mask |= 1 << sev
+        t_min = min(ts for ts, _, _ in lines)
+        t_max = max(ts for ts, _, _ in lines)
+        header = _HEADER.pack(t_min, t_max, mask, len(lines), len(payload))
+
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or segment.size + len(header) + len(payload) > self.segment_bytes:
+            segment = self._new_segment()
+        try:
+            with open(segment.path, "ab") as f:
+                f.write(header)
+                f.write(payload)
+        except OSError:
+            _logger.exception("log store write failed; dropping %d lines", len(lines))
+            return
+        segment.blocks.append(
+            BlockRef(t_min, t_max, mask, len(lines), segment.size + len(header), len(payload))
+        )
+        segment.size += len(header) + len(payload)
+
+    def _new_segment(self) -> _Segment:
+        seq = self._segments[-1].seq + 1 if self._segments else 0
+        segment = _Segment(seq, os.path.join(self.directory, f"seg-{seq:08d}.logz"))
+        self._segments.append(segment)
+        while len(self._segments) > self.max_segments:
+            old = self._segments.pop(0)
+            try:
+                os.unlink(old.path)
+            except FileNotFoundError:
+                pass
+        return segment
+
+    def _load(self) -> None:
+        """
+        Rebuild the index from segment headers left by a previous run.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                found.append(_Segment(int(m.group(1)), os.path.join(self.directory, name)))
+        found.sort(key=lambda s: s.seq)
+        for segment in found:
+            try:
+                with open(segment.path, "r+b") as f:
+                    file_size = os.fstat(f.fileno()).st_size
+                    good = 0  # end of the last complete block
+                    while True:
+                        raw = f.read(_HEADER.size)
+                        if len(raw) < _HEADER.size:
+                            break
+                        t_min, t_max, mask, count, length = _HEADER.unpack(raw)
+                        offset = f.tell()
+                        if offset + length > file_size:
+                            break  # torn final block
+                        segment.blocks.append(BlockRef(t_min, t_max, mask, count, offset, length))
+                        f.seek(length, os.SEEK_CUR)
+                        good = offset + length
+                    if good < file_size:
+                        # Drop the torn tail so the next block is appended
+                        # exactly where the index expects it.
+                        _logger.warning("truncating torn tail of %s (%d bytes)", segment.path, file_size - good)
+                        f.truncate(good)
+                    segment.size = good
+            except OSError:
+                continue
+        self._segments = found[-self.max_segments:]
+        for stale in found[: -self.max_segments]:
+            try:
+                os.unlink(stale.path)
+            except OSError:
+                pass
+
+    # --- Reading ---
+
+    def query(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        level: str | None = None,
+        grep: str | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield stored lines in time order as {"ts", "level", "line"}.
+
+        level keeps that severity and worse; grep is a case-insensitive
+        substring match. Blocking (reads and decompresses blocks); run it in a
+        worker thread.
+        """
+        since = float("-inf") if since is None else since
+        until = float("inf") if until is None else until
+        mask = _mask_for(severity(level)) if level else 0xFF
+        needle = grep.lower() if grep else None
+
+        with self._lock:
+            plan = [
+                (s.path, [b for b in s.blocks if b.t_max >= since and b.t_min <= until and b.mask & mask])
+                for s in self._segments
+                if s.t_max >= since and s.t_min <= until
+            ]
+            pending = list(self._pending)
+
+        sent = 0
+        for path, blocks in plan:
+            if not blocks:
+                continue
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue  # rotated away since the plan was made
+            with f:
+                for block in blocks:
+                    f.seek(block.offset)
+                    try:
+                        text = zlib.decompress(f.read(block.length)).decode(errors="replace")
+                    except zlib.error:
+                        continue
+                    for row in text.splitlines():
+                        ts_raw, sev_raw, line = row.split("\t", 2)
+                        entry = self._match(float(ts_raw), int(sev_raw), line, since, until, mask, needle)
+                        if entry is not None:
+                            yield entry
+                            sent += 1
+                            if limit is not None and sent >= limit:
+                                return
+        for ts, sev, line in pending:
+            entry = self._match(ts, sev, line, since, until, mask, needle)
+            if entry is not None:
+                yield entry
+                sent += 1
+                if limit is not None and sent >= limit:
+                    return
+
+    @staticmethod
+    def _match(
+        ts: float, sev: int, line: str, since: float, until: float, mask: int, needle: str | None
+    ) -> Dict[str, Any] | None:
+        if ts < since or ts > until or not (1 << sev) & mask:
+            return None
+        if needle is not None and needle not in line.lower():
+            return None
+        return {"ts": ts, "level": SEVERITY_NAMES[sev], "line": line}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "blocks": sum(len(s.blocks) for s in self._segments),
+                "lines": sum(b.lines for s in self._segments for b in s.blocks) + len(self._pending),
+                "disk_bytes": sum(s.size for s in self._segments),
+                "pending_bytes": self._pending_bytes,
+                "oldest": self._segments[0].t_min if self._segments and self._segments[0].blocks else None,
+            }
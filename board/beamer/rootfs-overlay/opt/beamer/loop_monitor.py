@@ -0,0 +1,191 @@
+import asyncio
+import ipaddress
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# How often the monitor task wakes up to measure scheduling delay.
+LOOP_LAG_INTERVAL = _env_float("LOOP_LAG_INTERVAL", 0.5)
+# A callback that keeps the loop busy this long counts as blocking.
+LOOP_SLOW_THRESHOLD = _env_float("LOOP_SLOW_THRESHOLD", 0.1)
+# Record stack traces of blocking callbacks (watchdog thread).
+LOOP_DEBUG = os.environ.get("LOOP_DEBUG", "0") == "1"
+
+LAG_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+RECENT_SAMPLES = 600
+MAX_CALL_SITES = 64
+STACK_DEPTH = 16
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_loopback(host: str | None) -> bool:
+    try:
+        return host is not None and ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop scheduling delay continuously: a task sleeps for
+    interval and records how late it wakes up.
+
+    In debug mode a watchdog thread also notices when that task has not run
+    for interval + threshold, i.e. a callback is blocking the loop, and
+    samples the loop thread's stack once per stall. Stalls are grouped by
+    call site, the innermost frame from this application's own code (so a
+    blocking open() or subprocess.run() is charged to its caller).
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        threshold: float = LOOP_SLOW_THRESHOLD,
+        debug: bool = LOOP_DEBUG,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.slow = 0
+        self.max_ms = 0.0
+        self._recent: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+        self._sites: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sites_lock = threading.Lock()  # written by the watchdog thread
+        self._beat = time.monotonic()
+        self._beat_seq = 0
+        self._stalled_site: str | None = None
+        self._loop_thread: int | None = None
+        self._watchdog: threading.Thread | None = None
+        # Stop event of the current watchdog; each watchdog gets its own.
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        """
+        Measure until cancelled; start it as a task from the app's startup.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self.debug:
+            self._start_watchdog()
+        try:
+            while True:
+                self._beat = time.monotonic()
+                self._beat_seq += 1
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                self._record(max(0.0, loop.time() - expected) * 1000)
+        finally:
+            self._stop.set()
+
+    def set_debug(self, enabled: bool) -> None:
+        self.debug = enabled
+        if enabled and self._loop_thread is not None:
+            self._start_watchdog()
+        elif not enabled:
+            self._stop.set()
+            self._watchdog = None
+
+    def _record(self, lag_ms: float) -> None:
+        self.samples += 1
+        self._recent.append(lag_ms)
+        self.max_ms = max(self.max_ms, lag_ms)
+        bucket = 0
+        while bucket < len(LAG_BUCKETS_MS) and lag_ms > LAG_BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        if lag_ms >= self.threshold * 1000:
+            self.slow += 1
+            with self._sites_lock:
+                site = self._sites.get(self._stalled_site or "")
+                if site is not None:
+                    site["max_ms"] = max(site["max_ms"], round(lag_ms, 1))
+        self._stalled_site = None
+
+    # --- Blocking-call detector ---
+
+    def _start_watchdog(self) -> None:
+        """
+        Start a watchdog unless one is running and not told to stop. One
+        that is stopping (debug was just switched off) is left to exit on
+        its own event while a new one takes over.
+        """
+        if self._watchdog is not None and self._watchdog.is_alive() and not self._stop.is_set():
+            return
+        self._stop.set()
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(
+            target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def _watch(self, stop: threading.Event) -> None:
+        limit = self.interval + self.threshold
+        sampled = -1
+        while not stop.wait(self.threshold / 2):
+            seq, beat = self._beat_seq, self._beat
+            if seq == sampled or time.monotonic() - beat < limit:
+                continue
+            sampled = seq
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            if frame is not None:
+                self._record_site(traceback.extract_stack(frame, limit=STACK_DEPTH))
+
+    def _record_site(self, stack: traceback.StackSummary) -> None:
+        own = [f for f in stack if f.filename.startswith(_APP_DIR)]
+        key = _frame_label(own[-1] if own else stack[-1])
+        with self._sites_lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = {"call_site": key, "count": 0, "max_ms": 0.0}
+                while len(self._sites) > MAX_CALL_SITES:
+                    self._sites.popitem(last=False)
+            site["count"] += 1
+            site["last_seen"] = round(time.time(), 3)
+            # Outermost first, like a traceback.
+            site["stack"] = [_frame_label(f) for f in stack]
+            self._sites.move_to_end(key)
+        self._stalled_site = key
+
+    # --- Reporting ---
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+
+        def pct(p: float) -> float | None:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 2)
+
+        labels = [f"le_{b}ms" for b in LAG_BUCKETS_MS] + ["overflow"]
+        with self._sites_lock:
+            sites: List[Dict[str, Any]] = [dict(s) for s in self._sites.values()]
+        sites.sort(key=lambda s: -s["count"])
+        return {
+            "interval": self.interval,
+            "threshold_ms": self.threshold * 1000,
+            "debug": self.debug,
+            "samples": self.samples,
+            "slow": self.slow,
+            "lag_ms": {"p50": pct(0.50), "p90": pct(0.90), "p99": pct(0.99), "max": round(self.max_ms, 2)},
+            "histogram": dict(zip(labels, self.histogram)),
+            "call_sites": sites,
+        }
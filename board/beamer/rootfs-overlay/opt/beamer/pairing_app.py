@@ -1,52 +1,21 @@
+import asyncio
 import json
-import logging
 import os
 import pwd
 import time
-from logging.handlers import SysLogHandler
 
-import anyio
 from starlette.applications import Starlette
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
+from loop_monitor import LoopLagMonitor, is_loopback
 from pairing_utils import AUTHORIZED_KEYS_FILE, TUNNEL_USER, is_in_pairing_mode
+from profiler import SamplingProfiler, profile_response
+from syslog_logging import setup_syslog_logging
+from worker_lanes import LANE_CONTROL, LANE_FILES, WorkerLanes
 
 
-def _setup_syslog_logging(tag: str) -> logging.Logger:
-    """
-    Configure logging so that messages are sent to syslog when available.
-    Returns a logger tagged for this app.
-    """
-    root_logger = logging.getLogger()
-    syslog_handler: SysLogHandler | None = None
-
-    for handler in root_logger.handlers:
-        if isinstance(handler, SysLogHandler):
-            syslog_handler = handler
-            break
-
-    if syslog_handler is None:
-        try:
-            syslog_handler = SysLogHandler(address="/dev/log")
-        except OSError:
-            logging.getLogger(tag).warning(
-                "Syslog socket /dev/log not available; using default logging only"
-            )
-        else:
-            formatter = logging.Formatter(f"{tag}: %(levelname)s: %(message)s")
-            syslog_handler.setFormatter(formatter)
-            syslog_handler.setLevel(logging.INFO)
-            root_logger.addHandler(syslog_handler)
-            root_logger.setLevel(logging.INFO)
-
-    logger = logging.getLogger(tag)
-    logger.setLevel(logging.INFO)
-    logger.propagate = True
-    return logger
-
-
-logger = _setup_syslog_logging("zeroforce-pairing")
+logger = setup_syslog_logging("zeroforce-pairing")
 app = Starlette(debug=False)
 
 # --- SSH / pairing configuration ------------------------------------------------
@@ -54,6 +23,12 @@ app = Starlette(debug=False)
 SSH_DIR = os.path.dirname(AUTHORIZED_KEYS_FILE)
 DEV_MODE_FLAG = "/boot/devmode"
 
+loop_monitor = LoopLagMonitor()
+_loop_monitor_task: asyncio.Task | None = None
+profiler = SamplingProfiler()
+# Key writes and permission fixes (control) never queue behind reads (files).
+lanes = WorkerLanes({LANE_CONTROL: 1, LANE_FILES: 2})
+
 
 def _ok(payload: dict, status_code: int = 200) -> JSONResponse:
     """Shortcut for successful JSON responses."""
@@ -96,20 +71,24 @@ def _write_key(key: str) -> None:
     set_proper_permissions()
     logger.info("Updated authorized_keys via /zeroforce/setkey")
 
-@app.route("/zeroforce/info", methods=["GET"])
-async def zeroforce_info(request: Request) -> JSONResponse:
-    """
-    Get information about the beamer.
-    """
+
+def _read_info() -> dict:
     # for not just send if it's in devmode or not, pairing mode and uptime
-    info = {
+    return {
         "version": "0.1.0", # TODO: get version from package.json
         "hostname": os.uname().nodename,
         "devmode": os.path.exists(DEV_MODE_FLAG),
         "pairing_mode": is_in_pairing_mode(),
         "uptime": time.time() - os.path.getmtime("/proc/uptime"),
     }
-    return _ok(info)
+
+@app.route("/zeroforce/info", methods=["GET"])
+async def zeroforce_info(request: Request) -> JSONResponse:
+    """
+    Get information about the beamer.
+    """
+    # File reads; keep them off the event loop.
+    return _ok(await lanes.run(LANE_FILES, _read_info))
 
 @app.route("/zeroforce/readytopair", methods=["GET"])
 async def zeroforce_ready_to_pair(request: Request) -> JSONResponse:
@@ -117,7 +96,7 @@ async def zeroforce_ready_to_pair(request: Request) -> JSONResponse:
     Returns "true" or "false" (lower-case) depending on whether pairing mode
     is currently active.
     """
-    ready = is_in_pairing_mode()
+    ready = await lanes.run(LANE_FILES, is_in_pairing_mode)
     return _ok({"ready": ready})
 
 
@@ -130,7 +109,7 @@ async def zeroforce_set_key(request: Request) -> JSONResponse:
     - Expects a form field or JSON field named "key".
     - Replaces the content of AUTHORIZED_KEYS_FILE with this single key.
     """
-    if not is_in_pairing_mode():
+    if not await lanes.run(LANE_FILES, is_in_pairing_mode):
         return _error("pairing_mode_disabled", status_code=403)
 
     key = ""
@@ -163,7 +142,7 @@ async def zeroforce_set_key(request: Request) -> JSONResponse:
         return _error("invalid_key", status_code=400)
 
     try:
-        await anyio.to_thread.run_sync(_write_key, key)
+        await lanes.run(LANE_CONTROL, _write_key, key)
     except Exception as exc:
         logger.error("Failed to write %s: %s", AUTHORIZED_KEYS_FILE, exc)
         return _error("write_failed", status_code=500)
@@ -171,10 +150,52 @@ async def zeroforce_set_key(request: Request) -> JSONResponse:
     return _ok({"status": "ok"})
 
 
+@app.route("/api/debug/loop", methods=["GET"])
+async def api_debug_loop(request: Request) -> JSONResponse:
+    """
+    Event-loop lag histogram, blocking call sites and worker lane metrics.
+    This app listens on all interfaces, so only local clients get an answer;
+    ?debug=1 / ?debug=0 switches stack sampling.
+    """
+    if not is_loopback(request.client.host if request.client else None):
+        return _error("forbidden", status_code=403)
+    debug = request.query_params.get("debug")
+    if debug is not None:
+        loop_monitor.set_debug(debug == "1")
+    stats = loop_monitor.snapshot()
+    stats["lanes"] = lanes.stats()
+    return _ok(stats)
+
+
+@app.route("/api/debug/profile", methods=["GET"])
+async def api_debug_profile(request: Request) -> Response:
+    """
+    Sample every thread's stack for ?seconds=N (default 5) and return
+    collapsed stacks for flame-graph tools. Localhost and devmode only; one
+    profile at a time.
+    """
+    return await profile_response(request, profiler, _devmode)
+
+
+async def _devmode() -> bool:
+    return await lanes.run(LANE_FILES, os.path.exists, DEV_MODE_FLAG)
+
+
 @app.on_event("startup")
 async def _ensure_permissions_on_start() -> None:
+    global _loop_monitor_task
     # Ensure SSH permissions are correct when running under a process manager
-    await anyio.to_thread.run_sync(set_proper_permissions)
+    await lanes.run(LANE_CONTROL, set_proper_permissions)
+    _loop_monitor_task = asyncio.create_task(loop_monitor.run(), name="loop_monitor")
+
+
+@app.on_event("shutdown")
+async def _stop_loop_monitor() -> None:
+    # The blocking-call watchdog is a thread; stop it along with the task.
+    loop_monitor.set_debug(False)
+    if _loop_monitor_task is not None:
+        _loop_monitor_task.cancel()
+        await asyncio.gather(_loop_monitor_task, return_exceptions=True)
 
 
 if __name__ == "__main__":
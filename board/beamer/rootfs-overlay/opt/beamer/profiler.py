@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+from loop_monitor import is_loopback
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Sampling period and the longest profile one request may ask for.
+PROFILE_INTERVAL = _env_float("PROFILE_INTERVAL", 0.01)
+PROFILE_MAX_SECONDS = _env_float("PROFILE_MAX_SECONDS", 60)
+# Share of wall time the sampler may spend walking stacks (it holds the GIL
+# meanwhile); the period stretches when sampling gets more expensive.
+PROFILE_MAX_OVERHEAD = _env_float("PROFILE_MAX_OVERHEAD", 0.05)
+
+MAX_STACK_DEPTH = 64
+# Distinct stacks kept; anything beyond is counted under OTHER_STACK.
+MAX_STACKS = 5000
+OTHER_STACK = "[other]"
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _collapse(frame: Any, root: str) -> str:
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    parts.append(root)
+    parts.reverse()
+    return ";".join(parts)
+
+
+def sample_stacks(
+    seconds: float,
+    interval: float = PROFILE_INTERVAL,
+    max_overhead: float = PROFILE_MAX_OVERHEAD,
+) -> Tuple[Dict[str, int], Dict[str, Any]]:
+    """
+    Sample the stacks of every other thread for seconds. Returns collapsed
+    stacks ("thread;outer (file.py);...;inner (file.py)" -> samples) and
+    run statistics. Blocking; runs in its own thread.
+    """
+    me = threading.get_ident()
+    counts: Dict[str, int] = {}
+    samples = 0
+    busy = 0.0
+    start = time.monotonic()
+    deadline = start + seconds
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = _collapse(frame, names.get(ident) or f"thread-{ident}")
+            if stack not in counts and len(counts) >= MAX_STACKS:
+                stack = OTHER_STACK
+            counts[stack] = counts.get(stack, 0) + 1
+        samples += 1
+        cost = time.monotonic() - now
+        busy += cost
+        # Keep cost / (cost + sleep) at or below max_overhead.
+        time.sleep(max(interval - cost, cost / max_overhead - cost))
+    elapsed = time.monotonic() - start
+    return counts, {
+        "samples": samples,
+        "seconds": round(elapsed, 3),
+        "overhead": round(busy / elapsed, 4) if elapsed else 0.0,
+    }
+
+
+def format_collapsed(counts: Dict[str, int]) -> str:
+    """
+    One "stack count" line per stack, the input flamegraph.pl, speedscope
+    and inferno read.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+class SamplingProfiler:
+    """
+    Runs one profile at a time on a dedicated thread, so profiling neither
+    blocks the event loop nor occupies a worker lane.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, interval: float = PROFILE_INTERVAL) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return (collapsed stacks, statistics). Raises ProfilerBusy while
+        another profile is running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            future = self._executor.submit(sample_stacks, seconds, interval)
+        except BaseException:
+            self._lock.release()
+            raise
+        # Held until sampling ends: if the caller is cancelled (client went
+        # away) the thread keeps sampling, and no second run may overlap it.
+        future.add_done_callback(lambda _: self._lock.release())
+        counts, stats = await asyncio.wrap_future(future)
+        return format_collapsed(counts), stats
+
+
+async def profile_response(
+    request: Request,
+    profiler: SamplingProfiler,
+    devmode: Callable[[], Awaitable[bool]],
+) -> Response:
+    """
+    Handler for GET /api/debug/profile, shared by the apps. Samples for
+    ?seconds=N (default 5) and returns collapsed stacks with the run
+    statistics as X-Profile-* headers. Loopback clients only, and only while
+    devmode() is true.
+    """
+    if not is_loopback(request.client.host if request.client else None):
+        return _error("forbidden", status_code=403)
+    if not await devmode():
+        return _error("devmode_required", status_code=403)
+    try:
+        seconds = float(request.query_params.get("seconds", 5))
+    except ValueError:
+        return _error("invalid_seconds", status_code=400)
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return _error("invalid_seconds", status_code=400)
+    try:
+        text, stats = await profiler.profile(seconds)
+    except ProfilerBusy:
+        return _error("profile_running", status_code=409)
+    headers = {f"X-Profile-{key.capitalize()}": str(value) for key, value in stats.items()}
+    return PlainTextResponse(text, headers=headers)
+
+
+def _error(reason: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"status": "error", "reason": reason}, status_code=status_code)
@@ -1,20 +1,26 @@
 import os
 import subprocess
-import time
-from pathlib import Path
+from urllib.parse import parse_qs
 
+import anyio
 import yaml
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, Response
+from starlette.templating import Jinja2Templates
 
+from captive_probes import CaptiveProbeMiddleware
+from wifi_jobs import ConnectJobRunner
+from wifi_scan import WifiScanCache
 
-APP = Flask(
-    __name__,
-    template_folder=os.path.join(os.path.dirname(__file__), "templates"),
-)
-APP.secret_key = os.environ.get("FLASK_SECRET", "beamer-secret")
+
+TEMPLATES = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
 BOOT_NETPLAN_PATH = "/boot/network-config"
 
+# How long /api/wifi-scan waits for the very first scan after startup.
+FIRST_SCAN_WAIT_SECONDS = 15
+
 
 def write_wpa_supplicant_config(ssid: str, password: str) -> str:
     """
@@ -72,125 +78,119 @@ def write_boot_network_config(ssid: str, password: str) -> None:
         yaml.safe_dump(config, f, default_flow_style=False)
 
 
-def bring_up_station(ssid: str, password: str, timeout_seconds: int = 25) -> bool:
-    conf_path = write_wpa_supplicant_config(ssid, password)
-    # Delegate network operations to a single shell script call
-    result = subprocess.run([
-        "/bin/sh", "/usr/scripts/wifi_connect.sh", "wlan0", conf_path, str(timeout_seconds)
-    ])
-    return result.returncode == 0
-
-
 def bring_up_ap():
     subprocess.run(["/etc/init.d/S49provision", "start"], check=False)
 
 
-@APP.route("/wifi", methods=["GET", "POST"])
-def wifi():
+def _rollback_to_ap():
+    bring_up_ap()
+    # The station attempt left no usable scan results; rescan for the form.
+    SCAN_CACHE.request_refresh()
+
+
+CONNECT_JOBS = ConnectJobRunner(
+    write_config=write_wpa_supplicant_config,
+    persist=write_boot_network_config,
+    rollback=_rollback_to_ap,
+)
+# Background scans are skipped while a connect job owns wlan0.
+SCAN_CACHE = WifiScanCache(busy=CONNECT_JOBS.connecting.is_set)
+
+
+async def _form_fields(request: Request) -> dict:
+    """
+    Parse a urlencoded form body without requiring python-multipart.
+    """
+    body = (await request.body()).decode(errors="replace")
+    return {k: v[0] for k, v in parse_qs(body, keep_blank_values=True).items()}
+
+
+def _render_wifi(request: Request, job_id: str = "", messages=(), status_code: int = 200):
+    return TEMPLATES.TemplateResponse(
+        request,
+        "wifi.html",
+        {"job_id": job_id, "messages": list(messages)},
+        status_code=status_code,
+    )
+
+
+async def wifi(request: Request) -> Response:
     if request.method == "POST":
-        ssid = request.form.get("ssid", "").strip()
-        password = request.form.get("password", "").strip()
+        form = await _form_fields(request)
+        ssid = form.get("ssid", "").strip()
+        password = form.get("password", "").strip()
         if not ssid or not password:
-            flash("SSID and password are required", "error")
-            return redirect(url_for("wifi"))
-        ok = bring_up_station(ssid, password)
-        if ok:
-            # Persist configuration for future boots
-            try:
-                write_boot_network_config(ssid, password)
-            except Exception as exc:
-                # Do not treat this as a hard failure for the live connection,
-                # but surface it to the user so they know persistence failed.
-                flash(f"Connected, but failed to save config to /boot: {exc}", "error")
-
-            flash("Connected to Wi‑Fi successfully", "success")
-            return redirect(url_for("wifi"))
-        else:
-            flash("Failed to connect. Check credentials and try again.", "error")
-            bring_up_ap()
-            return redirect(url_for("wifi"))
-    return render_template("wifi.html")
-
-
-@APP.route("/generate_204")
-@APP.route("/hotspot-detect.html")
-def captive_probe():
-    """
-    Handle connectivity checks from clients (Android, iOS, etc.).
+            return _render_wifi(
+                request, messages=[("error", "SSID and password are required")], status_code=400
+            )
+        # Connecting runs in the background; the page polls the job status.
+        job = CONNECT_JOBS.start(ssid, password)
+        return RedirectResponse(f"/wifi?job={job.id}", status_code=303)
+    # Start scanning in the background so results are ready when asked for.
+    SCAN_CACHE.start()
+    return _render_wifi(request, job_id=request.query_params.get("job", ""))
 
-    Returning a bare \"OK\" with 200 makes the OS think there is full
-    internet connectivity and it will often hide the captive portal UI.
-    Instead, redirect to the Wi‑Fi configuration page so that the
-    automatic captive portal browser shows the setup form.
-    """
-    return redirect(url_for("wifi"))
 
-@APP.route("/")
-def root_redirect():
-    # Any HTTP request to the root gets the Wi‑Fi form
-    return redirect(url_for("wifi"))
+async def api_wifi_connect(request: Request) -> JSONResponse:
+    """
+    Start a connect job. Expects JSON or form fields "ssid" and "password".
+    Returns: {"ok": true, "job": {...}} with HTTP 202.
+    """
+    if "application/json" in request.headers.get("content-type", ""):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+    else:
+        data = await _form_fields(request)
+    ssid = str(data.get("ssid", "")).strip()
+    password = str(data.get("password", "")).strip()
+    if not ssid or not password:
+        return JSONResponse({"ok": False, "error": "SSID and password are required"}, 400)
+    job = CONNECT_JOBS.start(ssid, password)
+    return JSONResponse({"ok": True, "job": job.to_dict()}, 202)
+
+
+async def api_wifi_connect_status(request: Request) -> JSONResponse:
+    """
+    Status of a connect job: pending -> writing_config -> associating -> dhcp
+    -> verified, or failed (with rolled_back once the AP is back up).
+    """
+    job = CONNECT_JOBS.get(request.path_params["job_id"])
+    if job is None:
+        return JSONResponse({"ok": False, "error": "unknown job"}, 404)
+    return JSONResponse({"ok": True, "job": job.to_dict()})
 
 
-@APP.route("/api/wifi-scan")
-def api_wifi_scan():
+async def api_wifi_scan(request: Request) -> JSONResponse:
     """
-    Simple JSON API to scan for nearby Wi‑Fi networks on wlan0.
-    Returns: {"ok": bool, "networks": [{"ssid": str, "signal": float | null}, ...], "error": str | null}
+    Nearby Wi‑Fi networks on wlan0 from the background scan cache, one entry
+    per SSID with its best signal, strongest first.
+    Returns: {"ok": bool, "networks": [{"ssid": str, "signal": float | null,
+    "frequency": int | null, "secure": bool, "bss_count": int}, ...],
+    "error": str | null, "age": float | null}
     """
-    try:
-        # Use iw to scan – available on most embedded Linux builds.
-        # If this fails in your environment, the error will be surfaced to the UI.
-        proc = subprocess.run(
-            ["iw", "dev", "wlan0", "scan"],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        if proc.returncode != 0:
-            return jsonify(
-                {
-                    "ok": False,
-                    "networks": [],
-                    "error": proc.stderr.strip() or "Wi‑Fi scan failed",
-                }
-            )
+    SCAN_CACHE.start()
+    # Only the very first request can block (waiting for the initial scan).
+    result = await anyio.to_thread.run_sync(SCAN_CACHE.get, FIRST_SCAN_WAIT_SECONDS)
+    return JSONResponse(result)
 
-        networks = []
-        current = {"ssid": None, "signal": None}
-        for line in proc.stdout.splitlines():
-            stripped = line.strip()
-            if stripped.startswith("BSS "):
-                # New network block – flush previous one if it has data
-                if current.get("ssid") is not None or current.get("signal") is not None:
-                    networks.append(current)
-                current = {"ssid": None, "signal": None}
-            elif stripped.startswith("SSID:"):
-                current["ssid"] = stripped.split("SSID:", 1)[1].strip()
-            elif stripped.startswith("signal:"):
-                # Example: "signal: -46.00 dBm"
-                parts = stripped.split()
-                try:
-                    current["signal"] = float(parts[1])
-                except (ValueError, IndexError):
-                    current["signal"] = None
-
-        # Append last parsed network
-        if current.get("ssid") is not None or current.get("signal") is not None:
-            networks.append(current)
-
-        return jsonify({"ok": True, "networks": networks, "error": None})
-    except Exception as exc:  # pragma: no cover - defensive
-        return jsonify(
-            {
-                "ok": False,
-                "networks": [],
-                "error": f"Exception during scan: {exc}",
-            }
-        )
+
+_ROUTER = Starlette(debug=False)
+_ROUTER.add_route("/wifi", wifi, methods=["GET", "POST"])
+_ROUTER.add_route("/api/wifi-connect", api_wifi_connect, methods=["POST"])
+_ROUTER.add_route("/api/wifi-connect/{job_id}", api_wifi_connect_status, methods=["GET"])
+_ROUTER.add_route("/api/wifi-scan", api_wifi_scan, methods=["GET"])
+
+# Connectivity probes (/generate_204, /hotspot-detect.html, ..., and "/")
+# are answered by the middleware before routing.
+APP = CaptiveProbeMiddleware(_ROUTER)
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("APP_PORT", 80))
-    APP.run(host="0.0.0.0", port=port, debug=True)
-
+    import uvicorn
 
+    uvicorn.run(APP, host="0.0.0.0", port=port, access_log=False)
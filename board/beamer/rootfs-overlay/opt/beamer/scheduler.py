@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Poll bounds for the device watcher. While something changed recently the
+# watcher polls at POLL_MIN_INTERVAL; once things are quiet it backs off
+# exponentially up to POLL_MAX_INTERVAL. With no subscribers it either polls
+# at POLL_IDLE_INTERVAL or, when that is 0, parks until a client shows up.
+POLL_MIN_INTERVAL = _env_float("USB_POLL_MIN_INTERVAL", 0.5)
+POLL_MAX_INTERVAL = _env_float("USB_POLL_MAX_INTERVAL", 8.0)
+POLL_BOOST_SECONDS = _env_float("USB_POLL_BOOST_SECONDS", 10.0)
+POLL_BACKOFF = _env_float("USB_POLL_BACKOFF", 2.0)
+POLL_IDLE_INTERVAL = _env_float("USB_POLL_IDLE_INTERVAL", 0.0)
+
+
+class ClientGate:
+    """
+    Counts subscribers of a background pipeline so that its workers can park
+    while nobody is listening and resume as soon as someone subscribes.
+    """
+
+    def __init__(self) -> None:
+        self._count = 0
+        self._active = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def active(self) -> bool:
+        return self._count > 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def acquire(self) -> None:
+        self._count += 1
+        if self._count == 1:
+            self._idle.clear()
+            self._active.set()
+
+    def release(self) -> None:
+        if self._count == 0:
+            return
+        self._count -= 1
+        if self._count == 0:
+            self._active.clear()
+            self._idle.set()
+
+    async def wait_active(self) -> None:
+        await self._active.wait()
+
+    async def wait_idle(self) -> None:
+        await self._idle.wait()
+
+
+class AdaptivePoller:
+    """
+    Computes the delay before the next poll: short right after a change,
+    exponentially longer while nothing happens.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        boost_seconds: float = POLL_BOOST_SECONDS,
+        backoff: float = POLL_BACKOFF,
+    ) -> None:
+        self.min_interval = max(0.05, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.boost_seconds = max(0.0, boost_seconds)
+        self.backoff = max(1.0, backoff)
+        self._interval = self.min_interval
+        self._boost_until = 0.0
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def boost(self, now: float | None = None) -> None:
+        """Fall back to the shortest interval for the next boost window."""
+        if now is None:
+            now = time.monotonic()
+        self._boost_until = now + self.boost_seconds
+        self._interval = self.min_interval
+
+    def next_interval(self, changed: bool, now: float | None = None) -> float:
+        if now is None:
+            now = time.monotonic()
+        if changed:
+            self.boost(now)
+        elif now >= self._boost_until:
+            self._interval = min(self._interval * self.backoff, self.max_interval)
+        return self._interval
+
+
+class ModeStats:
+    """
+    Wakeup and CPU accounting per scheduler mode ("active" while clients are
+    subscribed, "idle" otherwise), so the cost of each mode can be compared.
+    """
+
+    def __init__(self) -> None:
+        now = time.monotonic()
+        self._mode = "idle"
+        self._since = now
+        self._cpu_since = time.process_time()
+        self._totals: Dict[str, Dict[str, float]] = {
+            mode: {"seconds": 0.0, "cpu_seconds": 0.0, "wakeups": 0}
+            for mode in ("active", "idle")
+        }
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    def _flush(self) -> None:
+        now = time.monotonic()
+        cpu = time.process_time()
+        totals = self._totals[self._mode]
+        totals["seconds"] += now - self._since
+        totals["cpu_seconds"] += cpu - self._cpu_since
+        self._since = now
+        self._cpu_since = cpu
+
+    def set_mode(self, mode: str) -> None:
+        if mode == self._mode:
+            return
+        self._flush()
+        self._mode = mode
+
+    def wakeup(self) -> None:
+        self._totals[self._mode]["wakeups"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._flush()
+        result: Dict[str, Any] = {"mode": self._mode}
+        for mode, totals in self._totals.items():
+            seconds = totals["seconds"]
+            result[mode] = {
+                "seconds": round(seconds, 1),
+                "wakeups": int(totals["wakeups"]),
+                "wakeups_per_minute": round(totals["wakeups"] * 60.0 / seconds, 2)
+                if seconds
+                else 0.0,
+                "cpu_percent": round(totals["cpu_seconds"] * 100.0 / seconds, 3)
+                if seconds
+                else 0.0,
+            }
+        return result
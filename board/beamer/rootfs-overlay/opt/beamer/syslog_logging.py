@@ -0,0 +1,100 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
+from typing import Any, Dict
+
+SYSLOG_ADDRESS = "/dev/log"
+
+# Records waiting for the syslog thread. When syslogd cannot keep up the
+# queue fills and further records are dropped (and counted) instead of
+# blocking the caller, which is usually the event loop.
+try:
+    LOG_QUEUE_SIZE = int(os.environ.get("BEAMER_LOG_QUEUE_SIZE", 1000))
+except ValueError:
+    LOG_QUEUE_SIZE = 1000
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks: records that do not fit are dropped.
+    The number of dropped records is reported with the next record that
+    does fit.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        with self._lock:
+            try:
+                if self._unreported:
+                    self.queue.put_nowait(self._drop_notice(record))
+                    self._unreported = 0
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                self._unreported += 1
+
+    def _drop_notice(self, record: logging.LogRecord) -> logging.LogRecord:
+        return logging.LogRecord(
+            record.name, logging.WARNING, __file__, 0,
+            "log queue full; dropped %d records", (self._unreported,), None,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "dropped": self.dropped,
+        }
+
+
+_listener: QueueListener | None = None
+_queue_handler: DroppingQueueHandler | None = None
+
+
+def setup_syslog_logging(tag: str) -> logging.Logger:
+    """
+    Configure logging so messages are sent to syslog (/dev/log) when
+    available, through a bounded queue drained by a background thread.
+    Returns a logger tagged for this app.
+    """
+    global _listener, _queue_handler
+
+    root_logger = logging.getLogger()
+    if _queue_handler is None:
+        try:
+            syslog_handler = SysLogHandler(address=SYSLOG_ADDRESS)
+        except OSError:
+            logging.getLogger(tag).warning(
+                "Syslog socket %s not available; using default logging only", SYSLOG_ADDRESS
+            )
+        else:
+            syslog_handler.setFormatter(logging.Formatter(f"{tag}: %(levelname)s: %(message)s"))
+            _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+            _queue_handler.setLevel(logging.INFO)
+            _listener = QueueListener(_queue_handler.queue, syslog_handler)
+            _listener.start()
+            atexit.register(_listener.stop)
+            root_logger.addHandler(_queue_handler)
+            root_logger.setLevel(logging.INFO)
+
+    logger = logging.getLogger(tag)
+    logger.setLevel(logging.INFO)
+    logger.propagate = True
+    return logger
+
+
+def logging_stats() -> Dict[str, Any]:
+    """
+    Queue depth and dropped-record count of the syslog queue.
+    """
+    if _queue_handler is None:
+        return {"queued": 0, "capacity": 0, "dropped": 0}
+    return _queue_handler.stats()
@@ -0,0 +1,88 @@
+import asyncio
+import errno
+import logging
+import socket
+from typing import Awaitable, Callable, Dict
+
+# NETLINK_KOBJECT_UEVENT protocol number and the kernel broadcast group.
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+# Pause after a receive error other than an overrun, so a broken socket
+# does not spin.
+UEVENT_ERROR_BACKOFF = 1.0
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_uevent(data: bytes) -> Dict[str, str]:
+    """
+    Parse a kernel uevent datagram ("action@devpath\\0KEY=VALUE\\0...") into a
+    dict. Returns {} for messages that are not kernel uevents (e.g. udev's
+    own "libudev" broadcasts).
+    """
+    parts = data.split(b"\0")
+    if not parts or b"@" not in parts[0]:
+        return {}
+    event: Dict[str, str] = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition(b"=")
+        if sep:
+            event[key.decode(errors="replace")] = value.decode(errors="replace")
+    return event
+
+
+def open_uevent_socket() -> socket.socket | None:
+    """
+    Open a non-blocking netlink socket subscribed to kernel uevents, or None
+    when netlink is not available (e.g. inside a container).
+    """
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        sock.bind((0, UEVENT_KERNEL_GROUP))
+    except (AttributeError, OSError) as exc:
+        _logger.warning("uevent socket not available: %s", exc)
+        return None
+    sock.setblocking(False)
+    return sock
+
+
+async def watch_uevents(
+    callback: Callable[[Dict[str, str]], Awaitable[None]],
+    resync: Callable[[], Awaitable[None]] | None = None,
+) -> None:
+    """
+    Await callback(event) for every USB uevent until cancelled. Returns
+    immediately if uevents cannot be received.
+
+    When the kernel drops events (ENOBUFS after a burst overflows the socket
+    buffer) or a receive fails otherwise, resync() is awaited so the caller
+    can rescan whatever the lost events would have told it, and reading
+    continues.
+    """
+    sock = open_uevent_socket()
+    if sock is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                data = await loop.sock_recv(sock, 16384)
+            except OSError as exc:
+                _logger.warning("uevent receive failed, rescanning: %s", exc)
+                if resync is not None:
+                    try:
+                        await resync()
+                    except Exception:
+                        _logger.exception("uevent resync failed")
+                if exc.errno != errno.ENOBUFS:
+                    await asyncio.sleep(UEVENT_ERROR_BACKOFF)
+                continue
+            event = parse_uevent(data)
+            if event.get("SUBSYSTEM") != "usb":
+                continue
+            try:
+                await callback(event)
+            except Exception:
+                _logger.exception("uevent callback failed")
+    finally:
+        sock.close()
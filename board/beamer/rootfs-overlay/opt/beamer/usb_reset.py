@@ -1,31 +1,64 @@
 #!/usr/bin/env python3
 import fcntl
+import functools
 import os
 import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
 
+from usbip_index import read_usbip_status
 
 USBDEVFS_RESET = ord("U") << 8 | 20  # _IO('U', 20)
 
+SYSFS_ROOT = "/sys"
+DEV_ROOT = "/dev"
 
-def resolve_devpath(arg: str) -> str:
+# Recovery steps, cheapest first. Each is only tried if the previous one
+# failed or left the device unhealthy.
+STEP_RESET = "reset"  # USBDEVFS_RESET ioctl
+STEP_PORT_CYCLE = "port_cycle"  # disable/enable the parent hub port
+STEP_REBIND = "rebind"  # unbind/bind the device's driver
+RECOVERY_STEPS = [STEP_RESET, STEP_PORT_CYCLE, STEP_REBIND]
+
+PORT_OFF_SECONDS = 1.0
+SETTLE_SECONDS = 5.0
+SETTLE_POLL_SECONDS = 0.1
+# How long a device must keep passing the health check before a step
+# counts as a recovery; a wedged device often looks fine for a moment.
+HOLD_SECONDS = 2.0
+
+
+def _devices_dir(sysfs: str) -> str:
+    return os.path.join(sysfs, "bus", "usb", "devices")
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read().strip()
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, "w") as f:
+        f.write(value)
+
+
+def resolve_devpath(arg: str, sysfs: str = SYSFS_ROOT, dev: str = DEV_ROOT) -> str:
     """Return /dev/bus/usb/BBB/DDD from a device path or sysfs-style USB id."""
-    if arg.startswith("/dev/bus/usb/"):
+    if arg.startswith(os.path.join(dev, "bus", "usb") + "/"):
         return arg
 
     base = arg.split(":")[0]  # drop interface suffix like :1.0
-    sysdev = f"/sys/bus/usb/devices/{base}"
+    sysdev = os.path.join(_devices_dir(sysfs), base)
     busnum_path = f"{sysdev}/busnum"
     devnum_path = f"{sysdev}/devnum"
 
     if not (os.path.isfile(busnum_path) and os.path.isfile(devnum_path)):
         raise ValueError(f"Not a known USB device id: {arg}")
 
-    with open(busnum_path) as f:
-        bus = int(f.read().strip())
-    with open(devnum_path) as f:
-        dev = int(f.read().strip())
+    bus = int(_read(busnum_path))
+    devnum = int(_read(devnum_path))
 
-    return f"/dev/bus/usb/{bus:03d}/{dev:03d}"
+    return os.path.join(dev, "bus", "usb", f"{bus:03d}", f"{devnum:03d}")
 
 
 def reset(devpath: str):
@@ -37,15 +70,225 @@ def reset(devpath: str):
         os.close(fd)
 
 
+# --- Escalating recovery -------------------------------------------------------
+
+def parent_port(busid: str, sysfs: str = SYSFS_ROOT) -> Tuple[str, int, str]:
+    """
+    Return (hub busid, port number, port sysfs dir) for a device, e.g.
+    "1-1.3" -> ("1-1", 3, ".../1-1:1.0/1-1-port3") and
+    "1-1" -> ("usb1", 1, ".../1-0:1.0/usb1-port1").
+    """
+    bus, _, chain = busid.partition("-")
+    if not bus or not chain:
+        raise ValueError(f"Not a USB device busid: {busid}")
+    head, dot, last = chain.rpartition(".")
+    port = int(last)
+    if dot:
+        hub, hub_interface = f"{bus}-{head}", f"{bus}-{head}:1.0"
+    else:
+        hub, hub_interface = f"usb{bus}", f"{bus}-0:1.0"
+
+    devices = _devices_dir(sysfs)
+    # Kernels since 3.x link each device to its port; prefer that.
+    link = os.path.join(devices, busid, "port")
+    if os.path.exists(link):
+        return hub, port, os.path.realpath(link)
+    return hub, port, os.path.join(devices, hub_interface, f"{hub}-port{port}")
+
+
+def device_state(busid: str, sysfs: str = SYSFS_ROOT) -> Dict[str, str] | None:
+    """
+    {"devnum", "configuration", "driver"} of a device, or None if it is not
+    on the bus. driver is "" while no driver is bound.
+    """
+    base = os.path.join(_devices_dir(sysfs), busid)
+    try:
+        devnum = _read(os.path.join(base, "devnum"))
+        configuration = _read(os.path.join(base, "bConfigurationValue"))
+    except OSError:
+        return None
+    driver_link = os.path.join(base, "driver")
+    driver = os.path.basename(os.path.realpath(driver_link)) if os.path.exists(driver_link) else ""
+    return {"devnum": devnum, "configuration": configuration, "driver": driver}
+
+
+def device_healthy(
+    busid: str,
+    sysfs: str = SYSFS_ROOT,
+    before: Dict[str, str] | None = None,
+    reenumerated: bool = False,
+) -> bool:
+    """
+    The device is back on the bus, configured and bound to a driver: the
+    one it had before the step (from device_state()), if it had one. With
+    reenumerated its devnum must also differ from before, i.e. it really
+    dropped off the bus and enumerated again.
+    """
+    state = device_state(busid, sysfs)
+    if state is None or not state["configuration"] or not state["driver"]:
+        return False
+    if before is None:
+        return True
+    if before["driver"] and state["driver"] != before["driver"]:
+        return False
+    return not reenumerated or state["devnum"] != before["devnum"]
+
+
+def usbip_stalled(busid: str, since: float, sysfs: str = SYSFS_ROOT) -> bool:
+    """
+    Default stall probe for recover(): usbip-host reports the device in
+    its error state. since is unused; callers with more signals (kernel
+    errors, URB traffic) pass their own probe.
+    """
+    return read_usbip_status(busid, _devices_dir(sysfs)) == "error"
+
+
+def port_cycle(busid: str, sysfs: str = SYSFS_ROOT, off_seconds: float = PORT_OFF_SECONDS) -> None:
+    """
+    Turn the device's parent hub port off and on again through the port's
+    "disable" attribute. The device drops off the bus and re-enumerates;
+    usbip-host picks it up again through its match_busid list.
+    """
+    _, _, port_dir = parent_port(busid, sysfs)
+    disable = os.path.join(port_dir, "disable")
+    if not os.path.exists(disable):
+        raise OSError(f"port control not supported: {disable} missing")
+    _write(disable, "1")
+    try:
+        time.sleep(off_seconds)
+    finally:
+        _write(disable, "0")
+
+
+def rebind(busid: str, sysfs: str = SYSFS_ROOT) -> None:
+    """
+    Unbind the device from its current driver and bind it again.
+    """
+    driver_link = os.path.join(_devices_dir(sysfs), busid, "driver")
+    if not os.path.exists(driver_link):
+        raise OSError(f"{busid} has no driver bound")
+    driver_dir = os.path.realpath(driver_link)
+    _write(os.path.join(driver_dir, "unbind"), busid)
+    _write(os.path.join(driver_dir, "bind"), busid)
+
+
+def _wait_healthy(healthy: Callable[[], bool], settle: float, hold: float) -> bool:
+    """
+    Wait up to settle seconds for healthy() to turn true, then require it
+    to stay true for hold seconds.
+    """
+    deadline = time.monotonic() + settle
+    healthy_since: float | None = None
+    while True:
+        now = time.monotonic()
+        if not healthy():
+            healthy_since = None
+            if now >= deadline:
+                return False
+        elif healthy_since is None:
+            healthy_since = now
+        if healthy_since is not None and now - healthy_since >= hold:
+            return True
+        time.sleep(SETTLE_POLL_SECONDS)
+
+
+def _recovered(
+    busid: str,
+    sysfs: str,
+    before: Dict[str, str] | None,
+    reenumerated: bool,
+    stalled: Callable[[str, float], bool],
+    since: float,
+) -> bool:
+    return device_healthy(busid, sysfs, before, reenumerated) and not stalled(busid, since)
+
+
+def recover(
+    busid: str,
+    first_step: str = STEP_RESET,
+    last_step: str = STEP_REBIND,
+    sysfs: str = SYSFS_ROOT,
+    dev: str = DEV_ROOT,
+    healthy: Callable[[str], bool] | None = None,
+    stalled: Callable[[str, float], bool] | None = None,
+    settle: float = SETTLE_SECONDS,
+    hold: float = HOLD_SECONDS,
+    off_seconds: float = PORT_OFF_SECONDS,
+    ioctl_reset: Callable[[str], None] = reset,
+) -> Dict[str, Any]:
+    """
+    Escalate through RECOVERY_STEPS (from first_step to last_step) until the
+    device is healthy again: ioctl reset, then a hub port power cycle, then
+    a driver unbind/rebind. After each step the device gets up to settle
+    seconds to come back and must then stay healthy for hold seconds:
+    configured and bound to its driver again (after a port cycle with a
+    new devnum, see device_healthy), and no longer stalled.
+
+    A reset or rebind leaves a wedged device configured and bound, so the
+    stall itself decides those steps: stalled(busid, since) is true while
+    the device still shows the stall, looking only at evidence from after
+    since (time.monotonic() when the step started). It defaults to
+    usbip_stalled. healthy replaces the whole check with a caller probe.
+
+    Returns {"busid", "ok", "recovered_by", "steps": [{"step", "ok", "ms",
+    "error"}]}. sysfs/dev/ioctl_reset can point at a simulated tree.
+    """
+    steps = RECOVERY_STEPS[RECOVERY_STEPS.index(first_step): RECOVERY_STEPS.index(last_step) + 1]
+    actions: Dict[str, Callable[[], None]] = {
+        STEP_RESET: lambda: ioctl_reset(resolve_devpath(busid, sysfs, dev)),
+        STEP_PORT_CYCLE: lambda: port_cycle(busid, sysfs, off_seconds),
+        STEP_REBIND: lambda: rebind(busid, sysfs),
+    }
+
+    results: List[Dict[str, Any]] = []
+    for step in steps:
+        start = time.monotonic()
+        error = None
+        if healthy is not None:
+            check = functools.partial(healthy, busid)
+        else:
+            before = device_state(busid, sysfs)
+            check = functools.partial(
+                _recovered, busid, sysfs, before, step == STEP_PORT_CYCLE,
+                stalled or functools.partial(usbip_stalled, sysfs=sysfs), start,
+            )
+        try:
+            actions[step]()
+            ok = _wait_healthy(check, settle, hold)
+            if not ok:
+                error = "device not healthy after step"
+        except Exception as exc:
+            ok = False
+            error = str(exc)
+        results.append({
+            "step": step,
+            "ok": ok,
+            "ms": round((time.monotonic() - start) * 1000, 1),
+            "error": error,
+        })
+        if ok:
+            return {"busid": busid, "ok": True, "recovered_by": step, "steps": results}
+    return {"busid": busid, "ok": False, "recovered_by": None, "steps": results}
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    args = sys.argv[1:]
+    escalate = "--recover" in args
+    args = [a for a in args if a != "--recover"]
+    if len(args) != 1:
         print(
-            f"Usage: {sys.argv[0]} /dev/bus/usb/BBB/DDD | <usb-id like 1-2.3[:1.0]>",
+            f"Usage: {sys.argv[0]} [--recover] /dev/bus/usb/BBB/DDD | <usb-id like 1-2.3[:1.0]>",
             file=sys.stderr,
         )
         sys.exit(1)
+    if escalate:
+        result = recover(args[0].split(":")[0])
+        for step in result["steps"]:
+            status = "ok" if step["ok"] else f"failed ({step['error']})"
+            print(f"{step['step']}: {status} in {step['ms']} ms")
+        sys.exit(0 if result["ok"] else 3)
     try:
-        path = resolve_devpath(sys.argv[1])
+        path = resolve_devpath(args[0])
     except Exception as exc:
         print(f"Error: {exc}", file=sys.stderr)
         sys.exit(2)
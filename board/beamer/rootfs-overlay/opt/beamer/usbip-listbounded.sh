@@ -1,2 +1,6 @@
 #!/bin/sh
-find /sys/bus/usb/drivers/usbip-host/ -maxdepth 1 -type l -exec basename {} \;
+# Print the busid of every device bound to usbip-host, one per line.
+for d in /sys/bus/usb/drivers/usbip-host/*-*; do
+  [ -L "$d" ] && echo "${d##*/}"
+done
+exit 0
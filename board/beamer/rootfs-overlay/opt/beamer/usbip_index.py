@@ -0,0 +1,102 @@
+import os
+import time
+from typing import Dict
+
+USBIP_HOST_DRIVER_DIR = "/sys/bus/usb/drivers/usbip-host"
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+# Values of the usbip-host "usbip_status" attribute (enum usbip_device_status).
+USBIP_STATUS_NAMES = {1: "available", 2: "in-use", 3: "error"}
+# Reported for devices bound to usbip-host whose status could not be read.
+STATUS_BOUND = "bound"
+
+
+def read_usbip_status(busid: str, devices_dir: str = SYSFS_USB_DEVICES) -> str:
+    try:
+        with open(os.path.join(devices_dir, busid, "usbip_status")) as f:
+            raw = f.read().strip()
+    except OSError:
+        return STATUS_BOUND
+    try:
+        return USBIP_STATUS_NAMES.get(int(raw), STATUS_BOUND)
+    except ValueError:
+        return STATUS_BOUND
+
+
+class BoundDeviceIndex:
+    """
+    busid -> usbip state ("available", "in-use", "error" or "bound") for every
+    device bound to usbip-host, read straight from sysfs.
+
+    rescan() rebuilds it from the driver directory, refresh(busid) updates a
+    single entry after a bind/unbind event. Lookups never touch the disk.
+    """
+
+    def __init__(
+        self,
+        driver_dir: str = USBIP_HOST_DRIVER_DIR,
+        devices_dir: str = SYSFS_USB_DEVICES,
+    ) -> None:
+        self._driver_dir = driver_dir
+        self._devices_dir = devices_dir
+        self._status: Dict[str, str] = {}
+        self.updated_at = 0.0
+
+    def age(self) -> float:
+        if not self.updated_at:
+            return float("inf")
+        return time.monotonic() - self.updated_at
+
+    def _bound_busids(self) -> list[str]:
+        try:
+            entries = os.listdir(self._driver_dir)
+        except OSError:
+            return []
+        # Bound devices appear as busid symlinks next to the driver's own
+        # attributes (bind, unbind, match_busid, ...), which have no dash.
+        return [
+            e
+            for e in entries
+            if "-" in e and ":" not in e and os.path.islink(os.path.join(self._driver_dir, e))
+        ]
+
+    def rescan(self) -> Dict[str, str | None]:
+        """
+        Rebuild the index. Returns {busid: new status or None if unbound}
+        for every entry that changed.
+        """
+        status = {
+            busid: read_usbip_status(busid, self._devices_dir)
+            for busid in self._bound_busids()
+        }
+        changes: Dict[str, str | None] = {
+            busid: state for busid, state in status.items() if self._status.get(busid) != state
+        }
+        changes.update({busid: None for busid in self._status if busid not in status})
+        self._status = status
+        self.updated_at = time.monotonic()
+        return changes
+
+    def refresh(self, busid: str) -> Dict[str, str | None]:
+        """
+        Re-read a single busid. Returns the change, if any, like rescan().
+        """
+        bound = os.path.islink(os.path.join(self._driver_dir, busid))
+        state = read_usbip_status(busid, self._devices_dir) if bound else None
+        if self._status.get(busid) == state:
+            return {}
+        if state is None:
+            self._status.pop(busid, None)
+        else:
+            self._status[busid] = state
+        return {busid: state}
+
+    def status(self, busid: str) -> str | None:
+        """State of a bound busid, None if it is not bound to usbip-host."""
+        return self._status.get(busid)
+
+    def snapshot(self) -> Dict[str, str]:
+        return dict(self._status)
+
+    def busids(self) -> list[str]:
+        return sorted(self._status)
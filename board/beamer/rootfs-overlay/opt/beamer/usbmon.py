@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Per-device USB traffic sampling from the usbmon text interface.
+
+Each exported device gets bytes/s, URB/s and a submit-to-complete latency
+histogram, all kept in fixed-size structures. The parser works on plain
+lines, so it can be run against a recorded capture:
+
+    cat /sys/kernel/debug/usb/usbmon/1u > capture.txt
+    python3 usbmon.py capture.txt
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Tuple
+
+USBMON_DIR = "/sys/kernel/debug/usb/usbmon"
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+# usbmon text timestamps wrap every 4096 seconds.
+USBMON_TS_WRAP_US = 4096 * 1_000_000
+# Latency histogram bucket upper bounds in microseconds; one overflow bucket
+# follows the last bound.
+LATENCY_BUCKETS_US = (125, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+RATE_WINDOW_SECONDS = 10
+MAX_PENDING_URBS = 4096
+# usbmon prints at most this many iso descriptors, whatever the count says.
+ISODESC_MAX = 5
+
+_logger = logging.getLogger(__name__)
+
+
+class UsbmonEvent(NamedTuple):
+    tag: str
+    ts_us: int
+    kind: str  # "S" submit, "C" complete, "E" error
+    xfer: str  # "C" control, "Z" iso, "I" interrupt, "B" bulk
+    direction: str  # "i" or "o"
+    bus: int
+    devnum: int
+    endpoint: int
+    status: int | None
+    length: int
+
+
+def parse_usbmon_line(line: str) -> UsbmonEvent | None:
+    """
+    Parse one line of the usbmon "u" text format. Returns None for lines that
+    cannot be parsed.
+    """
+    words = line.split()
+    if len(words) < 5:
+        return None
+    try:
+        tag, ts, kind, address = words[0], int(words[1]), words[2], words[3]
+        type_dir, bus, devnum, endpoint = address.split(":")
+        xfer, direction = type_dir[0], type_dir[1]
+        idx = 4
+        status: int | None = None
+        if words[idx] == "s":
+            # Control submission: "s" followed by the 5-word setup packet.
+            idx += 6
+        else:
+            status_word = words[idx]
+            if status_word.lstrip("-").split(":")[0].isdigit():
+                status = int(status_word.split(":")[0])
+            idx += 1
+            if xfer == "Z" and kind in ("S", "C") and idx < len(words):
+                # Iso: descriptor count, then up to ISODESC_MAX descriptors.
+                idx += 1 + min(int(words[idx]), ISODESC_MAX)
+        length = int(words[idx]) if idx < len(words) else 0
+        return UsbmonEvent(
+            tag, ts, kind, xfer, direction, int(bus), int(devnum), int(endpoint), status, length
+        )
+    except (ValueError, IndexError):
+        return None
+
+
+class UrbStats:
+    """
+    Traffic counters for one device: per-second byte and URB counts over the
+    last RATE_WINDOW_SECONDS seconds and a fixed-bucket latency histogram.
+    """
+
+    def __init__(self, window_seconds: int = RATE_WINDOW_SECONDS) -> None:
+        self._seconds: Deque[List[int]] = deque(maxlen=window_seconds)  # [second, bytes, urbs]
+        self._pending: "OrderedDict[str, int]" = OrderedDict()
+        self.latency_hist = [0] * (len(LATENCY_BUCKETS_US) + 1)
+        self.total_bytes = 0
+        self.total_urbs = 0
+        self.errors = 0
+
+    def submit(self, tag: str, ts_us: int) -> None:
+        self._pending[tag] = ts_us
+        if len(self._pending) > MAX_PENDING_URBS:
+            self._pending.popitem(last=False)
+
+    def complete(self, tag: str, ts_us: int, length: int, error: bool, now: float) -> None:
+        self.total_urbs += 1
+        self.total_bytes += length
+        if error:
+            self.errors += 1
+        second = int(now)
+        if self._seconds and self._seconds[-1][0] == second:
+            self._seconds[-1][1] += length
+            self._seconds[-1][2] += 1
+        else:
+            self._seconds.append([second, length, 1])
+        submitted = self._pending.pop(tag, None)
+        if submitted is not None:
+            latency = (ts_us - submitted) % USBMON_TS_WRAP_US
+            bucket = 0
+            while bucket < len(LATENCY_BUCKETS_US) and latency > LATENCY_BUCKETS_US[bucket]:
+                bucket += 1
+            self.latency_hist[bucket] += 1
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        window = self._seconds.maxlen or 1
+        current = int(now)
+        recent_bytes = recent_urbs = 0
+        for second, nbytes, urbs in self._seconds:
+            if current - second < window:
+                recent_bytes += nbytes
+                recent_urbs += urbs
+        labels = [f"le_{b}us" for b in LATENCY_BUCKETS_US] + ["overflow"]
+        return {
+            "bytes_per_second": round(recent_bytes / window, 1),
+            "urbs_per_second": round(recent_urbs / window, 1),
+            "total_bytes": self.total_bytes,
+            "total_urbs": self.total_urbs,
+            "errors": self.errors,
+            "pending_urbs": len(self._pending),
+            "latency_histogram": dict(zip(labels, self.latency_hist)),
+        }
+
+
+class UsbmonSampler:
+    """
+    Feeds usbmon events into UrbStats for the devices it has been told to
+    watch, keyed by busid.
+
+    Rates are windowed on the local monotonic clock; with replay=True the
+    capture's own timestamps are used instead so recordings can be analysed.
+    """
+
+    def __init__(self, replay: bool = False) -> None:
+        self._replay = replay
+        self._clock = 0.0
+        self._lock = threading.Lock()
+        self._addr_to_busid: Dict[Tuple[int, int], str] = {}
+        self._stats: Dict[str, UrbStats] = {}
+        self._readers: Dict[int, threading.Thread] = {}
+
+    def set_devices(self, addresses: Dict[str, Tuple[int, int]]) -> None:
+        """
+        Replace the watched devices with busid -> (bus, devnum).
+        """
+        with self._lock:
+            self._addr_to_busid = {addr: busid for busid, addr in addresses.items()}
+            self._stats = {busid: self._stats.get(busid) or UrbStats() for busid in addresses}
+
+    def feed(self, line: str) -> None:
+        event = parse_usbmon_line(line)
+        if event is None:
+            return
+        with self._lock:
+            self._clock = event.ts_us / 1_000_000 if self._replay else time.monotonic()
+            busid = self._addr_to_busid.get((event.bus, event.devnum))
+            if busid is None:
+                return
+            stats = self._stats[busid]
+            if event.kind == "S":
+                stats.submit(event.tag, event.ts_us)
+            else:
+                error = event.kind == "E" or (event.status is not None and event.status < 0)
+                stats.complete(event.tag, event.ts_us, event.length, error, self._clock)
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.feed(line)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            now = self._clock if self._replay else time.monotonic()
+            return {busid: stats.snapshot(now) for busid, stats in self._stats.items()}
+
+    # --- live capture ----------------------------------------------------------
+
+    def _read_bus(self, bus: int) -> None:
+        path = os.path.join(USBMON_DIR, f"{bus}u")
+        try:
+            with open(path, "r", errors="replace") as f:
+                for line in f:
+                    self.feed(line)
+        except OSError as exc:
+            _logger.warning("usbmon reader for bus %d stopped: %s", bus, exc)
+        finally:
+            with self._lock:
+                self._readers.pop(bus, None)
+
+    def ensure_readers(self) -> None:
+        """
+        Start a reader thread for every bus that has a watched device. Reads
+        on usbmon files block until traffic arrives, so readers are daemon
+        threads that live for the rest of the process.
+        """
+        with self._lock:
+            buses = {bus for bus, _ in self._addr_to_busid}
+            for bus in buses - set(self._readers):
+                thread = threading.Thread(
+                    target=self._read_bus, args=(bus,), name=f"usbmon-{bus}", daemon=True
+                )
+                self._readers[bus] = thread
+                thread.start()
+
+
+def usbmon_available() -> bool:
+    return os.path.isdir(USBMON_DIR)
+
+
+def device_address(busid: str) -> Tuple[int, int] | None:
+    """
+    (busnum, devnum) of a USB device from sysfs, None if it is gone.
+    """
+    try:
+        with open(os.path.join(SYSFS_USB_DEVICES, busid, "busnum")) as f:
+            bus = int(f.read().strip())
+        with open(os.path.join(SYSFS_USB_DEVICES, busid, "devnum")) as f:
+            dev = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    return bus, dev
+
+
+if __name__ == "__main__":
+    # Replay a capture and print per bus:devnum statistics.
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <usbmon-capture.txt>", file=sys.stderr)
+        sys.exit(1)
+    with open(sys.argv[1], errors="replace") as capture:
+        lines = capture.readlines()
+    addresses: Dict[str, Tuple[int, int]] = {}
+    for raw in lines:
+        parsed = parse_usbmon_line(raw)
+        if parsed is not None:
+            addresses.setdefault(f"{parsed.bus}:{parsed.devnum:03d}", (parsed.bus, parsed.devnum))
+    sampler = UsbmonSampler(replay=True)
+    sampler.set_devices(addresses)
+    start = time.monotonic()
+    sampler.feed_lines(lines)
+    elapsed = time.monotonic() - start
+    print(json.dumps(sampler.snapshot(), indent=2, sort_keys=True))
+    print(f"parsed {len(lines)} lines in {elapsed:.3f}s", file=sys.stderr)
@@ -0,0 +1,167 @@
+import logging
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+WIFI_CONNECT_SCRIPT = "/usr/scripts/wifi_connect.sh"
+
+# Connect job states, in the order a successful attempt goes through them.
+STATE_PENDING = "pending"
+STATE_WRITING_CONFIG = "writing_config"
+STATE_ASSOCIATING = "associating"
+STATE_DHCP = "dhcp"
+STATE_VERIFIED = "verified"
+STATE_FAILED = "failed"
+FINAL_STATES = {STATE_VERIFIED, STATE_FAILED}
+
+# Finished jobs kept around for status polling.
+MAX_FINISHED_JOBS = 8
+
+_logger = logging.getLogger(__name__)
+
+
+class ConnectJob:
+    """
+    One attempt to join a Wi‑Fi network. Progress is reported by
+    wifi_connect.sh as "STATE <name>" lines on stdout.
+    """
+
+    def __init__(self, ssid: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.ssid = ssid
+        self.state = STATE_PENDING
+        self.error: str | None = None
+        self.warning: str | None = None
+        self.rolled_back = False
+        self.history: List[Dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self.set_state(STATE_PENDING)
+
+    def set_state(self, state: str) -> None:
+        with self._lock:
+            self.state = state
+            self.history.append(
+                {"state": state, "elapsed": round(time.monotonic() - self._started, 2)}
+            )
+        _logger.info("wifi connect job %s: %s", self.id, state)
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINAL_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "ssid": self.ssid,
+                "state": self.state,
+                "done": self.state in FINAL_STATES,
+                "error": self.error,
+                "warning": self.warning,
+                "rolled_back": self.rolled_back,
+                "history": list(self.history),
+            }
+
+
+class ConnectJobRunner:
+    """
+    Runs at most one connect job at a time on a background thread.
+
+    write_config(ssid, password) -> wpa_supplicant config path
+    persist(ssid, password)      -> store config for future boots
+    rollback()                   -> bring the provisioning AP back up
+    """
+
+    def __init__(
+        self,
+        write_config: Callable[[str, str], str],
+        persist: Callable[[str, str], None],
+        rollback: Callable[[], None],
+        iface: str = "wlan0",
+        timeout_seconds: int = 25,
+    ) -> None:
+        self._write_config = write_config
+        self._persist = persist
+        self._rollback = rollback
+        self._iface = iface
+        self._timeout = timeout_seconds
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ConnectJob] = {}
+        self._active: ConnectJob | None = None
+        self.connecting = threading.Event()
+
+    def start(self, ssid: str, password: str) -> ConnectJob:
+        """
+        Start a new job, or return the running one if a connect is already
+        in progress.
+        """
+        with self._lock:
+            if self._active is not None and not self._active.done:
+                return self._active
+            job = ConnectJob(ssid)
+            self._jobs[job.id] = job
+            self._active = job
+            self._prune()
+            self.connecting.set()
+        thread = threading.Thread(
+            target=self._run, args=(job, password), name=f"wifi-connect-{job.id}", daemon=True
+        )
+        thread.start()
+        return job
+
+    def get(self, job_id: str) -> ConnectJob | None:
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.done]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def _run_script(self, job: ConnectJob, conf_path: str) -> bool:
+        proc = subprocess.Popen(
+            ["/bin/sh", WIFI_CONNECT_SCRIPT, self._iface, conf_path, str(self._timeout)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for line in proc.stdout:
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == "STATE" and parts[1] in (STATE_ASSOCIATING, STATE_DHCP):
+                job.set_state(parts[1])
+        try:
+            return proc.wait(timeout=self._timeout + 15) == 0
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            return False
+
+    def _run(self, job: ConnectJob, password: str) -> None:
+        try:
+            job.set_state(STATE_WRITING_CONFIG)
+            conf_path = self._write_config(job.ssid, password)
+            ok = self._run_script(job, conf_path)
+            if not ok:
+                job.error = "Failed to connect. Check credentials and try again."
+                self._rollback()
+                job.rolled_back = True
+                job.set_state(STATE_FAILED)
+                return
+            try:
+                self._persist(job.ssid, password)
+            except Exception as exc:
+                # The live connection works; only persistence failed.
+                job.warning = f"Connected, but failed to save config to /boot: {exc}"
+            job.set_state(STATE_VERIFIED)
+        except Exception as exc:
+            _logger.exception("wifi connect job %s failed", job.id)
+            job.error = str(exc)
+            try:
+                self._rollback()
+                job.rolled_back = True
+            except Exception:
+                _logger.exception("rollback to provisioning AP failed")
+            job.set_state(STATE_FAILED)
+        finally:
+            self.connecting.clear()
@@ -0,0 +1,181 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+WIFI_IFACE = "wlan0"
+SCAN_INTERVAL_SECONDS = float(os.environ.get("WIFI_SCAN_INTERVAL", 60))
+SCAN_TIMEOUT_SECONDS = 20
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_iw_scan(output: str) -> List[Dict[str, Any]]:
+    """
+    Parse `iw dev <iface> scan` output into one entry per BSS:
+    {"bssid", "ssid", "signal", "frequency", "secure"}.
+    """
+    entries: List[Dict[str, Any]] = []
+    current: Dict[str, Any] | None = None
+    for line in output.splitlines():
+        stripped = line.strip()
+        if line.startswith("BSS "):
+            # "BSS aa:bb:cc:dd:ee:ff(on wlan0) -- associated"
+            current = {
+                "bssid": stripped[4:21],
+                "ssid": None,
+                "signal": None,
+                "frequency": None,
+                "secure": False,
+            }
+            entries.append(current)
+        elif current is None:
+            continue
+        elif stripped.startswith("SSID:"):
+            current["ssid"] = stripped[5:].strip()
+        elif stripped.startswith("signal:"):
+            # "signal: -46.00 dBm"
+            try:
+                current["signal"] = float(stripped.split()[1])
+            except (ValueError, IndexError):
+                pass
+        elif stripped.startswith("freq:"):
+            try:
+                current["frequency"] = int(float(stripped.split()[1]))
+            except (ValueError, IndexError):
+                pass
+        elif stripped.startswith(("RSN:", "WPA:")):
+            current["secure"] = True
+        elif stripped.startswith("capability:"):
+            # "capability: ESS Privacy ShortSlotTime (0x0411)"; WEP has no RSN/WPA IE
+            if "Privacy" in stripped.split()[1:]:
+                current["secure"] = True
+    return entries
+
+
+def merge_networks(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fold BSS entries into one network per SSID, keeping the strongest signal,
+    ranked by signal (strongest first). Hidden (empty) SSIDs are dropped.
+    """
+    best: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        ssid = entry.get("ssid")
+        if not ssid or "\\x00" in ssid:
+            continue
+        signal = entry.get("signal")
+        known = best.get(ssid)
+        if known is None:
+            best[ssid] = {
+                "ssid": ssid,
+                "signal": signal,
+                "frequency": entry.get("frequency"),
+                "secure": entry.get("secure", False),
+                "bss_count": 1,
+            }
+            continue
+        known["bss_count"] += 1
+        known["secure"] = known["secure"] or entry.get("secure", False)
+        if signal is not None and (known["signal"] is None or signal > known["signal"]):
+            known["signal"] = signal
+            known["frequency"] = entry.get("frequency")
+    return sorted(
+        best.values(),
+        key=lambda n: (n["signal"] is None, -(n["signal"] or 0.0), n["ssid"].lower()),
+    )
+
+
+def run_iw_scan(iface: str = WIFI_IFACE) -> List[Dict[str, Any]]:
+    """
+    Run a scan and return merged, ranked networks. Raises RuntimeError on failure.
+    """
+    proc = subprocess.run(
+        ["iw", "dev", iface, "scan"],
+        capture_output=True,
+        text=True,
+        check=False,
+        timeout=SCAN_TIMEOUT_SECONDS,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or "Wi‑Fi scan failed")
+    return merge_networks(parse_iw_scan(proc.stdout))
+
+
+class WifiScanCache:
+    """
+    Refreshes the scan results in a background thread every interval seconds
+    so requests are answered from memory. Refreshes are skipped while
+    `busy()` reports a connect attempt in progress.
+    """
+
+    def __init__(
+        self,
+        busy: Callable[[], bool] = lambda: False,
+        interval: float = SCAN_INTERVAL_SECONDS,
+        scan: Callable[[], List[Dict[str, Any]]] = run_iw_scan,
+    ) -> None:
+        self._busy = busy
+        self._interval = interval
+        self._scan = scan
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._first_done = threading.Event()
+        self._networks: List[Dict[str, Any]] = []
+        self._error: str | None = None
+        self._updated_at: float | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the background thread (idempotent)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="wifi-scan", daemon=True)
+                self._thread.start()
+
+    def request_refresh(self) -> None:
+        """Ask for a scan as soon as possible instead of waiting for the timer."""
+        self._wake.set()
+
+    def refresh(self) -> None:
+        if self._busy():
+            _logger.info("skipping Wi‑Fi scan; connect in progress")
+            return
+        try:
+            networks = self._scan()
+        except Exception as exc:
+            with self._lock:
+                self._error = str(exc) or "Wi‑Fi scan failed"
+            _logger.warning("Wi‑Fi scan failed: %s", exc)
+        else:
+            with self._lock:
+                self._networks = networks
+                self._error = None
+                self._updated_at = time.monotonic()
+        finally:
+            self._first_done.set()
+
+    def _run(self) -> None:
+        while True:
+            self.refresh()
+            self._wake.wait(self._interval)
+            self._wake.clear()
+
+    def get(self, wait: float = 0.0) -> Dict[str, Any]:
+        """
+        Cached results as {"ok", "networks", "error", "age"}. With wait > 0,
+        block up to that long for the very first scan to complete.
+        """
+        if wait > 0:
+            self._first_done.wait(wait)
+        with self._lock:
+            age = None
+            if self._updated_at is not None:
+                age = round(time.monotonic() - self._updated_at, 1)
+            return {
+                "ok": self._error is None or bool(self._networks),
+                "networks": list(self._networks),
+                "error": self._error,
+                "age": age,
+            }
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Blocking work is split by kind so one kind cannot starve another.
+LANE_ENUMERATE = "enumerate"  # list-plugged.sh, usbip-host rescans, usbmon setup
+LANE_CONTROL = "control"  # resets, port cycles, rebinds, reboot
+LANE_FILES = "files"  # log store, pairing/policy files, SSH keys
+
+# Worker threads per lane. The control lane has its own workers, so a
+# reset always gets a slot no matter how much enumeration is queued.
+LANE_WORKERS = {
+    LANE_ENUMERATE: int(os.environ.get("LANE_ENUMERATE_WORKERS", 2)),
+    LANE_CONTROL: int(os.environ.get("LANE_CONTROL_WORKERS", 2)),
+    LANE_FILES: int(os.environ.get("LANE_FILES_WORKERS", 2)),
+}
+
+# Recent calls per lane kept for the wait/run distributions.
+LANE_SAMPLES = 256
+
+
+class _LaneStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=LANE_SAMPLES)  # (wait_ms, run_ms)
+
+
+def _distribution(values: list) -> Dict[str, float | None]:
+    if not values:
+        return {"p50": None, "p99": None, "max": None}
+    values.sort()
+    return {
+        "p50": round(values[len(values) // 2], 2),
+        "p99": round(values[min(len(values) - 1, int(0.99 * len(values)))], 2),
+        "max": round(values[-1], 2),
+    }
+
+
+class WorkerLanes:
+    """
+    A bounded thread pool per kind of blocking work, replacing the single
+    shared anyio limiter. run(lane, fn, *args) awaits fn(*args) on that
+    lane's workers and records how long it queued and how long it ran.
+    """
+
+    def __init__(self, workers: Dict[str, int] | None = None) -> None:
+        workers = workers or LANE_WORKERS
+        self._pools = {
+            lane: ThreadPoolExecutor(max_workers=max(1, count), thread_name_prefix=f"lane-{lane}")
+            for lane, count in workers.items()
+        }
+        self._workers = {lane: max(1, count) for lane, count in workers.items()}
+        self._stats = {lane: _LaneStats() for lane in workers}
+
+    async def run(self, lane: str, fn: Callable[..., T], *args: Any) -> T:
+        stats = self._stats[lane]
+        submitted = time.monotonic()
+        with stats.lock:
+            stats.submitted += 1
+
+        def call() -> T:
+            started = time.monotonic()
+            with stats.lock:
+                stats.started += 1
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                finished = time.monotonic()
+                with stats.lock:
+                    if ok:
+                        stats.completed += 1
+                    else:
+                        stats.failed += 1
+                    stats.samples.append(((started - submitted) * 1000, (finished - started) * 1000))
+
+        return await asyncio.get_running_loop().run_in_executor(self._pools[lane], call)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for lane, stats in self._stats.items():
+            with stats.lock:
+                waits = [w for w, _ in stats.samples]
+                runs = [r for _, r in stats.samples]
+                finished = stats.completed + stats.failed
+                out[lane] = {
+                    "workers": self._workers[lane],
+                    "queued": stats.submitted - stats.started,
+                    "running": stats.started - finished,
+                    "completed": stats.completed,
+                    "failed": stats.failed,
+                    "queue_wait_ms": _distribution(waits),
+                    "run_ms": _distribution(runs),
+                }
+        return out
@@ -7,12 +7,22 @@ Parses netplan-style YAML configuration and converts it to traditional
 Designed for embedded Linux systems without systemd/networkd.
 """
 
-import yaml
 import argparse
+import hashlib
+import json
 import os
+import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Bump whenever the generated output changes for the same input, so that
+# configs converted by an older version are regenerated on the next boot.
+CONVERTER_VERSION = "2"
+STAMP_NAME = ".netplan_converter.stamp"
+
 
 class NetplanConverter:
     def __init__(self, netplan_config):
@@ -25,6 +35,7 @@ class NetplanConverter:
         self.config = netplan_config
         self.interfaces_content = []
         self.wpa_configs = {}  # interface -> wpa_supplicant config
+        self.blocks = {}  # interface -> parsed block (see parse_interfaces)
         
     def convert(self):
         """
@@ -65,7 +76,9 @@ class NetplanConverter:
         if 'wifis' in network:
             self._process_wifis(network['wifis'])
         
-        return '\n'.join(self.interfaces_content), self.wpa_configs
+        interfaces_content = '\n'.join(self.interfaces_content)
+        self.blocks = parse_interfaces(interfaces_content)
+        return interfaces_content, self.wpa_configs
     
     def _process_ethernets(self, ethernets):
         """Process ethernet interface configurations."""
@@ -243,6 +256,144 @@ class NetplanConverter:
         ])
 
 
+def parse_interfaces(content):
+    """
+    Parse /etc/network/interfaces text into per-interface blocks.
+    
+    Args:
+        content: File content
+        
+    Returns:
+        dict: interface -> {"auto": bool, "family": str, "method": str,
+              "options": [str, ...]} with options in file order
+    """
+    blocks = {}
+    auto = set()
+    current = None
+    for raw in content.splitlines():
+        line = raw.split('#', 1)[0].strip()
+        if not line:
+            continue
+        words = line.split()
+        if words[0] in ('auto', 'allow-hotplug'):
+            auto.update(words[1:])
+            current = None
+        elif words[0] == 'iface' and len(words) >= 4:
+            current = {
+                'auto': False,
+                'family': words[2],
+                'method': words[3],
+                'options': [],
+            }
+            blocks[words[1]] = current
+        elif current is not None:
+            current['options'].append(' '.join(words))
+    for name, block in blocks.items():
+        block['auto'] = name in auto
+    return blocks
+
+
+def read_active_config(interfaces_path, wpa_dir):
+    """
+    Load the currently active interfaces blocks and wpa_supplicant configs.
+    
+    Args:
+        interfaces_path: Path of the active interfaces file
+        wpa_dir: Directory holding wpa_supplicant-<iface>.conf files
+        
+    Returns:
+        tuple: (blocks, wpa_configs) as produced by the converter
+    """
+    try:
+        with open(interfaces_path, 'r') as f:
+            blocks = parse_interfaces(f.read())
+    except FileNotFoundError:
+        blocks = {}
+    wpa_configs = {}
+    for iface_name in blocks:
+        try:
+            with open(Path(wpa_dir) / f"wpa_supplicant-{iface_name}.conf", 'r') as f:
+                wpa_configs[iface_name] = f.read()
+        except FileNotFoundError:
+            pass
+    return blocks, wpa_configs
+
+
+def compute_apply_plan(old_blocks, old_wpa, new_blocks, new_wpa):
+    """
+    Work out the smallest set of actions that moves the running system from
+    the old configuration to the new one.
+    
+    Interfaces whose block is unchanged are left alone, so sessions on them
+    (e.g. USB/IP over eth0) survive. An interface whose only change is its
+    wpa_supplicant access-point list gets a wpa reconfigure instead of a
+    restart.
+    
+    Args:
+        old_blocks, old_wpa: Active configuration (see read_active_config)
+        new_blocks, new_wpa: Generated configuration
+        
+    Returns:
+        list: Steps as {"phase": "pre"|"post", "action": "ifdown"|"ifup"|
+              "wpa_reconfigure", "iface": str}. "pre" steps must run before
+              the new files are written (ifdown needs the old stanza),
+              "post" steps after.
+    """
+    plan = []
+    for iface_name in sorted(set(old_blocks) | set(new_blocks)):
+        old = old_blocks.get(iface_name)
+        new = new_blocks.get(iface_name)
+        if old == new:
+            if old_wpa.get(iface_name) != new_wpa.get(iface_name) and new_wpa.get(iface_name):
+                plan.append({'phase': 'post', 'action': 'wpa_reconfigure', 'iface': iface_name})
+            continue
+        if old is not None and old['auto']:
+            plan.append({'phase': 'pre', 'action': 'ifdown', 'iface': iface_name})
+        if new is not None and new['auto']:
+            plan.append({'phase': 'post', 'action': 'ifup', 'iface': iface_name})
+    return plan
+
+
+def _plan_commands(step):
+    iface_name = step['iface']
+    if step['action'] == 'ifdown':
+        return [['ifdown', iface_name]]
+    if step['action'] == 'ifup':
+        return [['ifup', iface_name]]
+    # wpa_cli needs a ctrl_interface, which the BusyBox build here does not
+    # accept; SIGHUP makes wpa_supplicant re-read its config file as well.
+    return [['wpa_cli', '-i', iface_name, 'reconfigure'], ['killall', '-HUP', 'wpa_supplicant']]
+
+
+def execute_plan(plan, phase):
+    """
+    Run the steps of one phase of an apply plan.
+    
+    Args:
+        plan: Steps from compute_apply_plan
+        phase: "pre" or "post"
+        
+    Returns:
+        bool: True if every step succeeded
+    """
+    ok = True
+    for step in plan:
+        if step['phase'] != phase:
+            continue
+        for cmd in _plan_commands(step):
+            print(f"Running: {' '.join(cmd)}")
+            try:
+                result = subprocess.run(cmd, check=False)
+            except FileNotFoundError:
+                continue
+            if result.returncode == 0:
+                break
+        else:
+            print(f"Warning: {step['action']} {step['iface']} failed", file=sys.stderr)
+            ok = False
+    return ok
+
+
 def load_netplan_config(file_path):
     """
     Load netplan configuration from YAML file.
@@ -253,21 +404,133 @@ def load_netplan_config(file_path):
     Returns:
         dict: Parsed configuration
     """
+    # Imported lazily: the unchanged-input fast path never needs PyYAML.
+    import yaml
+
+    # The libyaml-backed loader is several times faster where available.
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
     with open(file_path, 'r') as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=loader)
     return config
 
 
-def write_output_files(interfaces_content, wpa_configs, output_dir, dry_run=False):
+def input_digest(file_path):
+    """
+    Hash of the input file contents plus the converter version.
+    
+    Args:
+        file_path: Path to netplan YAML configuration file
+        
+    Returns:
+        str: Hex digest
+    """
+    h = hashlib.sha256(CONVERTER_VERSION.encode())
+    with open(file_path, 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def output_paths(output_dir):
+    """
+    Return (interfaces_path, wpa_dir, stamp_path) for an output directory
+    (None = actual system paths).
+    """
+    if output_dir:
+        output_dir = Path(output_dir)
+        return output_dir / "interfaces", output_dir / "wpa_supplicant", output_dir / STAMP_NAME
+    return (
+        Path("/etc/network/interfaces"),
+        Path("/etc/wpa_supplicant"),
+        Path("/etc/network") / STAMP_NAME,
+    )
+
+
+def file_hash(path):
+    """
+    SHA-256 hex digest of a file's contents, or None if it cannot be read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def is_up_to_date(digest, output_dir):
+    """
+    True if the stamp next to the outputs records this digest and every
+    output it lists still has the content written then. Outputs edited
+    since (e.g. wpa_supplicant-wlan0.conf rewritten during provisioning)
+    make the input out of date again.
+    """
+    _, _, stamp_path = output_paths(output_dir)
+    try:
+        with open(stamp_path, 'r') as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return False
+    outputs = stamp.get('outputs')
+    if stamp.get('digest') != digest or not isinstance(outputs, dict) or not outputs:
+        return False
+    return all(file_hash(p) == h for p, h in outputs.items())
+
+
+def write_if_changed(path, content, mode=0o644):
+    """
+    Atomically replace path with content unless it already holds exactly
+    that content.
+    
+    Args:
+        path: Destination file
+        content: Text to write
+        mode: Permission bits for the file
+        
+    Returns:
+        bool: True if the file was written
+    """
+    path = Path(path)
+    data = content.encode()
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                if (os.stat(path).st_mode & 0o777) != mode:
+                    os.chmod(path, mode)
+                return False
+    except FileNotFoundError:
+        pass
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return True
+
+
+def write_output_files(interfaces_content, wpa_configs, output_dir, dry_run=False, digest=None,
+                       verbose=True):
     """
     Write generated configuration files to disk.
     
+    Files are replaced atomically and only when their content differs.
+    
     Args:
         interfaces_content: Content for /etc/network/interfaces
         wpa_configs: Dictionary of interface -> wpa_supplicant config
         output_dir: Directory to write files to (None = actual system paths)
         dry_run: If True, print to stdout instead of writing files
+        digest: Input digest to record in the stamp file (None = no stamp)
+        verbose: If False, write silently (used by batch mode)
     """
+    log = print if verbose else (lambda *a, **k: None)
     if dry_run:
         print("=" * 60)
         print("Generated /etc/network/interfaces:")
@@ -283,32 +546,149 @@ def write_output_files(interfaces_content, wpa_configs, output_dir, dry_run=Fals
             print()
     else:
         # Determine output paths
-        if output_dir:
-            output_dir = Path(output_dir)
-            output_dir.mkdir(parents=True, exist_ok=True)
-            interfaces_path = output_dir / "interfaces"
-            wpa_dir = output_dir / "wpa_supplicant"
-            wpa_dir.mkdir(exist_ok=True)
-        else:
-            interfaces_path = Path("/etc/network/interfaces")
-            wpa_dir = Path("/etc/wpa_supplicant")
-            wpa_dir.mkdir(parents=True, exist_ok=True)
+        interfaces_path, wpa_dir, stamp_path = output_paths(output_dir)
+        interfaces_path.parent.mkdir(parents=True, exist_ok=True)
+        wpa_dir.mkdir(parents=True, exist_ok=True)
+        outputs = {str(interfaces_path): hashlib.sha256(interfaces_content.encode()).hexdigest()}
         
         # Write /etc/network/interfaces
-        print(f"Writing {interfaces_path}...")
-        with open(interfaces_path, 'w') as f:
-            f.write(interfaces_content)
+        if write_if_changed(interfaces_path, interfaces_content):
+            log(f"Wrote {interfaces_path}")
+        else:
+            log(f"Unchanged {interfaces_path}")
         
-        # Write wpa_supplicant configs
+        # Write wpa_supplicant configs, with restrictive permissions
+        # (they contain passwords)
         for iface_name, wpa_content in wpa_configs.items():
             wpa_path = wpa_dir / f"wpa_supplicant-{iface_name}.conf"
-            print(f"Writing {wpa_path}...")
-            with open(wpa_path, 'w') as f:
-                f.write(wpa_content)
-            # Set restrictive permissions on WiFi config (contains passwords)
-            os.chmod(wpa_path, 0o600)
+            outputs[str(wpa_path)] = hashlib.sha256(wpa_content.encode()).hexdigest()
+            if write_if_changed(wpa_path, wpa_content, mode=0o600):
+                log(f"Wrote {wpa_path}")
+            else:
+                log(f"Unchanged {wpa_path}")
+        
+        if digest is not None:
+            stamp = json.dumps({'digest': digest, 'outputs': outputs}, indent=1) + '\n'
+            write_if_changed(stamp_path, stamp)
+        
+        log("Configuration files written successfully!")
+
+
+def find_batch_inputs(source):
+    """
+    Resolve a batch source into (input_file, output_name) pairs.
+    
+    A directory contributes every *.yaml/*.yml file in it (output named after
+    the file stem) and every subdirectory holding a network-config file
+    (output named after the subdirectory). Any other file is read as a
+    manifest with one "<input> [<output-name>]" entry per line; relative
+    inputs are resolved against the manifest's directory.
+    
+    Args:
+        source: Directory or manifest path
         
-        print("Configuration files written successfully!")
+    Returns:
+        list: (Path, str) pairs, in a stable order
+    """
+    source = Path(source)
+    jobs = []
+    if source.is_dir():
+        for entry in sorted(source.iterdir()):
+            if entry.is_file() and entry.suffix in ('.yaml', '.yml'):
+                jobs.append((entry, entry.stem))
+            elif entry.is_dir() and (entry / 'network-config').is_file():
+                jobs.append((entry / 'network-config', entry.name))
+        return jobs
+    with open(source, 'r') as f:
+        for line in f:
+            words = line.split('#', 1)[0].split()
+            if not words:
+                continue
+            input_path = Path(words[0])
+            if not input_path.is_absolute():
+                input_path = source.parent / input_path
+            name = words[1] if len(words) > 1 else input_path.stem
+            jobs.append((input_path, name))
+    return jobs
+
+
+def convert_one(input_path, output_dir, force=False):
+    """
+    Convert a single file into its own output tree (batch worker).
+    
+    Never raises: failures are reported in the returned dict so that one bad
+    config does not abort the rest of the batch.
+    
+    Returns:
+        dict: {"input", "output", "status": "converted"|"unchanged"|"failed",
+              "error", "seconds"}
+    """
+    start = time.perf_counter()
+    result = {'input': str(input_path), 'output': str(output_dir), 'error': None}
+    try:
+        digest = input_digest(input_path)
+        if not force and is_up_to_date(digest, output_dir):
+            result['status'] = 'unchanged'
+        else:
+            config = load_netplan_config(input_path)
+            if not isinstance(config, dict):
+                raise ValueError("top level is not a mapping")
+            interfaces_content, wpa_configs = NetplanConverter(config).convert()
+            write_output_files(interfaces_content, wpa_configs, output_dir,
+                               digest=digest, verbose=False)
+            result['status'] = 'converted'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _convert_one_args(args):
+    return convert_one(*args)
+
+
+def run_batch(source, output_root, jobs=None, force=False):
+    """
+    Convert every config found in source into output_root/<name>/ using a
+    process pool, so interpreter start and the PyYAML import are paid once
+    per worker instead of once per file.
+    
+    Args:
+        source: Directory or manifest (see find_batch_inputs)
+        output_root: Directory receiving one output tree per input
+        jobs: Worker processes (None = CPU count)
+        force: Convert even inputs whose stamp says they are up to date
+        
+    Returns:
+        dict: Summary with per-status counts, failures and throughput
+    """
+    inputs = find_batch_inputs(source)
+    names = [name for _, name in inputs]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate output names in batch: {', '.join(duplicates)}")
+    
+    work = [(path, Path(output_root) / name, force) for path, name in inputs]
+    start = time.perf_counter()
+    if jobs == 1 or len(work) <= 1:
+        results = [_convert_one_args(w) for w in work]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunksize = max(1, len(work) // ((jobs or os.cpu_count() or 1) * 4))
+            results = list(pool.map(_convert_one_args, work, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    
+    counts = {'converted': 0, 'unchanged': 0, 'failed': 0}
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'files': len(results),
+        **counts,
+        'failures': [r for r in results if r['status'] == 'failed'],
+        'elapsed_s': round(elapsed, 3),
+        'files_per_s': round(len(results) / elapsed, 1) if elapsed else 0.0,
+    }
 
 
 def main():
@@ -325,12 +705,19 @@ Examples:
   
   # Write directly to system paths (requires root)
   sudo %(prog)s network-config.yaml
+  
+  # Show which interfaces would be restarted, then apply only those
+  %(prog)s network-config.yaml --plan
+  sudo %(prog)s network-config.yaml --apply
+  
+  # Convert a directory (or manifest) of site configs into ./images/<site>/
+  %(prog)s sites/ --batch --output-dir ./images -j 8
         """
     )
     
     parser.add_argument(
         'input_file',
-        help='Path to netplan YAML configuration file'
+        help='Path to netplan YAML configuration file (directory or manifest with --batch)'
     )
     
     parser.add_argument(
@@ -345,21 +732,81 @@ Examples:
         help='Print generated configs to stdout instead of writing files'
     )
     
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Convert even if the input is unchanged since the last run'
+    )
+    
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='Print the apply plan against the active config and exit'
+    )
+    
+    parser.add_argument(
+        '--apply',
+        action='store_true',
+        help='After writing, restart only the interfaces whose config changed'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Convert every config in a directory or manifest, one output tree each'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='Worker processes for --batch (default: CPU count)'
+    )
+    
     args = parser.parse_args()
     
+    if args.batch:
+        if not args.output_dir or args.dry_run or args.plan or args.apply:
+            print("Error: --batch requires --output-dir and cannot be combined with "
+                  "--dry-run, --plan or --apply", file=sys.stderr)
+            sys.exit(1)
+        try:
+            summary = run_batch(args.input_file, args.output_dir, args.jobs, args.force)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        for failure in summary['failures']:
+            print(f"FAILED {failure['input']}: {failure['error']}", file=sys.stderr)
+        print(f"{summary['files']} files: {summary['converted']} converted, "
+              f"{summary['unchanged']} unchanged, {summary['failed']} failed "
+              f"in {summary['elapsed_s']}s ({summary['files_per_s']} files/s)")
+        sys.exit(1 if summary['failed'] else 0)
+    
+    if args.apply and (args.output_dir or args.dry_run):
+        print("Error: --apply only works when writing to /etc", file=sys.stderr)
+        sys.exit(1)
+    
     # Check if input file exists
     if not os.path.exists(args.input_file):
         print(f"Error: Input file '{args.input_file}' not found", file=sys.stderr)
         sys.exit(1)
     
     # Check for root privileges if writing to system paths
-    if not args.dry_run and not args.output_dir and os.geteuid() != 0:
+    if not args.dry_run and not args.plan and not args.output_dir and os.geteuid() != 0:
         print("Error: Root privileges required to write to /etc", file=sys.stderr)
         print("Try: sudo python3 netplan_converter.py <input_file>", file=sys.stderr)
         print("Or use --output-dir to write to a custom directory", file=sys.stderr)
         sys.exit(1)
     
     try:
+        # Skip everything (including the PyYAML import) when the input and
+        # converter version match what produced the current outputs.
+        digest = input_digest(args.input_file)
+        writing = not args.dry_run and not args.plan
+        if writing and not args.force and is_up_to_date(digest, args.output_dir):
+            print(f"{args.input_file} unchanged since last conversion; nothing to do")
+            return
+        
         # Load and parse netplan config
         print(f"Loading configuration from {args.input_file}...")
         config = load_netplan_config(args.input_file)
@@ -369,14 +816,31 @@ Examples:
         converter = NetplanConverter(config)
         interfaces_content, wpa_configs = converter.convert()
         
+        plan = []
+        if args.plan or args.apply:
+            interfaces_path, wpa_dir, _ = output_paths(args.output_dir)
+            old_blocks, old_wpa = read_active_config(interfaces_path, wpa_dir)
+            plan = compute_apply_plan(old_blocks, old_wpa, converter.blocks, wpa_configs)
+        if args.plan:
+            print(json.dumps(plan, indent=2))
+            return
+        
+        if args.apply and not execute_plan(plan, 'pre'):
+            print("Warning: some interfaces failed to go down", file=sys.stderr)
+        
         # Write output files
         write_output_files(
             interfaces_content,
             wpa_configs,
             args.output_dir,
-            args.dry_run
+            args.dry_run,
+            digest
         )
         
+        if args.apply and not execute_plan(plan, 'post'):
+            print("Warning: some interfaces failed to come up", file=sys.stderr)
+            sys.exit(2)
+        
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         import traceback
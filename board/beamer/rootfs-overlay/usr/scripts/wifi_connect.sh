@@ -2,6 +2,9 @@
 
 # Usage: wifi_connect.sh <iface> <wpa_conf_path> [timeout_seconds]
 # Example: wifi_connect.sh wlan0 /etc/wpa_supplicant/wpa_supplicant-wlan0.conf 25
+#
+# Progress is reported on stdout as "STATE associating" / "STATE dhcp" lines
+# for the provisioning app's connect job.
 
 set -eu
 
@@ -18,10 +21,12 @@ ip addr flush dev "${IFACE}" >/dev/null 2>&1 || true
 ip link set "${IFACE}" up >/dev/null 2>&1 || true
 
 # Restart wpa_supplicant with provided config
+echo "STATE associating"
 killall wpa_supplicant >/dev/null 2>&1 || true
-wpa_supplicant -B -i "${IFACE}" -c "${CONF_PATH}"
+wpa_supplicant -B -i "${IFACE}" -c "${CONF_PATH}" >/dev/null
 
 # DHCP (BusyBox udhcpc)
+echo "STATE dhcp"
 udhcpc -i "${IFACE}" -n -q -t 5 >/dev/null 2>&1 || true
 
 # Wait for an IPv4 address
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark captive-portal probe handling of the provisioning app.
+
+Fires connectivity probes (the URLs phones and laptops send right after
+joining the provisioning AP) at the portal with a fixed concurrency and
+reports throughput and latency percentiles. Uses only the standard library
+so it can run on the beamer itself.
+
+Usage examples:
+
+  # From a laptop joined to the provisioning AP
+  python captive_probe_bench.py --host 192.168.4.1 -n 2000 -c 20
+
+  # On the beamer, while a Wi‑Fi connect job is running. Starting a job
+  # takes the AP down, so run this locally against 127.0.0.1.
+  python captive_probe_bench.py --host 127.0.0.1 --connect MySSID:wrongpass
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+from typing import List, Tuple
+
+# (Host header, path) pairs as sent by common client OSes.
+PROBES: List[Tuple[str, str]] = [
+    ("connectivitycheck.gstatic.com", "/generate_204"),
+    ("clients3.google.com", "/generate_204"),
+    ("captive.apple.com", "/hotspot-detect.html"),
+    ("www.apple.com", "/library/test/success.html"),
+    ("www.msftconnecttest.com", "/connecttest.txt"),
+    ("www.msftncsi.com", "/ncsi.txt"),
+    ("detectportal.firefox.com", "/success.txt"),
+    ("nmcheck.gnome.org", "/check_network_status.txt"),
+]
+
+
+async def probe(host: str, port: int, vhost: str, path: str, timeout: float) -> int:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {vhost}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    statuses: dict = {}
+    counter = iter(range(args.requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            vhost, path = PROBES[i % len(PROBES)]
+            start = time.perf_counter()
+            try:
+                status = await probe(args.host, args.port, vhost, path, args.timeout)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p: float) -> float | None:
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "max_ms": pct(1.0),
+    }
+
+
+def start_connect_job(host: str, port: int, creds: str) -> str:
+    ssid, _, password = creds.partition(":")
+    body = json.dumps({"ssid": ssid, "password": password}).encode()
+    req = urllib.request.Request(
+        f"http://{host}:{port}/api/wifi-connect",
+        data=body,
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return json.load(resp)["job"]["id"]
+
+
+def job_state(host: str, port: int, job_id: str) -> str:
+    with urllib.request.urlopen(f"http://{host}:{port}/api/wifi-connect/{job_id}", timeout=5) as resp:
+        return json.load(resp)["job"]["state"]
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Captive-portal probe benchmark")
+    parser.add_argument("--host", default="192.168.4.1")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument(
+        "--connect",
+        metavar="SSID:PASSWORD",
+        help="Start a Wi‑Fi connect job first and benchmark while it runs",
+    )
+    args = parser.parse_args(argv)
+
+    job_id = None
+    if args.connect:
+        job_id = start_connect_job(args.host, args.port, args.connect)
+        print(f"started connect job {job_id}", file=sys.stderr)
+
+    result = asyncio.run(run(args))
+    if job_id:
+        result["connect_job_state_after"] = job_state(args.host, args.port, job_id)
+    print(json.dumps(result, indent=2, sort_keys=True))
+    return 0 if not result["errors"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules under test are flat scripts on the device, not a package.
+ROOTFS = os.path.join(os.path.dirname(__file__), "..", "board", "beamer", "rootfs-overlay")
+sys.path.insert(0, os.path.join(ROOTFS, "opt", "beamer"))
+sys.path.insert(0, os.path.join(ROOTFS, "usr", "scripts"))
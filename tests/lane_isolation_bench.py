@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+Show how long a device reset waits for a worker thread during a burst of
+enumerations.
+
+"shared" runs everything through one anyio CapacityLimiter, the way the
+apps used to (sized to the same total thread count). "lanes" uses
+WorkerLanes from opt/beamer/worker_lanes.py, where enumerations and resets
+each get their own pool. Enumerations and resets are simulated with
+time.sleep() of the given durations.
+
+Usage examples:
+
+  python lane_isolation_bench.py
+  python lane_isolation_bench.py --connects 100 --enumerate-ms 300 --resets 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import anyio
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "..", "board", "beamer", "rootfs-overlay", "opt", "beamer"),
+)
+from worker_lanes import LANE_CONTROL, LANE_ENUMERATE, LANE_FILES, WorkerLanes  # noqa: E402
+
+Runner = Callable[[str, Callable[[], None]], Awaitable[None]]
+
+
+async def burst(run: Runner, args: argparse.Namespace) -> List[float]:
+    """
+    Queue args.connects enumerations, then issue args.resets resets spaced
+    apart; return each reset's end-to-end latency in ms.
+    """
+    def enumerate_devices() -> None:
+        time.sleep(args.enumerate_ms / 1000)
+
+    def reset() -> None:
+        time.sleep(args.reset_ms / 1000)
+
+    async def timed_reset() -> float:
+        start = time.perf_counter()
+        await run(LANE_CONTROL, reset)
+        return (time.perf_counter() - start) * 1000
+
+    enumerations = [asyncio.create_task(run(LANE_ENUMERATE, enumerate_devices)) for _ in range(args.connects)]
+    latencies = []
+    for _ in range(args.resets):
+        await asyncio.sleep(args.reset_gap_ms / 1000)
+        latencies.append(await timed_reset())
+    await asyncio.gather(*enumerations)
+    return latencies
+
+
+def summarize(mode: str, latencies: List[float], extra: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    result = {
+        "mode": mode,
+        "reset_ms_p50": round(ordered[len(ordered) // 2], 1),
+        "reset_ms_max": round(ordered[-1], 1),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+async def run_shared(args: argparse.Namespace, total: int) -> Dict[str, Any]:
+    limiter = anyio.CapacityLimiter(total)
+
+    async def run(lane: str, fn: Callable[[], None]) -> None:
+        await anyio.to_thread.run_sync(fn, limiter=limiter)
+
+    return summarize("shared", await burst(run, args))
+
+
+async def run_lanes(args: argparse.Namespace, workers: Dict[str, int]) -> Dict[str, Any]:
+    lanes = WorkerLanes(workers)
+
+    async def run(lane: str, fn: Callable[[], None]) -> None:
+        await lanes.run(lane, fn)
+
+    latencies = await burst(run, args)
+    return summarize("lanes", latencies, {"lanes": lanes.stats()})
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Reset latency under an enumeration burst")
+    parser.add_argument("--connects", type=int, default=40, help="Enumerations queued at once")
+    parser.add_argument("--enumerate-ms", type=float, default=200)
+    parser.add_argument("--resets", type=int, default=5)
+    parser.add_argument("--reset-ms", type=float, default=20)
+    parser.add_argument("--reset-gap-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=2, help="Threads per lane")
+    args = parser.parse_args(argv)
+
+    workers = {LANE_ENUMERATE: args.workers, LANE_CONTROL: args.workers, LANE_FILES: args.workers}
+    results = [
+        asyncio.run(run_shared(args, sum(workers.values()))),
+        asyncio.run(run_lanes(args, workers)),
+    ]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark event-loop latency while a coroutine floods the logger.
+
+Compares a plain SysLogHandler (what the apps used to attach) with the
+queue-based handler from opt/beamer/syslog_logging.py. Both send to a local
+datagram socket standing in for /dev/log, drained by a deliberately slow
+reader thread to simulate a syslogd that cannot keep up.
+
+Usage examples:
+
+  python log_flood_bench.py
+  python log_flood_bench.py -n 20000 --reader-delay 0.0005 --queue-size 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import QueueListener, SysLogHandler
+from typing import List
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "..", "board", "beamer", "rootfs-overlay", "opt", "beamer"),
+)
+from syslog_logging import DroppingQueueHandler  # noqa: E402
+
+
+def start_slow_syslogd(path: str, delay: float) -> threading.Event:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    stop = threading.Event()
+
+    def reader() -> None:
+        sock.settimeout(0.2)
+        while not stop.is_set():
+            try:
+                sock.recv(4096)
+            except socket.timeout:
+                continue
+            time.sleep(delay)
+        sock.close()
+
+    threading.Thread(target=reader, daemon=True).start()
+    return stop
+
+
+async def measure(logger: logging.Logger, messages: int, tick: float) -> dict:
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(time.perf_counter() - start - tick)
+
+    async def flood() -> None:
+        for i in range(messages):
+            logger.info("flood message %d from watch_devices", i)
+            if i % 10 == 0:
+                await asyncio.sleep(0)
+        done.set()
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await flood()
+    elapsed = time.perf_counter() - start
+    await ticker_task
+
+    lags.sort()
+
+    def pct(p: float) -> float | None:
+        if not lags:
+            return None
+        return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 2)
+
+    return {
+        "flood_s": round(elapsed, 3),
+        "loop_lag_p50_ms": pct(0.50),
+        "loop_lag_p99_ms": pct(0.99),
+        "loop_lag_max_ms": pct(1.0),
+    }
+
+
+def run_mode(mode: str, args: argparse.Namespace, address: str) -> dict:
+    logger = logging.getLogger(f"bench-{mode}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    syslog_handler = SysLogHandler(address=address)
+    syslog_handler.setFormatter(logging.Formatter("bench: %(levelname)s: %(message)s"))
+
+    listener = None
+    if mode == "sync":
+        logger.addHandler(syslog_handler)
+    else:
+        handler = DroppingQueueHandler(queue.Queue(args.queue_size))
+        listener = QueueListener(handler.queue, syslog_handler)
+        listener.start()
+        logger.addHandler(handler)
+
+    result = {"mode": mode, **asyncio.run(measure(logger, args.messages, args.tick))}
+    if listener is not None:
+        result["dropped"] = handler.dropped
+        listener.stop()
+    syslog_handler.close()
+    return result
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Event-loop latency under log floods")
+    parser.add_argument("-n", "--messages", type=int, default=5000)
+    parser.add_argument("--reader-delay", type=float, default=0.0002,
+                        help="Seconds the fake syslogd spends per message")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--tick", type=float, default=0.005,
+                        help="Interval of the latency probe on the event loop")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "queue"):
+            address = os.path.join(tmp, f"log-{mode}")
+            stop = start_slow_syslogd(address, args.reader_delay)
+            try:
+                results.append(run_mode(mode, args, address))
+            finally:
+                stop.set()
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
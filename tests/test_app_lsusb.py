@@ -0,0 +1,57 @@
+from starlette.testclient import TestClient
+
+import app as app_module
+from device_state import DeviceIdIndex, DeviceSnapshot
+
+DEVICE = {
+    "busid": "1-1.2", "vid": "0BDA", "pid": "8153", "serial": "ABC",
+    "vendor": "Realtek", "product": "USB 10/100/1000 LAN",
+    "export": {"decision": "allow", "rule": "default"},
+}
+
+
+def _client(monkeypatch, uevents_active):
+    runs = []
+
+    def list_plugged_devices():
+        runs.append(1)
+        return [dict(DEVICE)]
+
+    async def not_pairing():
+        return False
+
+    monkeypatch.setattr(app_module, "list_plugged_devices", list_plugged_devices)
+    monkeypatch.setattr(app_module, "_in_pairing_mode", not_pairing)
+    monkeypatch.setattr(app_module, "device_snapshot", DeviceSnapshot())
+    monkeypatch.setattr(app_module, "device_ids", DeviceIdIndex())
+    monkeypatch.setattr(app_module, "uevents_active", uevents_active)
+    monkeypatch.setattr(app_module, "POLL_MIN_INTERVAL", 0.0)
+    return TestClient(app_module.app), runs
+
+
+def test_lsusb_honours_if_none_match(monkeypatch):
+    client, _ = _client(monkeypatch, uevents_active=True)
+    response = client.get("/zeroforce/lsusb")
+    assert response.status_code == 200
+    assert response.json() == [{
+        "id": 1, "vid": "0BDA", "pid": "8153",
+        "device_name": "Realtek USB 10/100/1000 LAN", "export": "allow",
+    }]
+    etag = response.headers["etag"]
+    response = client.get("/zeroforce/lsusb", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_lsusb_served_from_cache_while_uevents_are_live(monkeypatch):
+    client, runs = _client(monkeypatch, uevents_active=True)
+    for _ in range(3):
+        client.get("/zeroforce/lsusb")
+    assert len(runs) == 1
+
+
+def test_lsusb_enumerates_on_demand_without_uevents(monkeypatch):
+    client, runs = _client(monkeypatch, uevents_active=False)
+    for _ in range(3):
+        client.get("/zeroforce/lsusb")
+    assert len(runs) == 3
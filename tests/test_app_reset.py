@@ -0,0 +1,12 @@
+import pytest
+from starlette.testclient import TestClient
+
+import app as app_module
+
+
+@pytest.mark.parametrize("busid", [12, ["1-1"], "1-1/../../x", "usb1", "1-1\n", "../1-1"])
+def test_reset_rejects_invalid_busid(busid):
+    client = TestClient(app_module.app)
+    response = client.post("/api/reset-device", json={"busid": busid})
+    assert response.status_code == 400
+    assert response.json()["reason"] == "invalid_busid"
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+
+import app as app_module
+
+
+def test_background_task_failures_are_logged_and_tasks_cancelled(monkeypatch, caplog):
+    monkeypatch.setattr(app_module, "log_store", None)
+
+    async def fails():
+        raise RuntimeError("boom")
+
+    async def runs_forever():
+        await asyncio.Event().wait()
+
+    async def main():
+        app_module._spawn(fails(), "fails")
+        app_module._spawn(runs_forever(), "runs_forever")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert [t.get_name() for t in app_module._background_tasks] == ["runs_forever"]
+        (forever,) = app_module._background_tasks
+        await app_module._shutdown()
+        assert forever.cancelled()
+        assert not app_module._background_tasks
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(main())
+    assert "background task fails failed" in caplog.text
+    assert "RuntimeError: boom" in caplog.text
+
+
+def test_plug_uevents_trigger_one_coalesced_enumeration(monkeypatch):
+    monkeypatch.setattr(app_module, "log_store", None)
+    monkeypatch.setattr(app_module, "UEVENT_ENUMERATE_DELAY", 0.01)
+    runs = []
+
+    async def refresh_devices(max_age=0.0):
+        runs.append(max_age)
+        return True
+
+    monkeypatch.setattr(app_module, "refresh_devices", refresh_devices)
+
+    async def main():
+        for _ in range(5):
+            app_module._request_enumeration()
+        await asyncio.sleep(0.05)
+        assert runs == [0.0]
+        app_module._request_enumeration()
+        await asyncio.sleep(0.05)
+        assert runs == [0.0, 0.0]
+        await app_module._shutdown()
+
+    asyncio.run(main())
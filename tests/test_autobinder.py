@@ -0,0 +1,99 @@
+import autobinder
+from autobinder import Autobinder
+from export_policy import ExportPolicy
+
+DEVICE = ("1-1.2", "0bda", "8153", "ABC")
+
+
+def _binder(monkeypatch, bound):
+    monkeypatch.setattr(autobinder, "plugged_devices", lambda: [DEVICE])
+    monkeypatch.setattr(autobinder, "device_class", lambda busid: "00")
+    monkeypatch.setattr(Autobinder, "_is_bound", staticmethod(lambda busid: busid in bound))
+    calls = []
+
+    def usbip(self, action, busid):
+        calls.append((action, busid))
+        if action == "bind":
+            bound.add(busid)
+        else:
+            bound.discard(busid)
+        return True, ""
+
+    monkeypatch.setattr(Autobinder, "_usbip", usbip)
+    return Autobinder(ExportPolicy.from_dict({})), calls
+
+
+def _reload_with(binder, monkeypatch, config):
+    def load():
+        binder.policy._compile(config)
+        return True
+
+    monkeypatch.setattr(binder.policy, "load", load)
+    binder.request_reload()
+
+
+def test_reload_unbinds_devices_now_denied(monkeypatch):
+    bound = set()
+    binder, calls = _binder(monkeypatch, bound)
+    monkeypatch.setattr(binder.policy, "reload_if_changed", lambda: False)
+    binder.tick()
+    assert calls == [("bind", "1-1.2")]
+
+    binder.tick()  # bound and nothing reloaded: left alone
+    assert calls == [("bind", "1-1.2")]
+
+    _reload_with(binder, monkeypatch, {"deny": ["0bda:8153"]})
+    assert binder.tick()
+    assert calls[-1] == ("unbind", "1-1.2")
+    assert bound == set()
+    assert binder.rejected["1-1.2"]["reason"] == "policy"
+
+
+def test_reload_keeps_devices_still_allowed(monkeypatch):
+    bound = {"1-1.2"}
+    binder, calls = _binder(monkeypatch, bound)
+    _reload_with(binder, monkeypatch, {"deny": ["046d"]})
+    binder.tick()
+    assert calls == []
+    assert bound == {"1-1.2"}
+
+
+def test_failed_unbind_is_retried(monkeypatch):
+    bound = {"1-1.2"}
+    binder, calls = _binder(monkeypatch, bound)
+    results = iter([(False, "busy"), (True, "")])
+
+    def usbip(self, action, busid):
+        calls.append((action, busid))
+        ok, output = next(results)
+        if ok:
+            bound.discard(busid)
+        return ok, output
+
+    monkeypatch.setattr(Autobinder, "_usbip", usbip)
+    _reload_with(binder, monkeypatch, {"default": "deny"})
+    binder.tick()
+    monkeypatch.setattr(binder.policy, "reload_if_changed", lambda: False)
+    binder.tick()
+    assert calls == [("unbind", "1-1.2"), ("unbind", "1-1.2")]
+    assert bound == set()
+
+
+def test_devices_bound_before_startup_are_checked(monkeypatch):
+    bound = {"1-1.2"}
+    binder, calls = _binder(monkeypatch, bound)
+    binder.policy._compile({"deny": ["0bda:8153"]})
+    monkeypatch.setattr(binder.policy, "reload_if_changed", lambda: False)
+    assert binder.tick()
+    assert calls == [("unbind", "1-1.2")]
+    assert binder.rejected["1-1.2"]["reason"] == "policy"
+
+
+def test_devices_bound_before_startup_still_allowed_are_left_alone(monkeypatch):
+    bound = {"1-1.2"}
+    binder, calls = _binder(monkeypatch, bound)
+    monkeypatch.setattr(binder.policy, "reload_if_changed", lambda: False)
+    binder.tick()
+    binder.tick()
+    assert calls == []
+    assert bound == {"1-1.2"}
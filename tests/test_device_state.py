@@ -0,0 +1,34 @@
+from device_state import DeviceIdIndex
+
+
+def _dev(busid, vid="0BDA", pid="8153", serial=""):
+    return {"busid": busid, "vid": vid, "pid": pid, "serial": serial}
+
+
+def _ids(index, devices):
+    index.assign(devices)
+    return {d["busid"]: d["id"] for d in devices}
+
+
+def test_ids_are_stable_across_removal_and_readding():
+    index = DeviceIdIndex()
+    assert _ids(index, [_dev("1-1", serial="A"), _dev("1-2", serial="B"), _dev("1-3", "046D", "C52B")]) == {
+        "1-1": 1, "1-2": 2, "1-3": 3,
+    }
+    # B unplugged: the others keep their IDs and 2 is not handed out again.
+    assert _ids(index, [_dev("1-1", serial="A"), _dev("1-3", "046D", "C52B")]) == {"1-1": 1, "1-3": 3}
+    assert index.id_for("1-2") is None
+    assert _ids(index, [_dev("1-1", serial="A"), _dev("1-3", "046D", "C52B"), _dev("1-2", serial="C")]) == {
+        "1-1": 1, "1-2": 4, "1-3": 3,
+    }
+    # B comes back on another port and gets its old ID.
+    devices = [_dev("1-1", serial="A"), _dev("1-3", "046D", "C52B"), _dev("1-2", serial="C"), _dev("1-4", serial="B")]
+    assert _ids(index, devices) == {"1-1": 1, "1-2": 4, "1-3": 3, "1-4": 2}
+    assert index.id_for("1-4") == 2
+
+
+def test_forgotten_ids_are_not_reused():
+    index = DeviceIdIndex(max_absent=1)
+    _ids(index, [_dev("1-1", serial="A"), _dev("1-2", serial="B")])
+    _ids(index, [])  # both absent; A is forgotten, B kept
+    assert _ids(index, [_dev("1-2", serial="B"), _dev("1-1", serial="A")]) == {"1-1": 3, "1-2": 2}
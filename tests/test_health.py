@@ -0,0 +1,57 @@
+from health import HealthMonitor
+
+
+def _stalled_monitor():
+    monitor = HealthMonitor(cooldown=120, max_resets_per_hour=2)
+    monitor.sync_status({"1-1": "error"}, now=0)
+    return monitor
+
+
+def _actions(monitor, now):
+    return [a["action"] for a in monitor.evaluate(now=now)]
+
+
+def test_cooldown_survives_rebind():
+    monitor = _stalled_monitor()
+    assert "reset" in _actions(monitor, 0)
+    monitor.record_reset("1-1", ok=True, now=1)
+
+    monitor.sync_status({}, now=2)  # unbound / port cycled
+    monitor.sync_status({"1-1": "error"}, now=3)
+    assert "reset" not in _actions(monitor, 10)
+    assert "reset" in _actions(monitor, 130)
+
+
+def test_hourly_limit_survives_rebind():
+    monitor = _stalled_monitor()
+    assert "reset" in _actions(monitor, 0)
+    assert "reset" in _actions(monitor, 200)
+    monitor.sync_status({}, now=300)
+    monitor.sync_status({"1-1": "error"}, now=301)
+    assert _actions(monitor, 400) == ["stalled", "suppressed"]
+    assert monitor.snapshot(now=400)["devices"]["1-1"]["resets_last_hour"] == 2
+
+
+def test_history_expires():
+    monitor = _stalled_monitor()
+    monitor.evaluate(now=0)
+    monitor.sync_status({}, now=10)
+    assert "1-1" in monitor._history
+    monitor.sync_status({}, now=3601)
+    assert monitor._history == {}
+
+
+def test_still_stalled_probe(tmp_path):
+    devices = tmp_path / "devices"
+    (devices / "1-1").mkdir(parents=True)
+    status = devices / "1-1" / "usbip_status"
+    status.write_text("3\n")
+    monitor = HealthMonitor()
+    monitor.sync_status({"1-1": "error"}, now=0)
+    assert monitor.still_stalled("1-1", since=10, devices_dir=str(devices))
+
+    status.write_text("1\n")
+    monitor.note_kernel_error("1-1", now=5)
+    assert not monitor.still_stalled("1-1", since=10, devices_dir=str(devices))
+    monitor.note_kernel_error("1-1", now=12)
+    assert monitor.still_stalled("1-1", since=10, devices_dir=str(devices))
@@ -0,0 +1,67 @@
+from kmsg import format_record, is_usb_record, parse_kmsg_record, split_kmsg_capture
+
+# Captured with `cat /dev/kmsg` on a board (sequence numbers renumbered).
+CAPTURE = """\
+6,1201,95234871,-;usb 1-1.3: new high-speed USB device number 7 using dwc2
+ SUBSYSTEM=usb
+ DEVICE=c189:6
+3,1202,95240113,-;usb 1-1.3: device descriptor read/64, error -71
+ SUBSYSTEM=usb
+ DEVICE=c189:6
+14,1203,95301020,-;usbip-host 1-1.3: usbip-host: register new device (bus 1 dev 7)
+4,1204,95400000,c;usb 1-1.3: Product: Caf\\xc3\\xa9 Scanner\\x0a
+ SUBSYSTEM=usb
+ DEVICE=c189:6
+ SERIAL=AB\\x5cCD
+6,1205,95500000,-;NET: Registered PF_PACKET protocol family
+"""
+
+
+def _records():
+    return [parse_kmsg_record(raw) for raw in split_kmsg_capture(CAPTURE)]
+
+
+def test_continuation_lines_become_fields():
+    records = _records()
+    assert len(records) == 5
+    assert records[0].fields == {"SUBSYSTEM": "usb", "DEVICE": "c189:6"}
+    assert records[0].subsystem == "usb" and records[0].device == "c189:6"
+    assert records[2].fields == {}
+
+
+def test_facility_and_level():
+    first, error, usbip, _, _ = _records()
+    assert (first.level, first.facility, first.seq, first.usec) == ("info", 0, 1201, 95234871)
+    assert (error.level, error.facility) == ("err", 0)
+    # PRI 14: facility 1 (user), level 6 (info).
+    assert (usbip.level, usbip.facility) == ("info", 1)
+
+
+def test_escaped_bytes():
+    record = _records()[3]
+    assert record.level == "warning"
+    # UTF-8 is decoded; the newline stays escaped so the line stays whole.
+    assert record.message == "usb 1-1.3: Product: Café Scanner\\x0a"
+    assert record.fields["SERIAL"] == "AB\\CD"
+
+
+def test_usb_filter_and_format():
+    records = _records()
+    assert [is_usb_record(r) for r in records] == [True, True, True, True, False]
+    assert format_record(records[0]) == (
+        "kernel: [   95.234871] usb 1-1.3: new high-speed USB device number 7 using dwc2"
+    )
+
+
+def test_bytes_input():
+    record = parse_kmsg_record(b"3,9,1000,-;usb 1-1: reset\n SUBSYSTEM=usb\n")
+    assert (record.level, record.message, record.subsystem) == ("err", "usb 1-1: reset", "usb")
+
+
+def test_malformed_records():
+    assert parse_kmsg_record("") is None
+    assert parse_kmsg_record("no header separator") is None
+    assert parse_kmsg_record("6,1201;too few header fields") is None
+    assert parse_kmsg_record("x,1201,95234871,-;bad priority") is None
+    assert parse_kmsg_record("6,seq,95234871,-;bad sequence") is None
+    assert parse_kmsg_record(b"\xff\xfe,1,2,-;undecodable") is None
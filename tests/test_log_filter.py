@@ -0,0 +1,23 @@
+from log_filter import LogPipeline, TokenBucket
+
+
+def test_bucket_does_not_refill_backwards():
+    bucket = TokenBucket(rate=1.0, burst=2.0, now=10.0)
+    assert bucket.take(10.0)
+    assert bucket.take(5.0)  # stale clock: one token left, not drained
+    assert not bucket.take(10.0)
+    assert bucket.take(11.0)
+
+
+def test_repeat_summary_is_limited_at_the_current_time():
+    pipeline = LogPipeline(dedup_window=5.0, rate=1.0, burst=3.0, repeat_report_interval=60.0)
+    assert pipeline.feed("app: disk full", "info", now=0.0)
+    assert pipeline.feed("app: disk full", "info", now=1.0) == []  # folded
+    # Time passes; the bucket refills and is stamped at 20.
+    assert pipeline.feed("app: other", "info", now=20.0)
+
+    out = pipeline.flush(now=20.0)
+    assert [p.get("repeat") for p in out] == [1]
+    # Charged at 20, not at the repeat's last_mono (1.0): one token remains.
+    assert pipeline.feed("app: third", "info", now=20.0)
+    assert pipeline.dropped == 0
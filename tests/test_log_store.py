@@ -0,0 +1,44 @@
+import os
+
+from log_store import LogStore
+
+
+def _segment_files(directory):
+    return sorted(os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".logz"))
+
+
+def test_reopen_after_torn_tail_keeps_later_appends_queryable(tmp_path):
+    store = LogStore(str(tmp_path), block_bytes=1)  # one block per line
+    for i in range(10):
+        store.append(f"before {i}", "info", ts=1000.0 + i)
+    store.close()
+
+    (segment,) = _segment_files(str(tmp_path))
+    size = os.path.getsize(segment)
+    with open(segment, "r+b") as f:
+        f.truncate(size - 5)  # tear the last block
+
+    store = LogStore(str(tmp_path), block_bytes=1)
+    for i in range(10):
+        store.append(f"after {i}", "info", ts=2000.0 + i)
+    store.close()
+
+    lines = [e["line"] for e in LogStore(str(tmp_path), block_bytes=1).query()]
+    assert lines == [f"before {i}" for i in range(9)] + [f"after {i}" for i in range(10)]
+    assert store.stats()["lines"] == 19
+
+
+def test_torn_header_is_truncated(tmp_path):
+    store = LogStore(str(tmp_path), block_bytes=1)
+    store.append("only", "err", ts=1.0)
+    store.close()
+    (segment,) = _segment_files(str(tmp_path))
+    good = os.path.getsize(segment)
+    with open(segment, "ab") as f:
+        f.write(b"\x00" * 7)  # partial header
+
+    store = LogStore(str(tmp_path), block_bytes=1)
+    assert os.path.getsize(segment) == good
+    store.append("next", "err", ts=2.0)
+    store.close()
+    assert [e["line"] for e in LogStore(str(tmp_path)).query(level="err")] == ["only", "next"]
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from loop_monitor import LoopLagMonitor
+
+
+def _watchdogs(monitor):
+    return monitor._watchdog, monitor._stop
+
+
+def test_debug_off_then_on_leaves_a_running_watchdog():
+    async def main():
+        monitor = LoopLagMonitor(interval=0.05, threshold=0.05, debug=True)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.01)
+        first, first_stop = _watchdogs(monitor)
+        assert first.is_alive()
+
+        # Off and on again before the first watchdog noticed its stop event.
+        monitor.set_debug(False)
+        monitor.set_debug(True)
+        second, second_stop = _watchdogs(monitor)
+        assert second is not first
+        assert first_stop.is_set() and not second_stop.is_set()
+
+        await asyncio.sleep(0.1)
+        assert not first.is_alive()
+        assert second.is_alive()
+
+        # A blocking callback is still attributed by the new watchdog.
+        time.sleep(0.3)
+        await asyncio.sleep(0.1)
+        assert monitor.snapshot()["call_sites"]
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0.1)
+        assert not second.is_alive()
+
+    asyncio.run(main())
+
+
+def test_enabling_twice_keeps_one_watchdog():
+    async def main():
+        monitor = LoopLagMonitor(interval=0.05, threshold=0.05)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0)
+        monitor.set_debug(True)
+        first = monitor._watchdog
+        monitor.set_debug(True)
+        assert monitor._watchdog is first
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
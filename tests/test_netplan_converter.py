@@ -0,0 +1,124 @@
+import copy
+
+from netplan_converter import (
+    NetplanConverter,
+    compute_apply_plan,
+    convert_one,
+    output_paths,
+    parse_interfaces,
+)
+
+WIFI_CONFIG = """\
+network:
+  version: 2
+  wifis:
+    wlan0:
+      dhcp4: true
+      access-points:
+        home:
+          password: secret123
+"""
+
+
+def _write_input(tmp_path, text=WIFI_CONFIG):
+    path = tmp_path / "in.yaml"
+    path.write_text(text)
+    return path
+
+
+def test_second_run_is_unchanged(tmp_path):
+    src = _write_input(tmp_path)
+    out = tmp_path / "out"
+    assert convert_one(src, out)["status"] == "converted"
+    assert convert_one(src, out)["status"] == "unchanged"
+
+
+def test_edited_output_is_regenerated(tmp_path):
+    src = _write_input(tmp_path)
+    out = tmp_path / "out"
+    convert_one(src, out)
+    _, wpa_dir, _ = output_paths(out)
+    wpa = wpa_dir / "wpa_supplicant-wlan0.conf"
+    original = wpa.read_text()
+    wpa.write_text(original.replace("home", "provisioned"))
+
+    assert convert_one(src, out)["status"] == "converted"
+    assert wpa.read_text() == original
+
+
+def test_missing_output_is_regenerated(tmp_path):
+    src = _write_input(tmp_path)
+    out = tmp_path / "out"
+    convert_one(src, out)
+    interfaces, _, _ = output_paths(out)
+    interfaces.unlink()
+    assert convert_one(src, out)["status"] == "converted"
+    assert interfaces.exists()
+
+
+# --- Apply plans ---
+
+ETH_WIFI = {
+    "network": {
+        "version": 2,
+        "ethernets": {"eth0": {"dhcp4": True}},
+        "wifis": {"wlan0": {"dhcp4": True, "access-points": {"home": {"password": "secret123"}}}},
+    }
+}
+
+
+def _generate(config):
+    interfaces, wpa = NetplanConverter(config).convert()
+    return parse_interfaces(interfaces), wpa
+
+
+def _plan(old_config, new_config):
+    old_blocks, old_wpa = _generate(old_config)
+    new_blocks, new_wpa = _generate(new_config)
+    plan = compute_apply_plan(old_blocks, old_wpa, new_blocks, new_wpa)
+    return [(step["phase"], step["action"], step["iface"]) for step in plan]
+
+
+def test_parse_interfaces():
+    blocks = parse_interfaces(
+        "auto lo\n"
+        "iface lo inet loopback\n"
+        "\n"
+        "allow-hotplug eth0\n"
+        "iface eth0 inet static  # uplink\n"
+        "    address 192.168.1.2\n"
+        "    netmask 255.255.255.0\n"
+        "iface usb0 inet manual\n"
+    )
+    assert blocks["lo"] == {"auto": True, "family": "inet", "method": "loopback", "options": []}
+    assert blocks["eth0"]["auto"] and blocks["eth0"]["method"] == "static"
+    assert blocks["eth0"]["options"] == ["address 192.168.1.2", "netmask 255.255.255.0"]
+    assert not blocks["usb0"]["auto"]
+
+
+def test_plan_unchanged():
+    assert _plan(ETH_WIFI, copy.deepcopy(ETH_WIFI)) == []
+
+
+def test_plan_changed_ssid_reconfigures_wpa_only():
+    new = copy.deepcopy(ETH_WIFI)
+    new["network"]["wifis"]["wlan0"]["access-points"] = {"office": {"password": "other-secret"}}
+    assert _plan(ETH_WIFI, new) == [("post", "wpa_reconfigure", "wlan0")]
+
+
+def test_plan_new_interface_only_brings_it_up():
+    new = copy.deepcopy(ETH_WIFI)
+    new["network"]["ethernets"]["eth1"] = {"dhcp4": True}
+    assert _plan(ETH_WIFI, new) == [("post", "ifup", "eth1")]
+
+
+def test_plan_removed_interface_only_takes_it_down():
+    new = copy.deepcopy(ETH_WIFI)
+    del new["network"]["wifis"]
+    assert _plan(ETH_WIFI, new) == [("pre", "ifdown", "wlan0")]
+
+
+def test_plan_changed_addressing_restarts_interface():
+    new = copy.deepcopy(ETH_WIFI)
+    new["network"]["ethernets"]["eth0"] = {"addresses": ["192.168.1.2/24"]}
+    assert _plan(ETH_WIFI, new) == [("pre", "ifdown", "eth0"), ("post", "ifup", "eth0")]
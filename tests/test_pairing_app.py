@@ -0,0 +1,21 @@
+import time
+
+from starlette.testclient import TestClient
+
+import pairing_app
+
+
+def test_shutdown_stops_loop_monitor_and_watchdog(monkeypatch):
+    monitor = pairing_app.loop_monitor
+    monkeypatch.setattr(pairing_app, "set_proper_permissions", lambda: None)
+    monkeypatch.setattr(monitor, "debug", True)
+    with TestClient(pairing_app.app):
+        task = pairing_app._loop_monitor_task
+        deadline = time.monotonic() + 2
+        while monitor._watchdog is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        watchdog = monitor._watchdog
+        assert watchdog is not None and watchdog.is_alive()
+    assert task.done()
+    watchdog.join(timeout=2)
+    assert not watchdog.is_alive()
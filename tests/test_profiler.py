@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from starlette.requests import Request
+
+from profiler import SamplingProfiler, profile_response
+
+
+def _request(query, host="127.0.0.1"):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/debug/profile",
+        "query_string": query.encode(),
+        "headers": [],
+        "client": (host, 40000),
+    })
+
+
+async def _devmode():
+    return True
+
+
+def test_lock_held_until_sampling_ends_after_cancel():
+    profiler = SamplingProfiler()
+
+    async def main():
+        task = asyncio.create_task(profiler.profile(0.3))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # The request is gone but the sampling thread is not.
+        assert profiler.running
+        response = await profile_response(_request("seconds=0.1"), profiler, _devmode)
+        assert response.status_code == 409
+        deadline = time.monotonic() + 2
+        while profiler.running and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        assert not profiler.running
+
+    asyncio.run(main())
+
+
+def test_profile_response():
+    profiler = SamplingProfiler()
+
+    async def no_devmode():
+        return False
+
+    async def main():
+        response = await profile_response(_request("seconds=0.05", host="10.0.0.2"), profiler, _devmode)
+        assert response.status_code == 403
+        response = await profile_response(_request("seconds=0.05"), profiler, no_devmode)
+        assert response.status_code == 403
+        for query in ("seconds=x", "seconds=0", "seconds=1e9"):
+            response = await profile_response(_request(query), profiler, _devmode)
+            assert response.status_code == 400
+        response = await profile_response(_request("seconds=0.05"), profiler, _devmode)
+        assert response.status_code == 200
+        assert int(response.headers["X-Profile-Samples"]) > 0
+
+    asyncio.run(main())
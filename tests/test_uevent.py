@@ -0,0 +1,53 @@
+import asyncio
+import errno
+import socket
+
+import uevent
+from uevent import parse_uevent, watch_uevents
+
+ADD = b"add@/devices/usb1/1-1\0ACTION=add\0SUBSYSTEM=usb\0DEVTYPE=usb_device\0DEVPATH=/devices/usb1/1-1\0"
+
+
+def test_parse_uevent():
+    event = parse_uevent(ADD)
+    assert event["ACTION"] == "add" and event["SUBSYSTEM"] == "usb"
+    assert parse_uevent(b"libudev\0ACTION=add\0") == {}
+
+
+def test_overrun_triggers_resync_and_keeps_reading(monkeypatch):
+    ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    ours.setblocking(False)
+    monkeypatch.setattr(uevent, "open_uevent_socket", lambda: ours)
+    received = []
+    resyncs = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        real_recv = loop.sock_recv
+        failures = [OSError(errno.ENOBUFS, "No buffer space available")]
+
+        async def sock_recv(sock, size):
+            if failures:
+                raise failures.pop()
+            return await real_recv(sock, size)
+
+        monkeypatch.setattr(loop, "sock_recv", sock_recv)
+
+        async def callback(event):
+            received.append(event)
+
+        async def resync():
+            resyncs.append(True)
+
+        task = asyncio.create_task(watch_uevents(callback, resync))
+        theirs.send(ADD)
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(main())
+    theirs.close()
+    assert resyncs == [True]
+    assert received and received[0]["ACTION"] == "add"
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+import usb_reset
+from usb_reset import STEP_PORT_CYCLE, STEP_REBIND, STEP_RESET, device_healthy, device_state, recover
+
+BUSID = "1-1.3"
+
+
+def _write(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(value)
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    root = str(tmp_path / "sys")
+    device = os.path.join(root, "bus", "usb", "devices", BUSID)
+    _write(os.path.join(device, "devnum"), "5\n")
+    _write(os.path.join(device, "busnum"), "1\n")
+    _write(os.path.join(device, "bConfigurationValue"), "1\n")
+    driver = os.path.join(root, "bus", "usb", "drivers", "usbip-host")
+    os.makedirs(driver)
+    os.symlink(driver, os.path.join(device, "driver"))
+    return root
+
+
+def _device(sysfs, name):
+    return os.path.join(sysfs, "bus", "usb", "devices", BUSID, name)
+
+
+def test_state(sysfs):
+    assert device_state(BUSID, sysfs) == {"devnum": "5", "configuration": "1", "driver": "usbip-host"}
+    assert device_state("1-9", sysfs) is None
+
+
+def test_unconfigured_or_driverless_is_unhealthy(sysfs):
+    assert device_healthy(BUSID, sysfs)
+    os.unlink(_device(sysfs, "driver"))
+    assert not device_healthy(BUSID, sysfs)
+    _write(_device(sysfs, "bConfigurationValue"), "\n")
+    assert not device_healthy(BUSID, sysfs)
+
+
+def test_reenumeration_requires_new_devnum(sysfs):
+    before = device_state(BUSID, sysfs)
+    assert not device_healthy(BUSID, sysfs, before, reenumerated=True)
+    _write(_device(sysfs, "devnum"), "6\n")
+    assert device_healthy(BUSID, sysfs, before, reenumerated=True)
+
+
+def test_port_cycle_that_never_drops_the_device_fails(sysfs, monkeypatch):
+    monkeypatch.setattr(usb_reset, "port_cycle", lambda *a, **k: None)
+    result = recover(BUSID, first_step=STEP_PORT_CYCLE, last_step=STEP_PORT_CYCLE, sysfs=sysfs, settle=0, hold=0)
+    assert not result["ok"]
+
+    def cycle(*args, **kwargs):
+        _write(_device(sysfs, "devnum"), "7\n")
+
+    monkeypatch.setattr(usb_reset, "port_cycle", cycle)
+    result = recover(BUSID, first_step=STEP_PORT_CYCLE, last_step=STEP_PORT_CYCLE, sysfs=sysfs, settle=0, hold=0)
+    assert result["ok"] and result["recovered_by"] == STEP_PORT_CYCLE
+
+
+def test_caller_probe_replaces_check(sysfs):
+    result = recover(
+        BUSID, last_step=STEP_RESET, sysfs=sysfs, settle=0, hold=0,
+        healthy=lambda busid: False, ioctl_reset=lambda devpath: None,
+    )
+    assert not result["ok"]
+
+
+def test_wedged_after_ioctl_reset_escalates_to_port_cycle(sysfs, monkeypatch):
+    # usbip-host reports the device in error. The ioctl "succeeds", but the
+    # firmware stays wedged (still configured and bound) until the port is
+    # power cycled and the device enumerates again.
+    _write(_device(sysfs, "usbip_status"), "3\n")
+    resets = []
+
+    def cycle(*args, **kwargs):
+        _write(_device(sysfs, "devnum"), "8\n")
+        _write(_device(sysfs, "usbip_status"), "1\n")
+
+    monkeypatch.setattr(usb_reset, "port_cycle", cycle)
+    result = recover(
+        BUSID, sysfs=sysfs, dev=str(sysfs), settle=0.05, hold=0.05,
+        ioctl_reset=resets.append,
+    )
+    assert resets  # the ioctl ran and raised nothing
+    assert [(s["step"], s["ok"]) for s in result["steps"]] == [(STEP_RESET, False), (STEP_PORT_CYCLE, True)]
+    assert result["ok"] and result["recovered_by"] == STEP_PORT_CYCLE
+
+
+def test_stall_probe_sees_errors_after_the_step(sysfs, monkeypatch):
+    # Healthy on sysfs, but the caller's probe still reports the stall
+    # after the rebind, so the rebind must not count as a recovery.
+    monkeypatch.setattr(usb_reset, "rebind", lambda *a, **k: None)
+    seen = []
+
+    def stalled(busid, since):
+        seen.append(since)
+        return True
+
+    result = recover(
+        BUSID, first_step=STEP_REBIND, sysfs=sysfs, settle=0, hold=0, stalled=stalled,
+    )
+    assert not result["ok"]
+    assert seen
+
+
+def test_recovery_must_hold(sysfs, monkeypatch):
+    # Looks recovered right after the reset, then the stall comes back.
+    checks = iter([False, True, True] + [True] * 100)
+    result = recover(
+        BUSID, last_step=STEP_RESET, sysfs=sysfs, settle=0.05, hold=0.3,
+        stalled=lambda busid, since: next(checks), ioctl_reset=lambda devpath: None,
+    )
+    assert not result["ok"]
@@ -0,0 +1,33 @@
+from usbmon import parse_usbmon_line
+
+
+def test_bulk_completion():
+    event = parse_usbmon_line("ffff8800d2b6a0c0 3575914555 C Bi:1:003:1 0 512 = 0102")
+    assert (event.kind, event.xfer, event.direction) == ("C", "B", "i")
+    assert (event.bus, event.devnum, event.endpoint) == (1, 3, 1)
+    assert (event.status, event.length) == (0, 512)
+
+
+def test_control_submission_skips_setup_packet():
+    event = parse_usbmon_line("ffff8800d2b6a0c0 3575914555 S Ci:1:001:0 s a3 00 0000 0001 0004 4 <")
+    assert (event.kind, event.status, event.length) == ("S", None, 4)
+
+
+def test_iso_descriptors_capped_at_five():
+    descs = " ".join(f"0:{i * 192}:192" for i in range(5))
+    line = f"ffff8800d2b6a0c0 3575914555 C Zi:1:003:1 0:1:2:0 8 {descs} 1536 = 00000000"
+    event = parse_usbmon_line(line)
+    assert event.xfer == "Z"
+    assert event.status == 0
+    assert event.length == 1536
+
+
+def test_iso_with_few_descriptors():
+    line = "ffff8800d2b6a0c0 3575914555 S Zo:1:003:2 -115:1:0 2 -18:0:192 -18:192:192 384 ="
+    event = parse_usbmon_line(line)
+    assert (event.status, event.length) == (-115, 384)
+
+
+def test_garbage_is_rejected():
+    assert parse_usbmon_line("not a usbmon line") is None
+    assert parse_usbmon_line("tag notanumber C Bi:1:003:1 0 8") is None
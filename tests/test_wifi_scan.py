@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from wifi_scan import merge_networks, parse_iw_scan
+
+# Full `iw dev wlan0 scan` (iw 5.x) output for a dense area: 330 BSS with
+# every IE block iw prints, hidden and NUL-padded SSIDs, WPA-only and WEP
+# (Privacy bit, no RSN/WPA IE) networks, 2.4 and 5 GHz.
+DENSE_SCAN = (Path(__file__).parent / "fixtures" / "iw_scan_dense.txt").read_text()
+
+OPEN_SSIDS = {
+    "Cafe Mokka", "Gast", "Hotel Ost Guest", "MagentaWLAN-7KQ4", "Telekom_FON",
+    "Vodafone Hotspot", "WLAN-23322B", "WLAN-3617D5", "WLAN-4D148B", "WLAN-7D3094",
+    "WLAN-C9B78E",
+}
+
+
+def test_dense_scan_parses_every_bss():
+    entries = parse_iw_scan(DENSE_SCAN)
+    assert len(entries) == 330
+    assert len({e["bssid"] for e in entries}) == 330
+    assert all(e["signal"] is not None and e["frequency"] is not None for e in entries)
+    assert entries[0]["bssid"] == DENSE_SCAN.split()[1][:17]
+
+
+def test_dense_scan_dedups_by_ssid_and_keeps_strongest():
+    networks = merge_networks(parse_iw_scan(DENSE_SCAN))
+    by_ssid = {n["ssid"]: n for n in networks}
+    assert len(networks) == 92  # hidden and NUL-padded SSIDs dropped
+    assert "" not in by_ssid and not any("\\x00" in ssid for ssid in by_ssid)
+    assert [n["ssid"] for n in networks[:2]] == ["WLAN-41878F", "WLAN-F43EE2"]  # tie at -38 dBm
+    signals = [n["signal"] for n in networks]
+    assert signals == sorted(signals, reverse=True)
+
+    assert (by_ssid["eduroam"]["signal"], by_ssid["eduroam"]["frequency"]) == (-43.25, 2412)
+    assert by_ssid["eduroam"]["bss_count"] == 12
+    assert (by_ssid["Vodafone Hotspot"]["signal"], by_ssid["Vodafone Hotspot"]["bss_count"]) == (-41.25, 15)
+    assert by_ssid["caf\\xc3\\xa9 wifi"]["bss_count"] == 2
+
+
+def test_dense_scan_secure_flag():
+    networks = merge_networks(parse_iw_scan(DENSE_SCAN))
+    assert {n["ssid"] for n in networks if not n["secure"]} == OPEN_SSIDS
+    by_ssid = {n["ssid"]: n for n in networks}
+    assert by_ssid["HP-Print-3F-LaserJet"]["secure"]  # WEP: Privacy bit only
+    assert by_ssid["EasyBox-204417"]["secure"]  # WPA IE only
+
+
+def test_privacy_capability_with_trailing_flags():
+    output = (
+        "BSS 02:00:00:00:00:01(on wlan0)\n"
+        "\tfreq: 2412\n"
+        "\tcapability: ESS Privacy ShortSlotTime (0x0411)\n"
+        "\tSSID: wep\n"
+        "BSS 02:00:00:00:00:02(on wlan0)\n"
+        "\tfreq: 2412\n"
+        "\tcapability: ESS ShortSlotTime (0x0401)\n"
+        "\tSSID: open\n"
+    )
+    assert {e["ssid"]: e["secure"] for e in parse_iw_scan(output)} == {"wep": True, "open": False}
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+"""
+Exercise usb_reset.recover() against a simulated sysfs tree.
+
+Builds a throwaway /sys + /dev layout for a device behind a hub, then runs
+the escalation under a few failure scenarios and prints which step
+recovered the device and how long each step took. No hardware or root
+needed.
+
+Usage:
+
+  python usb_recovery_sim.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from typing import Callable, Dict
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "..", "board", "beamer", "rootfs-overlay", "opt", "beamer"),
+)
+import usb_reset  # noqa: E402
+
+BUSID = "1-1.3"
+
+
+def _write(path: str, value: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(value)
+
+
+def build_tree(root: str, port_control: bool = True, driver: bool = True) -> Dict[str, str]:
+    """
+    Lay out /sys/bus/usb/devices/1-1.3 behind hub 1-1, its hub port, an
+    optional usbip-host driver and a /dev/bus/usb node.
+    """
+    sysfs = os.path.join(root, "sys")
+    dev = os.path.join(root, "dev")
+    devices = os.path.join(sysfs, "bus", "usb", "devices")
+    device = os.path.join(devices, BUSID)
+    _write(os.path.join(device, "busnum"), "1\n")
+    _write(os.path.join(device, "devnum"), "5\n")
+    _write(os.path.join(device, "bConfigurationValue"), "1\n")
+    port_dir = os.path.join(devices, "1-1:1.0", "1-1-port3")
+    os.makedirs(port_dir)
+    if port_control:
+        _write(os.path.join(port_dir, "disable"), "0\n")
+    os.symlink(port_dir, os.path.join(device, "port"))
+    if driver:
+        driver_dir = os.path.join(sysfs, "bus", "usb", "drivers", "usbip-host")
+        _write(os.path.join(driver_dir, "bind"), "")
+        _write(os.path.join(driver_dir, "unbind"), "")
+        os.symlink(driver_dir, os.path.join(device, "driver"))
+    _write(os.path.join(dev, "bus", "usb", "001", "005"), "")
+    return {"sysfs": sysfs, "dev": dev, "port": port_dir}
+
+
+def scenario(name: str, wedged_until: str | None, port_control: bool = True,
+             ioctl_fails: bool = False) -> Dict:
+    """
+    wedged_until: the first step after which the device reports healthy
+    again (None = never recovers).
+    """
+    with tempfile.TemporaryDirectory() as root:
+        paths = build_tree(root, port_control=port_control)
+        done = []
+
+        def fake_ioctl(devpath: str) -> None:
+            done.append(usb_reset.STEP_RESET)
+            if ioctl_fails:
+                raise OSError(5, "Input/output error")
+
+        original_port_cycle = usb_reset.port_cycle
+        original_rebind = usb_reset.rebind
+
+        def tracking(step: str, fn: Callable) -> Callable:
+            def wrapper(*args, **kwargs):
+                fn(*args, **kwargs)
+                done.append(step)
+            return wrapper
+
+        usb_reset.port_cycle = tracking(usb_reset.STEP_PORT_CYCLE, original_port_cycle)
+        usb_reset.rebind = tracking(usb_reset.STEP_REBIND, original_rebind)
+        try:
+            result = usb_reset.recover(
+                BUSID,
+                sysfs=paths["sysfs"],
+                dev=paths["dev"],
+                healthy=lambda _: wedged_until is not None and wedged_until in done,
+                settle=0.2,
+                hold=0.2,
+                off_seconds=0.05,
+                ioctl_reset=fake_ioctl,
+            )
+        finally:
+            usb_reset.port_cycle = original_port_cycle
+            usb_reset.rebind = original_rebind
+        if port_control:
+            # The port must always be re-enabled after a cycle.
+            with open(os.path.join(paths["port"], "disable")) as f:
+                result["port_disable_after"] = f.read().strip()
+        result["scenario"] = name
+        return result
+
+
+def main() -> int:
+    results = [
+        scenario("reset is enough", usb_reset.STEP_RESET),
+        scenario("ioctl fails, port cycle recovers", usb_reset.STEP_PORT_CYCLE, ioctl_fails=True),
+        scenario("no port control, rebind recovers", usb_reset.STEP_REBIND, port_control=False),
+        scenario("never recovers", None),
+    ]
+    expected = [usb_reset.STEP_RESET, usb_reset.STEP_PORT_CYCLE, usb_reset.STEP_REBIND, None]
+    failed = 0
+    for result, want in zip(results, expected):
+        status = "PASS" if result["recovered_by"] == want else "FAIL"
+        failed += status == "FAIL"
+        print(f"{status} {result['scenario']}: recovered_by={result['recovered_by']}")
+        for step in result["steps"]:
+            print(f"      {step['step']:<10} ok={step['ok']!s:<5} {step['ms']:>7} ms  {step['error'] or ''}")
+    if "-v" in sys.argv:
+        print(json.dumps(results, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
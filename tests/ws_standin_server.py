@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Local stand-in for the USB app's /api/ws endpoint, for trying out
+`zeroforce_client.py watch` without a beamer.
+
+Sends the same message types as app.py ("devices", "usbip-status"). A fake
+device is plugged and unplugged every --interval seconds, and connections
+are dropped every --drop-after seconds so reconnect and resume can be
+exercised.
+
+Usage examples:
+
+  python ws_standin_server.py --port 6000
+  python zeroforce_client.py --base-url http://127.0.0.1:6000 watch \\
+      --match 1234:* --attach-cmd "echo attach {busid}"
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List, Set
+
+import websockets
+
+BASE_DEVICES: List[dict] = [
+    {"id": "1", "busid": "1-1.1", "vid": "1d6b", "pid": "0002", "serial": None,
+     "vendor": "Linux Foundation", "product": "2.0 root hub"},
+]
+FAKE_DEVICE = {"id": "2", "busid": "1-1.3", "vid": "1234", "pid": "5678", "serial": "SN0001",
+               "vendor": "Example", "product": "Projector"}
+
+
+class StandIn:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.clients: Set = set()
+        self.plugged = False
+
+    def devices(self) -> List[dict]:
+        return BASE_DEVICES + ([FAKE_DEVICE] if self.plugged else [])
+
+    async def broadcast(self, payload: dict) -> None:
+        message = json.dumps(payload)
+        for ws in list(self.clients):
+            try:
+                await ws.send(message)
+            except websockets.ConnectionClosed:
+                self.clients.discard(ws)
+
+    async def handler(self, ws) -> None:
+        if ws.request.path != "/api/ws":
+            await ws.close(code=1008)
+            return
+        self.clients.add(ws)
+        try:
+            await ws.send(json.dumps({"type": "devices", "devices": self.devices()}))
+            if self.args.drop_after:
+                await asyncio.sleep(self.args.drop_after)
+                print("dropping connection")
+                await ws.close()
+            else:
+                await ws.wait_closed()
+        finally:
+            self.clients.discard(ws)
+
+    async def scenario(self) -> None:
+        while True:
+            await asyncio.sleep(self.args.interval)
+            self.plugged = not self.plugged
+            print("plug" if self.plugged else "unplug", FAKE_DEVICE["busid"])
+            await self.broadcast({"type": "devices", "devices": self.devices()})
+            if self.plugged:
+                await asyncio.sleep(self.args.attach_delay)
+                await self.broadcast(
+                    {"type": "usbip-status", "busid": FAKE_DEVICE["busid"], "status": "in-use"}
+                )
+
+
+async def run(args: argparse.Namespace) -> None:
+    standin = StandIn(args)
+    async with websockets.serve(standin.handler, args.host, args.port):
+        print(f"listening on ws://{args.host}:{args.port}/api/ws")
+        await standin.scenario()
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Stand-in /api/ws server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6000)
+    parser.add_argument("--interval", type=float, default=3.0, help="Seconds between plug/unplug")
+    parser.add_argument("--attach-delay", type=float, default=0.2,
+                        help="Seconds before the fake device reports in-use")
+    parser.add_argument("--drop-after", type=float, default=0.0,
+                        help="Close each connection after this many seconds (0 = never)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -19,24 +19,70 @@ Usage examples:
 
   # Bind devices by VID:PID pairs
   python zeroforce_client.py --base-url http://127.0.0.1:6000 bind --vidpid 1234:5678 1d6b:0002
+
+  # Measure API latency over the tunnel: 500 requests, 8 in flight
+  python zeroforce_client.py --base-url http://127.0.0.1:6000 bench -n 500 -c 8 \
+      --endpoint /zeroforce/lsusb --endpoint /api/list-devices
+
+  # Follow device events and attach matching devices as soon as they appear
+  # (needs the 'websockets' package; try it against ws_standin_server.py)
+  python zeroforce_client.py --base-url http://127.0.0.1:6000 watch --match 1234:* \
+      --attach-cmd "usbip attach -r 127.0.0.1 -b {busid}"
+
+  # Query many beamers at once, from an inventory file or mDNS
+  python zeroforce_client.py fleet --inventory beamers.txt -c 64
+  python zeroforce_client.py fleet --mdns --json
 """
 
 import argparse
+import asyncio
 import json
+import random
+import shlex
+import ssl
 import sys
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Set
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Statuses worth retrying: the tunnel or the app restarting.
+RETRY_STATUSES = (502, 503, 504)
 
 
 def make_url(base: str, path: str) -> str:
     return base.rstrip("/") + path
 
 
+def make_session(retries: int, backoff: float, pool_size: int = 4) -> requests.Session:
+    """
+    Session that keeps connections to the device open between calls, so
+    every request does not pay for a new TCP connection through the tunnel.
+    Only idempotent methods are retried.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def cmd_readytopair(args: argparse.Namespace) -> int:
     url = make_url(args.base_url, "/zeroforce/readytopair")
     try:
-        resp = requests.get(url, timeout=args.timeout)
+        resp = args.session.get(url, timeout=args.timeout)
     except requests.RequestException as exc:
         print(f"ERROR: request to {url} failed: {exc}", file=sys.stderr)
         return 1
@@ -60,7 +106,7 @@ def cmd_setkey(args: argparse.Namespace) -> int:
 
     try:
         # Use form-encoded data for maximum compatibility with existing apps.
-        resp = requests.post(url, data={"key": key}, timeout=args.timeout)
+        resp = args.session.post(url, data={"key": key}, timeout=args.timeout)
     except requests.RequestException as exc:
         print(f"ERROR: request to {url} failed: {exc}", file=sys.stderr)
         return 1
@@ -73,7 +119,7 @@ def cmd_setkey(args: argparse.Namespace) -> int:
 def cmd_lsusb(args: argparse.Namespace) -> int:
     url = make_url(args.base_url, "/zeroforce/lsusb")
     try:
-        resp = requests.get(url, timeout=args.timeout)
+        resp = args.session.get(url, timeout=args.timeout)
     except requests.RequestException as exc:
         print(f"ERROR: request to {url} failed: {exc}", file=sys.stderr)
         return 1
@@ -130,7 +176,7 @@ def cmd_bind(args: argparse.Namespace) -> int:
         return 1
 
     try:
-        resp = requests.post(url, json=payload, timeout=args.timeout)
+        resp = args.session.post(url, json=payload, timeout=args.timeout)
     except requests.RequestException as exc:
         print(f"ERROR: request to {url} failed: {exc}", file=sys.stderr)
         return 1
@@ -145,6 +191,455 @@ def cmd_bind(args: argparse.Namespace) -> int:
     return 0 if resp.ok else 1
 
 
+def _pct(latencies: List[float], p: float) -> float | None:
+    if not latencies:
+        return None
+    return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+
+def _bench_summary(latencies: List[float], errors: int, statuses: Dict[str, int], elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": _pct(latencies, 0.50),
+        "p90_ms": _pct(latencies, 0.90),
+        "p99_ms": _pct(latencies, 0.99),
+        "max_ms": _pct(latencies, 1.0),
+    }
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    endpoints = args.endpoint or ["/zeroforce/lsusb"]
+    # No retries here: a retried request would hide errors and skew latency.
+    session = make_session(0, 0.0, pool_size=args.concurrency)
+    headers = {"Connection": "close"} if args.fresh_connections else {}
+
+    lock = threading.Lock()
+    per_endpoint = {ep: {"latencies": [], "errors": 0, "statuses": {}} for ep in endpoints}
+
+    def one(i: int) -> None:
+        ep = endpoints[i % len(endpoints)]
+        stats = per_endpoint[ep]
+        start = time.perf_counter()
+        try:
+            resp = session.get(make_url(args.base_url, ep), headers=headers, timeout=args.timeout)
+            resp.content
+        except requests.RequestException:
+            with lock:
+                stats["errors"] += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            key = str(resp.status_code)
+            stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+            if resp.ok or resp.status_code == 304:
+                stats["latencies"].append(elapsed)
+            else:
+                stats["errors"] += 1
+
+    # Warm-up: open the pooled connections before timing starts.
+    for ep in endpoints:
+        try:
+            session.get(make_url(args.base_url, ep), timeout=args.timeout).content
+        except requests.RequestException:
+            pass
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies: List[float] = []
+    all_statuses: Dict[str, int] = {}
+    all_errors = 0
+    endpoints_result = {}
+    for ep, stats in per_endpoint.items():
+        endpoints_result[ep] = _bench_summary(stats["latencies"], stats["errors"], stats["statuses"], elapsed)
+        all_latencies.extend(stats["latencies"])
+        all_errors += stats["errors"]
+        for key, count in stats["statuses"].items():
+            all_statuses[key] = all_statuses.get(key, 0) + count
+
+    result = {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "fresh_connections": args.fresh_connections,
+        "elapsed_s": round(elapsed, 3),
+        "total": _bench_summary(all_latencies, all_errors, all_statuses, elapsed),
+        "endpoints": endpoints_result,
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2, sort_keys=True))
+    else:
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {result['elapsed_s']}s")
+        print(f"{'endpoint':<28} {'req':>6} {'err%':>6} {'rps':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+        rows = list(endpoints_result.items()) + [("TOTAL", result["total"])]
+        for name, r in rows:
+            cols = [r[k] if r[k] is not None else "-" for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms")]
+            print(
+                f"{name:<28} {r['requests']:>6} {r['error_rate'] * 100:>6.1f} {r['throughput_rps']:>8} "
+                + " ".join(f"{c:>8}" for c in cols)
+            )
+    return 0 if not all_errors else 1
+
+
+def _ws_url(base: str) -> str:
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://"):]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://"):]
+    return make_url(base, "/api/ws")
+
+
+def _matches(device: dict, patterns: List[str]) -> bool:
+    """
+    True if device matches one of the VID:PID patterns ("*" matches any
+    VID or PID). No patterns means nothing matches.
+    """
+    vid = str(device.get("vid", "")).lower()
+    pid = str(device.get("pid", "")).lower()
+    for pattern in patterns:
+        want_vid, _, want_pid = pattern.lower().partition(":")
+        if want_vid in ("*", vid) and want_pid in ("*", "", pid):
+            return True
+    return False
+
+
+def _device_key(device: dict) -> tuple:
+    return (device.get("busid"), device.get("vid"), device.get("pid"), device.get("serial"))
+
+
+def _log(message: str) -> None:
+    print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+
+class DeviceWatcher:
+    """
+    Keeps the last known device set across reconnects, so a reconnect
+    (which starts with a full "devices" message) only reports and attaches
+    what changed while the connection was down.
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.devices: Dict[tuple, dict] = {}
+        self.synced = False
+        # busid -> monotonic time the plug was seen, until it is in use
+        self.pending: Dict[str, float] = {}
+        # Running attach commands; referenced here so they are not
+        # garbage collected, and cancelled by close().
+        self.attaching: Set[asyncio.Task] = set()
+
+    async def handle(self, message: dict) -> None:
+        kind = message.get("type")
+        if kind == "devices":
+            await self._on_devices(message.get("devices") or [])
+        elif kind == "usbip-status":
+            busid = message.get("busid")
+            status = message.get("status")
+            _log(f"usbip {busid}: {status}")
+            seen = self.pending.pop(busid, None) if status == "in-use" else None
+            if seen is not None:
+                _log(f"latency {busid}: plug event to in-use {(time.monotonic() - seen) * 1000:.0f} ms")
+        elif kind in ("reset", "warning", "error"):
+            _log(f"{kind}: {json.dumps(message, sort_keys=True)}")
+
+    async def _on_devices(self, devices: List[dict]) -> None:
+        now = time.monotonic()
+        current = {_device_key(d): d for d in devices}
+        first = not self.synced
+        self.synced = True
+        added = [d for k, d in current.items() if k not in self.devices]
+        removed = [d for k, d in self.devices.items() if k not in current]
+        self.devices = current
+
+        for device in removed:
+            self.pending.pop(device.get("busid"), None)
+            _log(f"unplugged {device.get('busid')} {device.get('vid')}:{device.get('pid')}")
+        for device in added:
+            label = "present" if first else "plugged"
+            _log(f"{label} {device.get('busid')} {device.get('vid')}:{device.get('pid')} "
+                 f"{device.get('vendor', '')} {device.get('product', '')}".rstrip())
+            if first and not self.args.attach_existing:
+                continue
+            if self.args.attach_cmd and _matches(device, self.args.match or []):
+                self.pending[device.get("busid")] = now
+                task = asyncio.create_task(self._attach(device, now))
+                self.attaching.add(task)
+                task.add_done_callback(self._attach_done)
+
+    def _attach_done(self, task: asyncio.Task) -> None:
+        self.attaching.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            _log(f"attach failed: {task.exception()!r}")
+
+    async def close(self) -> None:
+        """
+        Cancel attach commands still running (their processes are
+        terminated).
+        """
+        tasks = list(self.attaching)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _attach(self, device: dict, seen: float) -> None:
+        fields = {k: device.get(k, "") for k in ("id", "busid", "vid", "pid", "serial")}
+        cmd = [part.format(**fields) for part in shlex.split(self.args.attach_cmd)]
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd)
+        except OSError as exc:
+            _log(f"attach {fields['busid']} failed to start: {exc}")
+            return
+        try:
+            rc = await proc.wait()
+        except asyncio.CancelledError:
+            if proc.returncode is None:
+                proc.terminate()
+                await proc.wait()
+            raise
+        elapsed = (time.monotonic() - seen) * 1000
+        _log(f"attach {fields['busid']} exited {rc}; plug event to attach done {elapsed:.0f} ms")
+
+
+async def _watch(args: argparse.Namespace) -> int:
+    url = _ws_url(args.base_url)
+    watcher = DeviceWatcher(args)
+    try:
+        return await _watch_loop(args, url, watcher)
+    finally:
+        await watcher.close()
+
+
+async def _watch_loop(args: argparse.Namespace, url: str, watcher: DeviceWatcher) -> int:
+    import websockets
+
+    delay = args.min_backoff
+    while True:
+        try:
+            async with websockets.connect(url, open_timeout=args.timeout, ping_interval=20) as ws:
+                _log(f"connected to {url}")
+                delay = args.min_backoff
+                async for raw in ws:
+                    try:
+                        message = json.loads(raw)
+                    except ValueError:
+                        continue
+                    await watcher.handle(message)
+            _log("connection closed by server")
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as exc:
+            _log(f"connection failed: {exc}")
+        if args.once:
+            return 0
+        # Exponential backoff with jitter, so a fleet of watchers does not
+        # reconnect in lockstep after the beamer restarts.
+        sleep_for = delay * random.uniform(0.5, 1.0)
+        _log(f"reconnecting in {sleep_for:.1f}s")
+        await asyncio.sleep(sleep_for)
+        delay = min(delay * 2, args.max_backoff)
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    if args.attach_cmd and not args.match:
+        print("ERROR: --attach-cmd needs at least one --match VID:PID", file=sys.stderr)
+        return 1
+    try:
+        return asyncio.run(_watch(args))
+    except KeyboardInterrupt:
+        return 0
+
+
+# --- Fleet mode ---------------------------------------------------------------
+
+MDNS_SERVICE = "_beamerzf._tcp"
+
+
+def parse_inventory(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse an inventory: one target per line as
+    "[name] <pairing-url> [<usb-url>]", where usb-url is the local end of
+    the SSH tunnel to the USB app. Blank lines and # comments are ignored.
+    """
+    targets = []
+    for line in text.splitlines():
+        words = line.split("#", 1)[0].split()
+        if not words:
+            continue
+        name = None if "://" in words[0] else words.pop(0)
+        if not words:
+            continue
+        base = words[0]
+        targets.append({
+            "name": name or urlsplit(base).hostname,
+            "base_url": base,
+            "usb_url": words[1] if len(words) > 1 else None,
+        })
+    return targets
+
+
+def parse_avahi_browse(text: str) -> List[Dict[str, Any]]:
+    """
+    Turn resolved `avahi-browse -rpt` lines into targets, one per service
+    instance (IPv4 preferred when both families resolve).
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    for line in text.splitlines():
+        fields = line.split(";")
+        if len(fields) < 9 or fields[0] != "=" or fields[4] != MDNS_SERVICE:
+            continue
+        family, name, address, port = fields[2], fields[3], fields[7], fields[8]
+        if name in found and family != "IPv4":
+            continue
+        host = f"[{address}]" if ":" in address else address
+        found[name] = {"name": name, "base_url": f"http://{host}:{port}", "usb_url": None}
+    return [found[name] for name in sorted(found)]
+
+
+async def _browse_mdns(timeout: float) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        "avahi-browse", "-rpt", MDNS_SERVICE,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        out = b""
+    return out.decode(errors="replace")
+
+
+async def _http_get_json(url: str, timeout: float) -> Any:
+    """
+    Minimal HTTP/1.1 GET returning the decoded JSON body. Raises on
+    connection errors, timeouts and non-2xx statuses.
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    async def fetch() -> Any:
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None
+        )
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                "Accept: application/json\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, body = raw.partition(b"\r\n\r\n")
+        status_line = head.split(b"\r\n", 1)[0].split()
+        status = int(status_line[1]) if len(status_line) > 1 else 0
+        if b"transfer-encoding: chunked" in head.lower():
+            body = _dechunk(body)
+        if not 200 <= status < 300:
+            raise RuntimeError(f"HTTP {status}")
+        return json.loads(body)
+
+    return await asyncio.wait_for(fetch(), timeout)
+
+
+def _dechunk(body: bytes) -> bytes:
+    out = bytearray()
+    while body:
+        size_line, _, rest = body.partition(b"\r\n")
+        size = int(size_line.split(b";", 1)[0] or b"0", 16)
+        if size == 0:
+            break
+        out += rest[:size]
+        body = rest[size + 2:]
+    return bytes(out)
+
+
+async def _query_target(target: Dict[str, Any], sem: asyncio.Semaphore, timeout: float) -> Dict[str, Any]:
+    result: Dict[str, Any] = dict(target)
+    result["errors"] = {}
+
+    async def get(key: str, url: str) -> None:
+        try:
+            result[key] = await _http_get_json(url, timeout)
+        except asyncio.TimeoutError:
+            result["errors"][key] = "timeout"
+        except Exception as exc:
+            result["errors"][key] = str(exc) or type(exc).__name__
+
+    async with sem:
+        start = time.perf_counter()
+        jobs = [
+            get("info", make_url(target["base_url"], "/zeroforce/info")),
+            get("readytopair", make_url(target["base_url"], "/zeroforce/readytopair")),
+        ]
+        if target.get("usb_url"):
+            jobs.append(get("devices", make_url(target["usb_url"], "/zeroforce/lsusb")))
+        await asyncio.gather(*jobs)
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+async def _fleet(args: argparse.Namespace, targets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    sem = asyncio.Semaphore(args.concurrency)
+    return await asyncio.gather(*(_query_target(t, sem, args.timeout) for t in targets))
+
+
+def _print_fleet_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'name':<24} {'host':<22} {'version':<8} {'pairing':<8} {'devmode':<8} "
+          f"{'uptime':>9} {'devices':>7} {'ms':>7}  errors")
+    for r in results:
+        info = r.get("info") or {}
+        ready = (r.get("readytopair") or {}).get("ready")
+        devices = r.get("devices")
+        uptime = info.get("uptime")
+        cols = [
+            f"{str(r['name'])[:24]:<24}",
+            f"{str(urlsplit(r['base_url']).netloc)[:22]:<22}",
+            f"{str(info.get('version', '-')):<8}",
+            f"{'-' if ready is None else ('yes' if ready else 'no'):<8}",
+            f"{'-' if 'devmode' not in info else ('yes' if info['devmode'] else 'no'):<8}",
+            f"{'-' if uptime is None else f'{uptime / 3600:.1f}h':>9}",
+            f"{'-' if devices is None else len(devices):>7}",
+            f"{r['elapsed_ms']:>7}",
+        ]
+        errors = ", ".join(f"{k}: {v}" for k, v in r["errors"].items())
+        print(" ".join(cols) + "  " + errors)
+    failed = sum(1 for r in results if r["errors"])
+    print(f"{len(results)} beamers, {failed} with errors")
+
+
+def cmd_fleet(args: argparse.Namespace) -> int:
+    targets: List[Dict[str, Any]] = []
+    if args.inventory:
+        with open(args.inventory) as f:
+            text = f.read()
+        # Saved `avahi-browse -rpt` output is accepted as an inventory too.
+        targets += parse_avahi_browse(text) if text.startswith(("=;", "+;")) else parse_inventory(text)
+    if args.mdns:
+        targets += parse_avahi_browse(asyncio.run(_browse_mdns(args.mdns_timeout)))
+    if not targets:
+        print("ERROR: no targets (use --inventory and/or --mdns)", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    results = asyncio.run(_fleet(args, targets))
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps({"elapsed_s": round(elapsed, 3), "beamers": results}, indent=2, sort_keys=True))
+    else:
+        _print_fleet_table(results)
+        print(f"queried in {elapsed:.2f}s with concurrency {args.concurrency}")
+    return 0 if not any(r["errors"] for r in results) else 1
+
+
 def main(argv: List[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Test client for zeroforce pairing/USB APIs")
     parser.add_argument(
@@ -162,6 +657,18 @@ def main(argv: List[str] | None = None) -> int:
         default=5.0,
         help="HTTP request timeout in seconds (default: 5.0)",
     )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="Retries for failed GET requests, with exponential backoff (default: 3)",
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=0.3,
+        help="Backoff factor in seconds between retries (default: 0.3)",
+    )
 
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -202,7 +709,71 @@ def main(argv: List[str] | None = None) -> int:
     )
     p_bind.set_defaults(func=cmd_bind)
 
+    # Latency benchmark
+    p_bench = subparsers.add_parser(
+        "bench",
+        help="Fire concurrent GET requests and report latency percentiles",
+    )
+    p_bench.add_argument("-n", "--requests", type=int, default=200)
+    p_bench.add_argument("-c", "--concurrency", type=int, default=4)
+    p_bench.add_argument(
+        "--endpoint",
+        action="append",
+        help="Path to request; repeat to mix endpoints round-robin (default: /zeroforce/lsusb)",
+    )
+    p_bench.add_argument(
+        "--fresh-connections",
+        action="store_true",
+        help="Send Connection: close so every request opens a new connection",
+    )
+    p_bench.add_argument("--json", action="store_true", help="Print the result as JSON")
+    p_bench.set_defaults(func=cmd_bench)
+
+    # /api/ws event stream
+    p_watch = subparsers.add_parser(
+        "watch",
+        help="Follow device events over /api/ws and optionally attach matching devices",
+    )
+    p_watch.add_argument(
+        "--match",
+        action="append",
+        metavar="VID:PID",
+        help="Devices to attach; '*' matches any VID or PID (repeatable)",
+    )
+    p_watch.add_argument(
+        "--attach-cmd",
+        help=(
+            "Command run for each newly plugged matching device; "
+            "{busid}, {vid}, {pid}, {serial} and {id} are substituted"
+        ),
+    )
+    p_watch.add_argument(
+        "--attach-existing",
+        action="store_true",
+        help="Also attach matching devices already present on first connect",
+    )
+    p_watch.add_argument("--min-backoff", type=float, default=0.5)
+    p_watch.add_argument("--max-backoff", type=float, default=30.0)
+    p_watch.add_argument("--once", action="store_true", help="Exit when the connection ends")
+    p_watch.set_defaults(func=cmd_watch)
+
+    # Many beamers at once
+    p_fleet = subparsers.add_parser(
+        "fleet",
+        help="Query info, pairing state and device lists of many beamers concurrently",
+    )
+    p_fleet.add_argument(
+        "--inventory",
+        help="File with '[name] <pairing-url> [<usb-url>]' lines, or saved avahi-browse -rpt output",
+    )
+    p_fleet.add_argument("--mdns", action="store_true", help=f"Discover {MDNS_SERVICE} services with avahi-browse")
+    p_fleet.add_argument("--mdns-timeout", type=float, default=5.0)
+    p_fleet.add_argument("-c", "--concurrency", type=int, default=32, help="Beamers queried at once")
+    p_fleet.add_argument("--json", action="store_true", help="Print the result as JSON")
+    p_fleet.set_defaults(func=cmd_fleet)
+
     args = parser.parse_args(argv)
+    args.session = make_session(args.retries, args.backoff)
     return args.func(args)
 
 